@@ -0,0 +1,128 @@
+# authentication/authentication.py
+
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Users kept at most; the ones cached longest ago are dropped first
+USER_CACHE_MAX_ENTRIES = 1000
+
+
+class UserCache:
+    """
+    Users loaded by CachedJWTAuthentication in this process, keyed by their
+    token's user ID claim as a string, for AUTH_USER_CACHE_TIMEOUT seconds.
+
+    Each user is stored with the version of its namespace in the shared
+    response cache (see user_namespace()) at the time it was loaded, and is
+    only returned while that version is still current.
+    """
+    def __init__(self, max_entries=USER_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._users = {}
+        self._lock = threading.Lock()
+        # Bumped by every forget(), so a user loaded before a change is never stored after it
+        self.generation = 0
+
+    def get(self, user_id, version):
+        entry = self._users.get(user_id)
+        if entry is None or entry[0] < time.monotonic() or entry[1] != version:
+            return None
+        # Each request gets its own copy to set attributes (and permission caches) on
+        return copy.copy(entry[2])
+
+    def set(self, user_id, user, version, generation, timeout):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._users.pop(user_id, None)
+            if len(self._users) >= self.max_entries:
+                del self._users[next(iter(self._users))]
+            self._users[user_id] = (time.monotonic() + timeout, version, copy.copy(user))
+
+    def forget(self, user_id):
+        with self._lock:
+            self.generation += 1
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+def user_namespace(user_id):
+    """
+    The response cache namespace whose version every process checks before
+    using its cached copy of the user.
+    """
+    return f'user:{user_id}'
+
+
+def forget_user(user):
+    """
+    Drop a changed or deleted user from this process's cache and bump its
+    shared version, so other processes drop it too, now and again once the
+    transaction commits; a request reading the old row in between cannot
+    cache it again.
+    """
+    from school_vaccination_portal.cache import invalidate, invalidate_on_commit
+
+    # Tokens carry the ID as a string
+    user_id = str(getattr(user, api_settings.USER_ID_FIELD))
+    user_cache.forget(user_id)
+    invalidate(user_namespace(user_id))
+    transaction.on_commit(lambda: user_cache.forget(user_id))
+    invalidate_on_commit(user_namespace(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps the users it loads for a few seconds
+    instead of querying the user table on every request.
+
+    The checks stay the same: only active users are cached, and the token's
+    password hash claim is compared on every request when CHECK_REVOKE_TOKEN
+    is on. Saving or deleting a user bumps its version in the response cache,
+    which every request reads (one cache lookup instead of a query), so all
+    processes sharing that cache stop using the old copy at once. Processes
+    that do not share it (the default in-memory backend) and bulk updates
+    that send no signals catch up within AUTH_USER_CACHE_TIMEOUT seconds.
+    A timeout of 0 disables the cache.
+    """
+    def get_user(self, validated_token):
+        # Not imported at module level: the cache module imports DRF's views,
+        # which load this class from the REST_FRAMEWORK setting
+        from school_vaccination_portal.cache import get_namespace_versions
+
+        timeout = settings.AUTH_USER_CACHE_TIMEOUT
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if timeout <= 0 or user_id is None:
+            return super().get_user(validated_token)
+        user_id = str(user_id)
+
+        version = get_namespace_versions([user_namespace(user_id)])[0]
+        user = user_cache.get(user_id, version)
+        if user is None:
+            generation = user_cache.generation
+            # Raises for unknown, inactive and revoked users, which are never cached
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user, version, generation, timeout)
+            return user
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
@@ -0,0 +1,15 @@
+# authentication/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import forget_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, raw=False, **kwargs):
+    # Group and permission changes need nothing: permissions are loaded per request
+    if raw:
+        return
+    forget_user(instance)
@@ -1,3 +1,108 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from school_vaccination_portal.cache import get_namespace_versions, get_response_cache, invalidate
+from .authentication import CachedJWTAuthentication, user_cache, user_namespace
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], AUTH_USER_CACHE_TIMEOUT=30)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        # Rolled back users' IDs are reused by the next test
+        user_cache.clear()
+        get_response_cache().clear()
+        self.user = get_user_model().objects.create_user('nurse', password='old-password')
+        self.token = AccessToken.for_user(self.user)
+        self.authentication = CachedJWTAuthentication()
+
+    def get_user(self, token=None):
+        return self.authentication.get_user(token or self.token)
+
+    def test_cached_user_is_returned_without_a_query(self):
+        with self.assertNumQueries(1):
+            first = self.get_user()
+        with self.assertNumQueries(0):
+            second = self.get_user()
+
+        self.assertEqual(second.pk, self.user.pk)
+        # Each request gets its own copy
+        self.assertIsNot(first, second)
+
+    def test_saving_the_user_drops_the_cached_copy(self):
+        self.get_user()
+
+        user = get_user_model().objects.get(pk=self.user.pk)
+        user.first_name = 'Renamed'
+        user.save()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_user().first_name, 'Renamed')
+
+    def test_deactivated_user_is_rejected_on_the_next_request(self):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+        self.assertEqual(self.client.get('/api/jobs/', **headers).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get('/api/jobs/', **headers).status_code, 401)
+        with self.assertRaises(AuthenticationFailed):
+            self.get_user()
+
+    def test_version_bumped_by_another_process_drops_the_cached_copy(self):
+        self.get_user()
+
+        invalidate(user_namespace(self.user.pk))
+
+        with self.assertNumQueries(1):
+            self.get_user()
+
+    def test_token_issued_before_a_password_change_is_rejected(self):
+        # Patched on the shared settings object: override_settings(SIMPLE_JWT=...)
+        # rebinds simplejwt's module global, which the importers never see
+        with mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True):
+            old_token = AccessToken.for_user(self.user)
+            self.get_user(old_token)
+
+            self.user.set_password('new-password')
+            self.user.save()
+            new_token = AccessToken.for_user(self.user)
+
+            # Once by the user query, once against the copy the new token cached
+            with self.assertRaisesMessage(AuthenticationFailed, "password has been changed"):
+                self.get_user(old_token)
+            self.get_user(new_token)
+            with self.assertNumQueries(0), self.assertRaisesMessage(AuthenticationFailed, "password has been changed"):
+                self.get_user(old_token)
+
+    def test_user_loaded_before_a_change_is_not_cached_after_it(self):
+        original_get_user = JWTAuthentication.get_user
+
+        def load_then_change(authentication, validated_token):
+            user = original_get_user(authentication, validated_token)
+            # Another request deactivates the user and this process drops its
+            # copy on commit, while this one still holds the old row
+            get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+            user_cache.forget(str(self.user.pk))
+            return user
+
+        with mock.patch.object(JWTAuthentication, 'get_user', autospec=True, side_effect=load_then_change):
+            self.assertTrue(self.get_user().is_active)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.get_user()
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_zero_timeout_disables_the_cache(self):
+        with self.assertNumQueries(1):
+            self.get_user()
+        with self.assertNumQueries(1):
+            self.get_user()
+
+        version = get_namespace_versions([user_namespace(self.user.pk)])[0]
+        self.assertIsNone(user_cache.get(str(self.user.pk), version))
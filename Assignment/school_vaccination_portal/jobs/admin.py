@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'processed_rows', 'total_rows', 'error_count', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created_at', 'updated_at', 'started_at', 'finished_at')
@@ -0,0 +1,47 @@
+# jobs/management/commands/run_jobs.py
+
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from jobs.worker import work
+
+
+class Command(BaseCommand):
+    help = 'Run background imports and exports from the job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'JOB_WORKER_CONCURRENCY', 1),
+                            help='Number of jobs to run at the same time (default: JOB_WORKER_CONCURRENCY)')
+        parser.add_argument('--poll-interval', type=float, default=getattr(settings, 'JOB_POLL_INTERVAL', 2),
+                            help='Seconds to wait between polls when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling forever')
+
+    def handle(self, *args, **options):
+        concurrency = max(options['concurrency'], 1)
+        stop_event = threading.Event()
+        
+        def stop(signum, frame):
+            self.stdout.write('Stopping after the current jobs finish...')
+            stop_event.set()
+        
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+        
+        self.stdout.write(self.style.SUCCESS(f'Job worker started with concurrency {concurrency}'))
+        
+        threads = [
+            threading.Thread(target=work, args=(stop_event, options['poll_interval'], options['once']), daemon=True)
+            for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        
+        # Join with a timeout so signals are still delivered to the main thread
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+        
+        self.stdout.write(self.style.SUCCESS('Job worker stopped'))
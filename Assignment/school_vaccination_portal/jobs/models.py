@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    STUDENT_IMPORT = 'student_import'
+    STUDENT_EXPORT = 'student_export'
+    VACCINATION_REPORT = 'vaccination_report'
+    
+    KIND_CHOICES = [
+        (STUDENT_IMPORT, 'Student import'),
+        (STUDENT_EXPORT, 'Student export'),
+        (VACCINATION_REPORT, 'Vaccination report'),
+    ]
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    
+    # Only the first errors are kept on the row; error_count has the total
+    MAX_STORED_ERRORS = 1000
+    
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    params = models.JSONField(default=dict, blank=True)
+    input_file = models.FileField(upload_to='jobs/input/', blank=True)
+    result_file = models.FileField(upload_to='jobs/results/', blank=True)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_rows = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued job
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.id} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+    
+    @property
+    def progress(self):
+        if not self.total_rows:
+            return 100.0 if self.status == self.SUCCEEDED else None
+        return round(min(self.processed_rows / self.total_rows, 1) * 100, 2)
+    
+    def update_progress(self, processed_rows, created_rows=None, errors=None):
+        """
+        Persist progress counters with a single UPDATE so polling clients see
+        them while the job is still running.
+        """
+        self.processed_rows = processed_rows
+        fields = ['processed_rows', 'updated_at']
+        
+        if created_rows is not None:
+            self.created_rows = created_rows
+            fields.append('created_rows')
+        
+        if errors is not None:
+            self.error_count = len(errors)
+            self.errors = errors[:self.MAX_STORED_ERRORS]
+            fields.extend(['error_count', 'errors'])
+        
+        self.save(update_fields=fields)
+    
+    def mark_finished(self, status, message=''):
+        self.status = status
+        self.message = message
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'message', 'finished_at', 'updated_at'])
@@ -0,0 +1,39 @@
+from rest_framework import serializers
+from school_vaccination_portal.exports import EXPORT_FORMATS
+from .models import Job
+
+class JobSerializer(serializers.ModelSerializer):
+    progress = serializers.ReadOnlyField()
+    download_url = serializers.SerializerMethodField()
+    file = serializers.FileField(source='input_file', write_only=True, required=False)
+    
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'params', 'file', 'total_rows', 'processed_rows',
+                  'created_rows', 'error_count', 'errors', 'message', 'progress', 'download_url',
+                  'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['status', 'total_rows', 'processed_rows', 'created_rows', 'error_count',
+                            'errors', 'message', 'created_at', 'started_at', 'finished_at']
+    
+    def get_download_url(self, obj):
+        if obj.status != Job.SUCCEEDED or not obj.result_file:
+            return None
+        request = self.context.get('request')
+        path = f'/api/jobs/{obj.id}/download/'
+        return request.build_absolute_uri(path) if request else path
+    
+    def validate(self, data):
+        kind = data.get('kind')
+        params = data.get('params') or {}
+        
+        if not isinstance(params, dict):
+            raise serializers.ValidationError({'params': 'Must be an object.'})
+        
+        if kind == Job.STUDENT_IMPORT:
+            upload = data.get('input_file')
+            if not upload or not upload.name.endswith('.csv'):
+                raise serializers.ValidationError({'file': 'Please upload a CSV file'})
+        elif params.get('format', 'csv') not in EXPORT_FORMATS:
+            raise serializers.ValidationError({'params': f"Unsupported export format: {params.get('format')}"})
+        
+        return data
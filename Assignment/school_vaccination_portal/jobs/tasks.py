@@ -0,0 +1,99 @@
+# jobs/tasks.py
+
+import tempfile
+
+from django.core.files import File
+from students.models import Student
+from school_vaccination_portal.databases import replica_reads
+from school_vaccination_portal.exports import EXPORT_FORMATS, write_export
+from school_vaccination_portal.utils import (
+    VACCINATION_REPORT_COLUMNS, filter_vaccination_report, import_students_csv,
+    iter_student_rows, iter_vaccination_report_rows, student_export_columns
+)
+from .models import Job
+
+# Export rows written between progress updates
+PROGRESS_EVERY = 2000
+
+
+def _track_progress(job, rows):
+    """
+    Pass rows through while recording how many have been written.
+    """
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % PROGRESS_EVERY == 0:
+            job.update_progress(count)
+    job.update_progress(count)
+
+
+def _write_result(job, columns, rows, filename, export_format):
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    
+    # Spool to a temporary file, then hand it to the configured storage
+    with tempfile.TemporaryFile() as tmp:
+        write_export(columns, _track_progress(job, rows), tmp, export_format)
+        tmp.seek(0)
+        job.result_file.save(f"{filename}_{job.id}.{export_format}", File(tmp), save=False)
+    job.save(update_fields=['result_file', 'updated_at'])
+
+
+def run_student_import(job):
+    def progress(rows_processed, students_created, errors):
+        job.update_progress(rows_processed, students_created, errors)
+    
+    with job.input_file.open('rb') as upload:
+        students_created, errors = import_students_csv(upload, progress=progress)
+    
+    job.total_rows = job.processed_rows
+    job.save(update_fields=['total_rows', 'updated_at'])
+    
+    if students_created == 0:
+        return 'No students were imported'
+    return f'Successfully imported {students_created} students'
+
+
+def run_student_export(job):
+    include_vaccination = job.params.get('include_vaccination', True)
+    export_format = job.params.get('format', 'csv')
+    
+    with replica_reads():
+        job.total_rows = Student.objects.count()
+        job.save(update_fields=['total_rows', 'updated_at'])
+        
+        _write_result(
+            job,
+            student_export_columns(include_vaccination),
+            iter_student_rows(include_vaccination),
+            'students',
+            export_format
+        )
+    return f'Exported {job.processed_rows} students'
+
+
+def run_vaccination_report(job):
+    export_format = job.params.get('format', 'csv')
+    queryset = filter_vaccination_report(job.params)
+    
+    with replica_reads():
+        job.total_rows = queryset.count()
+        job.save(update_fields=['total_rows', 'updated_at'])
+        
+        _write_result(
+            job,
+            VACCINATION_REPORT_COLUMNS,
+            iter_vaccination_report_rows(queryset),
+            'vaccination_report',
+            export_format
+        )
+    return f'Exported {job.processed_rows} vaccination records'
+
+
+TASKS = {
+    Job.STUDENT_IMPORT: run_student_import,
+    Job.STUDENT_EXPORT: run_student_export,
+    Job.VACCINATION_REPORT: run_vaccination_report,
+}
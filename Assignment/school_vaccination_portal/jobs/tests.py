@@ -0,0 +1,195 @@
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from authentication.authentication import user_cache
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import Job
+from .worker import claim_next_job, delete_expired_job_files, requeue_stale_jobs, work
+
+
+def make_stale(job, seconds):
+    # update() rather than save(), which would set updated_at to now
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.RUNNING, worker='gone:1:1', updated_at=timezone.now() - timedelta(seconds=seconds)
+    )
+
+
+class JobQueueTests(TestCase):
+    def test_jobs_are_claimed_oldest_first_and_only_once(self):
+        first = Job.objects.create(kind=Job.STUDENT_EXPORT)
+        second = Job.objects.create(kind=Job.STUDENT_EXPORT)
+
+        claimed = claim_next_job('worker-a')
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual((claimed.status, claimed.worker), (Job.RUNNING, 'worker-a'))
+        self.assertIsNotNone(claimed.started_at)
+
+        self.assertEqual(claim_next_job('worker-b').pk, second.pk)
+        self.assertIsNone(claim_next_job('worker-c'))
+
+    def test_finished_jobs_are_not_claimed(self):
+        Job.objects.create(kind=Job.STUDENT_EXPORT, status=Job.SUCCEEDED)
+        Job.objects.create(kind=Job.STUDENT_EXPORT, status=Job.FAILED)
+
+        self.assertIsNone(claim_next_job('worker-a'))
+
+    @override_settings(JOB_STALE_AFTER=60)
+    def test_only_jobs_past_their_lease_are_requeued(self):
+        stale = Job.objects.create(kind=Job.STUDENT_EXPORT)
+        make_stale(stale, 120)
+        busy = Job.objects.create(kind=Job.STUDENT_EXPORT)
+        make_stale(busy, 10)
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.worker, stale.started_at), (Job.QUEUED, '', None))
+        busy.refresh_from_db()
+        self.assertEqual(busy.status, Job.RUNNING)
+
+    @override_settings(JOB_STALE_AFTER=60)
+    def test_worker_requeues_and_runs_stale_jobs_while_polling(self):
+        job = Job.objects.create(kind='no_such_kind')
+        make_stale(job, 120)
+
+        with self.assertLogs('jobs.worker', 'WARNING') as logs:
+            work(threading.Event(), poll_interval=0, once=True)
+
+        self.assertIn('requeued 1 stale jobs', logs.output[0])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.message, 'Unknown job kind: no_such_kind')
+        self.assertNotEqual(job.worker, 'gone:1:1')
+
+
+@override_settings(JOB_FILE_RETENTION_DAYS=7)
+class JobFileRetentionTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_job(self, status, finished_days_ago, kind=Job.STUDENT_EXPORT):
+        job = Job(kind=kind, status=status)
+        job.input_file.save('input.csv', ContentFile(b'Student ID\n'), save=False)
+        job.result_file.save('result.csv', ContentFile(b'Student ID\n'), save=False)
+        if finished_days_ago is not None:
+            job.finished_at = timezone.now() - timedelta(days=finished_days_ago)
+        job.save()
+        return job
+
+    def files(self, job):
+        job.refresh_from_db()
+        return [file.name for file in (job.input_file, job.result_file) if file and default_storage.exists(file.name)]
+
+    def test_files_of_jobs_finished_before_the_retention_period_are_deleted(self):
+        expired = self.create_job(Job.SUCCEEDED, 8)
+        failed = self.create_job(Job.FAILED, 30)
+        recent = self.create_job(Job.SUCCEEDED, 6)
+        running = self.create_job(Job.RUNNING, None)
+        paths = [expired.input_file.name, expired.result_file.name]
+
+        self.assertEqual(delete_expired_job_files(), 4)
+
+        self.assertEqual((self.files(expired), self.files(failed)), ([], []))
+        self.assertEqual((expired.input_file.name, expired.result_file.name), ('', ''))
+        self.assertFalse(any(default_storage.exists(path) for path in paths))
+        self.assertEqual(len(self.files(recent)), 2)
+        self.assertEqual(len(self.files(running)), 2)
+        # The job itself is kept, and nothing is left to delete
+        self.assertEqual(Job.objects.count(), 4)
+        self.assertEqual(delete_expired_job_files(), 0)
+
+    @override_settings(JOB_FILE_RETENTION_DAYS=0)
+    def test_zero_keeps_files_forever(self):
+        job = self.create_job(Job.SUCCEEDED, 365)
+
+        self.assertEqual(delete_expired_job_files(), 0)
+        self.assertEqual(len(self.files(job)), 2)
+
+    def test_idle_worker_deletes_expired_files(self):
+        job = self.create_job(Job.SUCCEEDED, 8)
+
+        with self.assertLogs('jobs.worker', 'INFO') as logs:
+            work(threading.Event(), poll_interval=0, once=True)
+
+        self.assertIn('deleted 2 expired job files', logs.output[0])
+        self.assertEqual(self.files(job), [])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class JobViewSetTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        # Rolled back users' IDs are reused by the next test
+        user_cache.clear()
+        User = get_user_model()
+        self.owner = User.objects.create_user('owner', password='x')
+        self.other = User.objects.create_user('other', password='x')
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def auth(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    def submit(self, user):
+        response = self.client.post('/api/jobs/', {'kind': Job.STUDENT_EXPORT}, content_type='application/json',
+                                    **self.auth(user))
+        self.assertEqual(response.status_code, 202)
+        return response.json()['id']
+
+    def test_anonymous_requests_are_rejected(self):
+        job = Job.objects.create(kind=Job.STUDENT_EXPORT)
+
+        self.assertEqual(self.client.post('/api/jobs/', {'kind': Job.STUDENT_EXPORT},
+                                          content_type='application/json').status_code, 401)
+        self.assertEqual(self.client.get('/api/jobs/').status_code, 401)
+        self.assertEqual(self.client.get(f'/api/jobs/{job.pk}/download/').status_code, 401)
+
+    def test_users_see_only_their_own_jobs(self):
+        job_id = self.submit(self.owner)
+        self.assertEqual(Job.objects.get(pk=job_id).created_by, self.owner)
+
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/', **self.auth(self.owner)).status_code, 200)
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/', **self.auth(self.other)).status_code, 404)
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/download/', **self.auth(self.other)).status_code, 404)
+        self.assertEqual(self.client.get('/api/jobs/', **self.auth(self.other)).json()['results'], [])
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/', **self.auth(self.staff)).status_code, 200)
+
+    def test_result_is_downloadable_once_the_job_has_run(self):
+        job_id = self.submit(self.owner)
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/download/', **self.auth(self.owner)).status_code, 409)
+
+        work(threading.Event(), poll_interval=0, once=True)
+
+        job = self.client.get(f'/api/jobs/{job_id}/', **self.auth(self.owner)).json()
+        self.assertEqual(job['status'], Job.SUCCEEDED)
+        response = self.client.get(f'/api/jobs/{job_id}/download/', **self.auth(self.owner))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'Student ID'))
+
+    @override_settings(JOB_FILE_RETENTION_DAYS=1)
+    def test_expired_result_is_gone(self):
+        job_id = self.submit(self.owner)
+        work(threading.Event(), poll_interval=0, once=True)
+        Job.objects.filter(pk=job_id).update(finished_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(delete_expired_job_files(), 1)
+
+        response = self.client.get(f'/api/jobs/{job_id}/download/', **self.auth(self.owner))
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/', **self.auth(self.owner)).json()['status'],
+                         Job.SUCCEEDED)
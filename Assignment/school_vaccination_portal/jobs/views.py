@@ -0,0 +1,72 @@
+from django.http import FileResponse
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from school_vaccination_portal.pagination import JobPagination
+from .models import Job
+from .serializers import JobSerializer
+
+
+class JobViewSet(mixins.CreateModelMixin,
+                 mixins.RetrieveModelMixin,
+                 mixins.ListModelMixin,
+                 viewsets.GenericViewSet):
+    """
+    Submit long-running imports and exports, poll their progress and
+    download the result. Jobs are executed by `manage.py run_jobs`.
+    
+    Users see and download only the jobs they submitted; staff see all.
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    pagination_class = JobPagination
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = Job.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+        
+        kind = self.request.query_params.get('kind')
+        job_status = self.request.query_params.get('status')
+        
+        if kind:
+            queryset = queryset.filter(kind=kind)
+            
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+            
+        return queryset
+    
+    def create(self, request, *args, **kwargs):
+        # Multipart uploads send params as a JSON string; JSONField decodes it
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+    
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        
+        # Exports that succeeded lost their file to JOB_FILE_RETENTION_DAYS (imports never have one)
+        if job.status == Job.SUCCEEDED and not job.result_file and job.kind != Job.STUDENT_IMPORT:
+            return Response(
+                {'error': 'Job result has been deleted; submit the job again'},
+                status=status.HTTP_410_GONE
+            )
+        if job.status != Job.SUCCEEDED or not job.result_file:
+            return Response(
+                {'error': f'Job result is not available (status: {job.status})'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        filename = job.result_file.name.rsplit('/', 1)[-1]
+        content_type = 'application/x-ndjson' if filename.endswith('.ndjson') else 'text/csv'
+        return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=filename, content_type=content_type)
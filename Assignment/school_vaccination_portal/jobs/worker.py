@@ -0,0 +1,128 @@
+# jobs/worker.py
+
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from .models import Job
+from .tasks import TASKS
+
+logger = logging.getLogger(__name__)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def requeue_stale_jobs():
+    """
+    Put running jobs back in the queue when their worker has not reported
+    progress for JOB_STALE_AFTER seconds (e.g. it was killed), so they are
+    not stuck forever. Every worker calls this before each claim, so a job
+    is picked up again within one poll of its lease running out.
+    """
+    stale_after = getattr(settings, 'JOB_STALE_AFTER', 3600)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return Job.objects.filter(status=Job.RUNNING, updated_at__lt=cutoff).update(
+        status=Job.QUEUED, worker='', started_at=None, updated_at=timezone.now()
+    )
+
+
+def delete_expired_job_files():
+    """
+    Delete the uploaded and result files of jobs that finished more than
+    JOB_FILE_RETENTION_DAYS days ago. The job rows are kept as a record;
+    0 keeps the files forever.
+    
+    Returns:
+        int: Number of files deleted
+    """
+    retention_days = getattr(settings, 'JOB_FILE_RETENTION_DAYS', 7)
+    if retention_days <= 0:
+        return 0
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    expired = Job.objects.filter(
+        status__in=(Job.SUCCEEDED, Job.FAILED), finished_at__lt=cutoff
+    ).exclude(input_file='', result_file='').only('id', 'input_file', 'result_file')
+    
+    deleted = 0
+    for job in expired:
+        for field in ('input_file', 'result_file'):
+            file = getattr(job, field)
+            if not file:
+                continue
+            # Cleared with a conditional UPDATE first, so that when several
+            # workers clean up at once only one of them deletes each file
+            if Job.objects.filter(id=job.id, **{field: file.name}).update(**{field: ''}):
+                file.storage.delete(file.name)
+                deleted += 1
+    return deleted
+
+
+def claim_next_job(name=None):
+    """
+    Atomically move the oldest queued job to running and return it, or None.
+    
+    The claim is a conditional UPDATE on status, so concurrent workers (on
+    SQLite or PostgreSQL) can never both take the same job.
+    """
+    name = name or worker_name()
+    candidates = Job.objects.filter(status=Job.QUEUED).order_by('created_at', 'id').values_list('id', flat=True)
+    
+    for job_id in candidates[:10]:
+        claimed = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=name, started_at=timezone.now(), updated_at=timezone.now()
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    task = TASKS.get(job.kind)
+    if task is None:
+        job.mark_finished(Job.FAILED, f"Unknown job kind: {job.kind}")
+        return job
+    
+    try:
+        message = task(job)
+    except Exception as e:
+        logger.exception('Job %s failed', job.id)
+        job.mark_finished(Job.FAILED, str(e))
+    else:
+        job.mark_finished(Job.SUCCEEDED, message or '')
+    return job
+
+
+def work(stop_event, poll_interval, once=False):
+    """
+    Claim and run jobs until stop_event is set. With once=True, return as
+    soon as the queue is empty.
+    """
+    name = worker_name()
+    while not stop_event.is_set():
+        close_old_connections()
+        requeued = requeue_stale_jobs()
+        if requeued:
+            logger.warning('Worker %s requeued %s stale jobs', name, requeued)
+        job = claim_next_job(name)
+        
+        if job is None:
+            # Housekeeping waits for an idle moment rather than delaying jobs
+            deleted = delete_expired_job_files()
+            if deleted:
+                logger.info('Worker %s deleted %s expired job files', name, deleted)
+            if once:
+                break
+            stop_event.wait(poll_interval)
+            continue
+        
+        logger.info('Worker %s running job %s (%s)', name, job.id, job.kind)
+        run_job(job)
+    
+    connection.close()
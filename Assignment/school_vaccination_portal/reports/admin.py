@@ -1,3 +1,16 @@
 from django.contrib import admin
+from .models import DailyVaccinationRollup, DashboardStat
 
-# Register your models here.
+@admin.register(DashboardStat)
+class DashboardStatAdmin(admin.ModelAdmin):
+    list_display = ('scope', 'key', 'students', 'vaccinated_students', 'updated_at')
+    list_filter = ('scope',)
+    readonly_fields = ('scope', 'key', 'students', 'vaccinated_students', 'updated_at')
+
+
+@admin.register(DailyVaccinationRollup)
+class DailyVaccinationRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'vaccine', 'grade', 'doses', 'updated_at')
+    list_filter = ('vaccine', 'grade')
+    date_hierarchy = 'day'
+    readonly_fields = ('day', 'vaccine', 'grade', 'doses', 'updated_at')
@@ -0,0 +1,159 @@
+# reports/coverage.py
+
+from django.db.models import Count, Exists, F, OuterRef
+from django.db.models.functions import ExtractYear, TruncMonth
+from students.models import Student
+from vaccination_drives.models import Vaccine, StudentVaccination
+from .stats import percentage
+
+# Dimensions a coverage matrix can be grouped by, in the order they are documented
+COVERAGE_DIMENSIONS = ('grade', 'section', 'vaccine', 'month', 'birth_year')
+
+# Group-by expressions over Student (and over StudentVaccination, for month),
+# selected under a by_ prefix so they cannot clash with model field names
+_STUDENT_DIMENSIONS = {
+    'grade': F('grade'),
+    'section': F('section'),
+    'birth_year': ExtractYear('date_of_birth'),
+}
+_VACCINATION_DIMENSIONS = {
+    'grade': F('student__grade'),
+    'section': F('student__section'),
+    'birth_year': ExtractYear('student__date_of_birth'),
+    'vaccine': F('vaccine_id'),
+    'month': TruncMonth('date_administered'),
+}
+
+COUNT_COLUMNS = ('total_students', 'vaccinated_students', 'unvaccinated_students', 'vaccination_percentage')
+
+
+def parse_group_by(values):
+    """
+    Parse group_by query values such as ['grade,vaccine'] or ['grade', 'vaccine'].
+
+    Raises:
+        ValueError: For an unknown or repeated dimension
+    """
+    dimensions = [name.strip() for value in values for name in value.split(',') if name.strip()]
+    unknown = [name for name in dimensions if name not in COVERAGE_DIMENSIONS]
+    if unknown:
+        raise ValueError(
+            f"Unknown group_by dimension: {', '.join(unknown)}. Choose from {', '.join(COVERAGE_DIMENSIONS)}"
+        )
+    if len(set(dimensions)) != len(dimensions):
+        raise ValueError('Each group_by dimension can only be used once')
+    return dimensions
+
+
+def _vaccinated(vaccine_id=None):
+    # Probes the unique (student, vaccine) index once per student instead of
+    # joining vaccinations, so the group counts need no DISTINCT
+    vaccinations = StudentVaccination.objects.filter(student=OuterRef('pk'))
+    if vaccine_id is not None:
+        vaccinations = vaccinations.filter(vaccine_id=vaccine_id)
+    return Exists(vaccinations)
+
+
+def _student_coverage(dimensions, vaccines, vaccine_id, grade):
+    """
+    Students by the student dimensions. The vaccine dimension becomes one
+    conditional count per vaccine in the same GROUP BY (a pivot), and is
+    unpivoted into rows afterwards.
+    """
+    queryset = Student.objects.all()
+    if grade is not None:
+        queryset = queryset.filter(grade=grade)
+
+    student_dimensions = [name for name in dimensions if name != 'vaccine']
+    if 'vaccine' in dimensions:
+        counts = {f'vaccine_{vaccine.id}': Count('pk', filter=_vaccinated(vaccine.id)) for vaccine in vaccines}
+    else:
+        counts = {'vaccinated': Count('pk', filter=_vaccinated(vaccine_id))}
+
+    if student_dimensions:
+        groups = queryset.values(
+            **{f'by_{name}': _STUDENT_DIMENSIONS[name] for name in student_dimensions}
+        ).annotate(total=Count('pk'), **counts).order_by(*(f'by_{name}' for name in student_dimensions))
+    else:
+        groups = [queryset.aggregate(total=Count('pk'), **counts)]
+
+    if 'vaccine' not in dimensions:
+        for group in groups:
+            yield {name: group[f'by_{name}'] for name in student_dimensions}, group['total'], group['vaccinated']
+        return
+
+    rows = [
+        (dict({name: group[f'by_{name}'] for name in student_dimensions}, vaccine=vaccine.name),
+         group['total'], group[f'vaccine_{vaccine.id}'])
+        for group in groups
+        for vaccine in vaccines
+    ]
+    if dimensions[-1] != 'vaccine':
+        # Unpivoting puts vaccine innermost; restore the requested nesting
+        rows.sort(key=lambda row: [row[0][name] for name in dimensions])
+    yield from rows
+
+
+def _vaccination_coverage(dimensions, vaccines, vaccine_id, grade):
+    """
+    Vaccinated students by month administered. Students without a vaccination
+    have no month, so these rows carry no total or unvaccinated count.
+    """
+    queryset = StudentVaccination.objects.all()
+    if vaccine_id is not None:
+        queryset = queryset.filter(vaccine_id=vaccine_id)
+    if grade is not None:
+        queryset = queryset.filter(student__grade=grade)
+
+    names = {vaccine.id: vaccine.name for vaccine in vaccines}
+    groups = queryset.values(
+        **{f'by_{name}': _VACCINATION_DIMENSIONS[name] for name in dimensions}
+    ).annotate(vaccinated=Count('student', distinct=True)).order_by(*(f'by_{name}' for name in dimensions))
+
+    for group in groups:
+        keys = {name: group[f'by_{name}'] for name in dimensions}
+        keys['month'] = keys['month'].strftime('%Y-%m')
+        if 'vaccine' in keys:
+            keys['vaccine'] = names.get(keys['vaccine'])
+        yield keys, None, group['vaccinated']
+
+
+def get_coverage(dimensions, vaccine_id=None, grade=None):
+    """
+    Build a coverage matrix in one GROUP BY query.
+
+    Args:
+        dimensions: Names from COVERAGE_DIMENSIONS, outermost first
+        vaccine_id: Only count this vaccine
+        grade: Only count students in this grade
+
+    Returns:
+        dict: Columnar layout, one list per column with one entry per group:
+            {'group_by': [...], 'rows': n, 'columns': {'grade': [5, 6], ..., 'vaccination_percentage': [...]}}
+    """
+    vaccines = []
+    if 'vaccine' in dimensions:
+        vaccines = Vaccine.objects.order_by('name')
+        if vaccine_id is not None:
+            vaccines = vaccines.filter(id=vaccine_id)
+        vaccines = list(vaccines)
+
+    if 'month' in dimensions:
+        groups = _vaccination_coverage(dimensions, vaccines, vaccine_id, grade)
+    else:
+        groups = _student_coverage(dimensions, vaccines, vaccine_id, grade)
+
+    columns = {name: [] for name in (*dimensions, *COUNT_COLUMNS)}
+    for keys, total, vaccinated in groups:
+        for name in dimensions:
+            columns[name].append(keys[name])
+        columns['total_students'].append(total)
+        columns['vaccinated_students'].append(vaccinated)
+        columns['unvaccinated_students'].append(total - vaccinated if total is not None else None)
+        columns['vaccination_percentage'].append(percentage(vaccinated, total) if total is not None else None)
+
+    return {
+        'group_by': list(dimensions),
+        'rows': len(columns['total_students']),
+        'columns': columns,
+    }
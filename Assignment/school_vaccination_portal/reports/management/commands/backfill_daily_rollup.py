@@ -0,0 +1,27 @@
+# reports/management/commands/backfill_daily_rollup.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from reports.stats import rebuild_daily_rollup
+from school_vaccination_portal.cache import ALL_NAMESPACES, invalidate
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily vaccination rollup behind the time series report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='First day to rebuild (YYYY-MM-DD); defaults to the earliest dose')
+        parser.add_argument('--end-date', help='Last day to rebuild (YYYY-MM-DD); defaults to the latest dose')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options['start_date']) if options['start_date'] else None
+            end_date = date.fromisoformat(options['end_date']) if options['end_date'] else None
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+
+        rows = rebuild_daily_rollup(start_date, end_date)
+        # Drop cached time series responses built from the old rows
+        invalidate(*ALL_NAMESPACES)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} daily rollup rows'))
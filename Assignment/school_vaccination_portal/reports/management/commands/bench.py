@@ -0,0 +1,325 @@
+# reports/management/commands/bench.py
+
+import gc
+import io
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+# Relative growth over the baseline that counts as a regression
+DEFAULT_MAX_SLOWDOWN = 2.0
+DEFAULT_MAX_MEMORY_GROWTH = 1.5
+# Slowdowns smaller than this are mostly noise; never fail them on the ratio alone
+MIN_SLOWDOWN_MS = 5.0
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the hot API endpoints against a freshly built database and '
+            'compare wall time, query count and peak memory with a baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help='Students to create (default: 2000)')
+        parser.add_argument('--vaccines', type=int, default=5, help='Vaccines to create (default: 5)')
+        parser.add_argument('--drives', type=int, default=10, help='Vaccination drives to create (default: 10)')
+        parser.add_argument('--vaccinations', type=int, default=5000,
+                            help='Vaccination records to create (default: 5000)')
+        parser.add_argument('--import-rows', type=int, default=200,
+                            help='Rows in each bulk_import upload (default: 200)')
+        parser.add_argument('--mark-students', type=int, default=100,
+                            help='Students in each mark_students request (default: 100)')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per endpoint; the median is reported (default: 5)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data (default: 0)')
+        parser.add_argument('--only', nargs='+', metavar='NAME', help='Run only these benchmarks')
+        parser.add_argument('--output', default='bench-report.json',
+                            help='Where to write the JSON report (default: bench-report.json)')
+        parser.add_argument('--baseline', help='Report to compare against; regressions make the command fail')
+        parser.add_argument('--max-slowdown', type=float, default=DEFAULT_MAX_SLOWDOWN,
+                            help=f'Allowed wall time ratio over the baseline (default: {DEFAULT_MAX_SLOWDOWN})')
+        parser.add_argument('--max-memory-growth', type=float, default=DEFAULT_MAX_MEMORY_GROWTH,
+                            help=f'Allowed peak memory ratio over the baseline (default: {DEFAULT_MAX_MEMORY_GROWTH})')
+        parser.add_argument('--query-tolerance', type=int, default=0,
+                            help='Extra queries allowed over the baseline (default: 0)')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+
+        benchmarks = self.benchmarks()
+        if options['only']:
+            unknown = set(options['only']) - set(benchmarks)
+            if unknown:
+                raise CommandError(f"Unknown benchmark(s): {', '.join(sorted(unknown))}. "
+                                   f"Choose from {', '.join(benchmarks)}")
+            benchmarks = {name: bench for name, bench in benchmarks.items() if name in options['only']}
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['baseline']}: {e}")
+
+        # A throwaway test database, so the numbers never depend on (or touch) real data
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            # Every run should do the full work: no cached responses, no metric files
+            caches = dict(settings.CACHES)
+            caches[settings.RESPONSE_CACHE_ALIAS] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+            with override_settings(CACHES=caches, METRICS_ENABLED=False):
+                self.stdout.write('Building the benchmark database...')
+                start = time.perf_counter()
+                self.build_dataset()
+                self.stdout.write(f'Built in {time.perf_counter() - start:.1f}s')
+                results = {name: self.run_benchmark(name, bench) for name, bench in benchmarks.items()}
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'scale': {key: options[key] for key in
+                      ('students', 'vaccines', 'drives', 'vaccinations', 'import_rows', 'mark_students', 'seed')},
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is not None:
+            self.compare(report, baseline)
+
+    # Data
+
+    def build_dataset(self):
+        from reports.stats import rebuild_daily_rollup, rebuild_dashboard_stats
+        from students.models import Student
+        from vaccination_drives.models import StudentVaccination, Vaccine, VaccinationDrive
+
+        options = self.options
+        rng = self.rng
+        today = date.today()
+
+        students = Student.objects.bulk_create([
+            self.student(index, prefix='BN') for index in range(options['students'])
+        ], batch_size=1000)
+
+        vaccines = Vaccine.objects.bulk_create([
+            Vaccine(name=f'Bench vaccine {index + 1}') for index in range(max(options['vaccines'], 1))
+        ])
+
+        # Past drives (created in bulk, as save() only allows future dates) hold
+        # the history; one future drive per vaccine takes new mark_students calls
+        drives = VaccinationDrive.objects.bulk_create([
+            VaccinationDrive(
+                vaccine=vaccines[index % len(vaccines)],
+                date=today - timedelta(days=rng.randint(1, 730)),
+                doses_available=options['students'],
+                applicable_grades='1-12', min_grade=1, max_grade=12
+            ) for index in range(max(options['drives'], 1))
+        ])
+        self.future_drives = VaccinationDrive.objects.bulk_create([
+            VaccinationDrive(
+                vaccine=vaccine,
+                date=today + timedelta(days=30 + index),
+                doses_available=options['students'] * 10,
+                applicable_grades='1-12', min_grade=1, max_grade=12
+            ) for index, vaccine in enumerate(vaccines)
+        ])
+
+        drives_by_vaccine = {}
+        for drive in drives:
+            drives_by_vaccine.setdefault(drive.vaccine_id, []).append(drive)
+
+        # Unique (student, vaccine) pairs; at most one dose per vaccine each
+        pairs = rng.sample(range(len(students) * len(vaccines)),
+                           min(options['vaccinations'], len(students) * len(vaccines)))
+        vaccinations = []
+        for pair in pairs:
+            student = students[pair // len(vaccines)]
+            vaccine = vaccines[pair % len(vaccines)]
+            if vaccine.id not in drives_by_vaccine:
+                continue
+            drive = rng.choice(drives_by_vaccine[vaccine.id])
+            vaccinations.append(StudentVaccination(
+                student=student, vaccination_drive=drive, vaccine=vaccine, date_administered=drive.date
+            ))
+        StudentVaccination.objects.bulk_create(vaccinations, batch_size=1000)
+
+        # Bulk inserts skip the signals that maintain the counters
+        call_command('reconcile_doses', stdout=io.StringIO())
+        rebuild_dashboard_stats()
+        rebuild_daily_rollup()
+
+        self.student_ids = [student.id for student in students]
+        self.vaccinated = {(v.student_id, v.vaccine_id) for v in vaccinations}
+        self.import_batch = 0
+
+    def student(self, index, prefix):
+        from students.models import Student
+
+        grade = self.rng.randint(1, 12)
+        return Student(
+            first_name=self.rng.choice(FIRST_NAMES),
+            last_name=self.rng.choice(LAST_NAMES),
+            student_id=f'{prefix}{index:07d}',
+            date_of_birth=date(date.today().year - 5 - grade, 1, 1) + timedelta(days=self.rng.randint(0, 364)),
+            grade=grade,
+            section=self.rng.choice('ABCD')
+        )
+
+    # Benchmarks
+
+    def benchmarks(self):
+        """
+        name -> callable(client) returning a response. Each call must be
+        repeatable: writes use fresh rows every time.
+        """
+        return {
+            'students_list': lambda client: client.get('/api/students/', {'page_size': 50}),
+            'students_retrieve': lambda client: client.get(f'/api/students/{self.rng.choice(self.student_ids)}/'),
+            'students_export_csv': lambda client: client.get('/api/students/export/', {'format': 'csv'}),
+            'students_bulk_import': self.bulk_import,
+            'drives_mark_students': self.mark_students,
+            'check_eligibility': lambda client: client.post('/api/vaccinations/check_eligibility/', {
+                'drive_id': self.future_drives[0].id, 'grade': 7
+            }, content_type='application/json'),
+            'dashboard_stats': lambda client: client.get('/api/reports/dashboard_stats/'),
+            'vaccination_report_json': lambda client: client.get('/api/reports/vaccination_report/', {'page_size': 50}),
+            'vaccination_report_csv': lambda client: client.get('/api/reports/vaccination_report/', {'format': 'csv'}),
+        }
+
+    def bulk_import(self, client):
+        self.import_batch += 1
+        rows = ['first_name,last_name,student_id,date_of_birth,grade,section']
+        for index in range(self.options['import_rows']):
+            student = self.student(index, prefix=f'IM{self.import_batch:03d}')
+            rows.append(f'{student.first_name},{student.last_name},{student.student_id},'
+                        f'{student.date_of_birth.isoformat()},{student.grade},{student.section}')
+        upload = SimpleUploadedFile('students.csv', '\n'.join(rows).encode('utf-8'), content_type='text/csv')
+        return client.post('/api/students/bulk_import/', {'file': upload})
+
+    def mark_students(self, client):
+        # Students not yet given the drive's vaccine, different ones every call
+        drive = self.future_drives[0]
+        student_ids = []
+        for student_id in self.student_ids:
+            if (student_id, drive.vaccine_id) not in self.vaccinated:
+                student_ids.append(student_id)
+                self.vaccinated.add((student_id, drive.vaccine_id))
+                if len(student_ids) == self.options['mark_students']:
+                    break
+        return client.post(f'/api/drives/{drive.id}/mark_students/', {'student_ids': student_ids},
+                           content_type='application/json')
+
+    def run_benchmark(self, name, bench):
+        client = Client()
+
+        def call():
+            response = bench(client)
+            # Streaming responses do their work while being consumed
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            return response, len(body)
+
+        # Warm up (imports, URL resolution, first connection)
+        call()
+
+        timings = []
+        queries = []
+        for _ in range(self.options['repeat']):
+            # Keep collector pauses left over from earlier runs out of the timing
+            gc.collect()
+            gc.disable()
+            try:
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    response, size = call()
+                    timings.append((time.perf_counter() - start) * 1000)
+            finally:
+                gc.enable()
+            queries.append(len(context.captured_queries))
+
+        # Separate run: tracing allocations slows everything down
+        tracemalloc.start()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        result = {
+            'status': response.status_code,
+            'wall_ms': round(statistics.median(timings), 2),
+            'wall_ms_min': round(min(timings), 2),
+            'queries': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'response_bytes': size,
+        }
+        self.stdout.write(f"{name:<26} {result['status']:>4} {result['wall_ms']:>9.2f} ms "
+                          f"{result['queries']:>5} queries {result['peak_memory_kb']:>10.1f} KB peak")
+        if response.status_code >= 400:
+            self.stdout.write(self.style.WARNING(f'  {name} returned {response.status_code}'))
+        return result
+
+    # Baseline
+
+    def compare(self, report, baseline):
+        if baseline.get('scale') != report['scale']:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded at a different scale ({baseline.get('scale')}); comparing anyway"
+            ))
+
+        options = self.options
+        regressions = []
+        for name, current in report['results'].items():
+            previous = baseline.get('results', {}).get(name)
+            if previous is None:
+                self.stdout.write(f'{name}: not in baseline')
+                continue
+
+            if current['status'] != previous['status']:
+                regressions.append(f"{name}: status {previous['status']} -> {current['status']}")
+            if current['queries'] > previous['queries'] + options['query_tolerance']:
+                regressions.append(f"{name}: queries {previous['queries']} -> {current['queries']}")
+            # The fastest run is the least disturbed by the rest of the machine
+            if (current['wall_ms_min'] - previous['wall_ms_min'] > MIN_SLOWDOWN_MS
+                    and current['wall_ms_min'] > previous['wall_ms_min'] * options['max_slowdown']):
+                regressions.append(
+                    f"{name}: wall time {previous['wall_ms_min']} ms -> {current['wall_ms_min']} ms (fastest run)"
+                )
+            if current['peak_memory_kb'] > previous['peak_memory_kb'] * options['max_memory_growth']:
+                regressions.append(
+                    f"{name}: peak memory {previous['peak_memory_kb']} KB -> {current['peak_memory_kb']} KB"
+                )
+
+        if regressions:
+            for line in regressions:
+                self.stderr.write(self.style.ERROR(line))
+            raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}'))
+
+
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Kavya', 'Rohan', 'Saanvi', 'Vihaan', 'Zara', 'Anika', 'Kabir']
+LAST_NAMES = ['Sharma', 'Patel', 'Singh', 'Rao', 'Iyer', 'Gupta', 'Nair', 'Das', 'Mehta', 'Khanna']
@@ -0,0 +1,245 @@
+# reports/management/commands/bench_asgi.py
+
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+EXPORT_PATH = '/api/students/export/'
+EXPORT_PARAMS = {'format': 'csv'}
+INTERACTIVE_PATH = '/api/students/'
+INTERACTIVE_PARAMS = {'page_size': 20}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the WSGI and ASGI handlers under load: several long exports sent to '
+        'slow clients while interactive requests keep arriving. Reports how long the '
+        'interactive requests took and how many threads each handler needed'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000, help='Students to create (default: 5000)')
+        parser.add_argument('--exports', type=int, default=8, help='Concurrent CSV exports (default: 8)')
+        parser.add_argument('--interactive', type=int, default=40,
+                            help='Interactive requests sent while the exports run (default: 40)')
+        parser.add_argument('--interval-ms', type=float, default=25,
+                            help='Time between interactive requests (default: 25)')
+        parser.add_argument('--send-delay-ms', type=float, default=200,
+                            help='How long a slow client takes to receive each export block (default: 200)')
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Worker threads of the simulated WSGI server (default: 4)')
+        parser.add_argument('--only', choices=['wsgi', 'asgi'], help='Run only one of the handlers')
+
+    def handle(self, *args, **options):
+        for key in ('students', 'exports', 'interactive', 'threads'):
+            if options[key] < 1:
+                raise CommandError(f"--{key} must be at least 1")
+        self.options = options
+
+        # A throwaway test database, so the numbers never depend on (or touch) real data
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            caches = dict(settings.CACHES)
+            caches[settings.RESPONSE_CACHE_ALIAS] = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+            with override_settings(CACHES=caches, METRICS_ENABLED=False):
+                self.build_dataset()
+                modes = [options['only']] if options['only'] else ['wsgi', 'asgi']
+                results = {}
+                for mode in modes:
+                    run = self.run_wsgi if mode == 'wsgi' else self.run_asgi
+                    results[mode] = self.measure(run)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{options['exports']} exports with {options['send_delay_ms']:g} ms per block, "
+            f"{options['interactive']} interactive requests every {options['interval_ms']:g} ms"
+        )
+        self.stdout.write(f"{'':<6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'export s':>9} {'wall s':>8} {'threads':>8}")
+        for mode, result in results.items():
+            latency = result['interactive_ms']
+            self.stdout.write(
+                f'{mode:<6} {statistics.median(latency):>9.1f} {percentile(latency, 95):>9.1f} '
+                f'{max(latency):>9.1f} {statistics.median(result["export_s"]):>9.2f} '
+                f"{result['wall_s']:>8.2f} {result['peak_threads']:>8}"
+            )
+            if result['errors']:
+                self.stdout.write(self.style.WARNING(f"  {mode}: {result['errors']} request(s) failed"))
+        if options['only'] is None:
+            wsgi_p95 = percentile(results['wsgi']['interactive_ms'], 95)
+            asgi_p95 = percentile(results['asgi']['interactive_ms'], 95)
+            self.stdout.write(self.style.SUCCESS(
+                f'Interactive p95: {wsgi_p95:.1f} ms under WSGI, {asgi_p95:.1f} ms under ASGI'
+            ))
+
+    def build_dataset(self):
+        from school_vaccination_portal.sample_data import SampleDataOptions, generate_sample_data
+
+        self.stdout.write(f"Building the benchmark database ({self.options['students']} students)...")
+        generate_sample_data(SampleDataOptions(students=self.options['students'], id_prefix='BA'))
+
+    def measure(self, run):
+        # Sample the thread count while the handler works
+        peak = [threading.active_count()]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(0.005):
+                peak[0] = max(peak[0], threading.active_count())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            result = run()
+        finally:
+            done.set()
+            sampler.join()
+        result['wall_s'] = time.perf_counter() - start
+        # Not counting the sampler itself
+        result['peak_threads'] = peak[0] - 1
+        return result
+
+    # WSGI: a fixed pool of threads, each busy until its client has the whole response
+
+    def run_wsgi(self):
+        options = self.options
+        handler = WSGIHandler()
+        factory = RequestFactory()
+        send_delay = options['send_delay_ms'] / 1000
+        errors = []
+
+        def request(path, params, delay):
+            environ = factory.get(path, params).environ
+            statuses = []
+            body = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            size = 0
+            try:
+                for block in body:
+                    size += len(block)
+                    if delay:
+                        time.sleep(delay)
+            finally:
+                body.close()
+            if not statuses[0].startswith('200'):
+                errors.append(statuses[0])
+            return size
+
+        def timed(path, params, delay, queued_at):
+            request(path, params, delay)
+            return time.perf_counter() - queued_at
+
+        # Warm up (imports, URL resolution, first connection)
+        request(INTERACTIVE_PATH, INTERACTIVE_PARAMS, 0)
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            exports = [
+                executor.submit(timed, EXPORT_PATH, EXPORT_PARAMS, send_delay, time.perf_counter())
+                for _ in range(options['exports'])
+            ]
+            interactive = []
+            for _ in range(options['interactive']):
+                time.sleep(options['interval_ms'] / 1000)
+                interactive.append(executor.submit(
+                    timed, INTERACTIVE_PATH, INTERACTIVE_PARAMS, 0, time.perf_counter()
+                ))
+            return {
+                'interactive_ms': [future.result() * 1000 for future in interactive],
+                'export_s': [future.result() for future in exports],
+                'errors': len(errors),
+            }
+
+    # ASGI: one event loop; a request only holds a thread while it runs sync code or queries
+
+    def run_asgi(self):
+        return asyncio.run(self.arun_asgi())
+
+    async def arun_asgi(self):
+        options = self.options
+        handler = ASGIHandler()
+        send_delay = options['send_delay_ms'] / 1000
+        errors = []
+
+        async def request(path, params, delay):
+            finished = asyncio.Event()
+            received = []
+            statuses = []
+            size = 0
+
+            async def receive():
+                if not received:
+                    received.append(True)
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The handler listens for the client going away until it is done
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                nonlocal size
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                elif message['type'] == 'http.response.body':
+                    size += len(message.get('body', b''))
+                    if message.get('more_body') and delay:
+                        await asyncio.sleep(delay)
+
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': urlencode(params).encode(),
+                'headers': [(b'host', b'testserver')],
+                'server': ('testserver', 80),
+                'client': ('127.0.0.1', 0),
+            }
+            try:
+                await handler(scope, receive, send)
+            finally:
+                finished.set()
+            if statuses[0] != 200:
+                errors.append(statuses[0])
+            return size
+
+        async def timed(path, params, delay):
+            start = time.perf_counter()
+            await request(path, params, delay)
+            return time.perf_counter() - start
+
+        await request(INTERACTIVE_PATH, INTERACTIVE_PARAMS, 0)
+
+        exports = [
+            asyncio.create_task(timed(EXPORT_PATH, EXPORT_PARAMS, send_delay))
+            for _ in range(options['exports'])
+        ]
+        interactive = []
+        for _ in range(options['interactive']):
+            await asyncio.sleep(options['interval_ms'] / 1000)
+            interactive.append(asyncio.create_task(timed(INTERACTIVE_PATH, INTERACTIVE_PARAMS, 0)))
+        return {
+            'interactive_ms': [duration * 1000 for duration in await asyncio.gather(*interactive)],
+            'export_s': await asyncio.gather(*exports),
+            'errors': len(errors),
+        }
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
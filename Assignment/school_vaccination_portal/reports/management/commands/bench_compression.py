@@ -0,0 +1,86 @@
+# reports/management/commands/bench_compression.py
+
+import csv
+import io
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from school_vaccination_portal.middleware import brotli, compress_bytes, compress_stream
+
+# Payload sizes (in student rows) to benchmark; roughly 50 bytes per CSV row
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+
+class Command(BaseCommand):
+    help = 'Measure bytes-on-wire and CPU cost of response compression at several payload sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                            help='Numbers of student rows to generate (default: 10 100 1000 10000 100000)')
+        parser.add_argument('--format', choices=['csv', 'json'], default='csv',
+                            help='Payload format to generate (default: csv)')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per measurement; the fastest is reported (default: 3)')
+
+    def handle(self, *args, **options):
+        codecs = [('gzip', 1), ('gzip', 6), ('gzip', 9)]
+        if brotli is not None:
+            codecs.append(('br', None))
+        else:
+            self.stdout.write(self.style.WARNING('brotli is not installed; only gzip is measured'))
+
+        self.stdout.write(f"{'rows':>8} {'raw bytes':>12} {'codec':>8} {'wire bytes':>12} "
+                          f"{'ratio':>7} {'ms':>9} {'MB/s':>8} {'stream bytes':>13}")
+
+        for rows in options['sizes']:
+            payload = self._payload(rows, options['format'])
+
+            for encoding, level in codecs:
+                seconds = min(self._time(compress_bytes, payload, encoding, level or 6)
+                              for _ in range(options['repeat']))
+                wire = len(compress_bytes(payload, encoding, level or 6))
+
+                # Streamed exports flush after every 64KB block, which costs a little ratio
+                blocks = [payload[i:i + 64 * 1024] for i in range(0, len(payload), 64 * 1024)]
+                streamed = sum(len(part) for part in compress_stream(blocks, encoding, level or 6))
+
+                label = encoding if level is None else f'{encoding}-{level}'
+                throughput = len(payload) / seconds / 1e6 if seconds else float('inf')
+                self.stdout.write(f"{rows:>8} {len(payload):>12} {label:>8} {wire:>12} "
+                                  f"{len(payload) / wire:>7.1f} {seconds * 1000:>9.2f} "
+                                  f"{throughput:>8.1f} {streamed:>13}")
+
+    def _time(self, func, payload, encoding, level):
+        start = time.perf_counter()
+        func(payload, encoding, level)
+        return time.perf_counter() - start
+
+    def _payload(self, rows, format_type):
+        # Seeded so runs are comparable
+        rng = random.Random(rows)
+        first_names = ['Aarav', 'Diya', 'Ishaan', 'Kavya', 'Rohan', 'Saanvi', 'Vihaan', 'Zara']
+        last_names = ['Sharma', 'Patel', 'Singh', 'Rao', 'Iyer', 'Gupta', 'Nair', 'Das']
+        records = []
+        for i in range(rows):
+            grade = rng.randint(5, 12)
+            records.append({
+                'student_id': f'GR{grade}{i:06d}',
+                'first_name': rng.choice(first_names),
+                'last_name': rng.choice(last_names),
+                'date_of_birth': (date(2010, 1, 1) + timedelta(days=rng.randint(0, 2500))).isoformat(),
+                'grade': str(grade),
+                'section': rng.choice('ABCD'),
+                'vaccination_status': rng.choice(['Vaccinated', 'Not Vaccinated']),
+            })
+
+        if format_type == 'json':
+            return json.dumps(records).encode('utf-8')
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(records[0].keys()) if records else [])
+        writer.writeheader()
+        writer.writerows(records)
+        return buffer.getvalue().encode('utf-8')
@@ -0,0 +1,54 @@
+# reports/management/commands/explain_queries.py
+
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from students.models import Student
+from vaccination_drives.models import StudentVaccination, VaccinationDrive
+from school_vaccination_portal.utils import filter_vaccination_report
+
+
+class Command(BaseCommand):
+    help = "Print the database's query plan for each hot query (see README, 'Query Plans')"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drive', type=int, help='Drive to use for the sample queries (default: the first one)')
+
+    def hot_queries(self, drive):
+        student_ids = list(Student.objects.order_by('id').values_list('id', flat=True)[:50])
+        today = date.today()
+        
+        vaccinated = StudentVaccination.objects.filter(vaccine_id=drive.vaccine_id).values_list('student_id', flat=True)
+        
+        return [
+            ('Already vaccinated check (mark_students, check_eligibility)',
+             StudentVaccination.objects.filter(
+                 student_id__in=student_ids, vaccine_id=drive.vaccine_id
+             ).values_list('student_id', flat=True)),
+            ('Single dose check (StudentVaccination.clean, serializer validate)',
+             StudentVaccination.objects.filter(student_id=student_ids[0] if student_ids else 0, vaccine_id=drive.vaccine_id)[:1]),
+            ('Eligible students for a drive (first page)',
+             drive.eligible_students().order_by('grade', 'section', 'id')[:51]),
+            ('Vaccination report by vaccine and date range (first page)',
+             filter_vaccination_report({
+                 'vaccine_id': drive.vaccine_id,
+                 'start_date': today - timedelta(days=365),
+                 'end_date': today,
+             }).order_by('date_administered', 'id')[:51]),
+            ('Vaccination report by grade (first page)',
+             filter_vaccination_report({'grade': str(drive.min_grade or 0)}).order_by('date_administered', 'id')[:51]),
+            ('Students not vaccinated with a vaccine (first page)',
+             Student.objects.exclude(id__in=vaccinated).order_by('grade', 'section', 'id')[:51]),
+        ]
+
+    def handle(self, *args, **options):
+        drives = VaccinationDrive.objects.order_by('id')
+        if options['drive']:
+            drives = drives.filter(pk=options['drive'])
+        drive = drives.first()
+        if drive is None:
+            raise CommandError('No vaccination drive found; create one (or load sample data) first')
+        
+        for label, queryset in self.hot_queries(drive):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
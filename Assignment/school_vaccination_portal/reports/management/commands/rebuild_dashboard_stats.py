@@ -0,0 +1,15 @@
+# reports/management/commands/rebuild_dashboard_stats.py
+
+from django.core.management.base import BaseCommand
+from reports.stats import rebuild_dashboard_stats
+from school_vaccination_portal.cache import ALL_NAMESPACES, invalidate
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard statistics table from students and vaccinations'
+
+    def handle(self, *args, **options):
+        rows = rebuild_dashboard_stats()
+        # Drop cached dashboard responses built from the old figures
+        invalidate(*ALL_NAMESPACES)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} dashboard statistics rows'))
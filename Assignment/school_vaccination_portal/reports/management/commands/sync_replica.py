@@ -0,0 +1,35 @@
+# reports/management/commands/sync_replica.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from school_vaccination_portal.cache import ALL_NAMESPACES, invalidate
+from school_vaccination_portal.databases import REPLICA_DATABASE
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary database to the SQLite replica, for trying out '
+        'replica reads locally. PostgreSQL replicas are kept up to date by replication.'
+    )
+
+    def handle(self, *args, **options):
+        if REPLICA_DATABASE not in connections.settings:
+            raise CommandError('No replica is configured; set DATABASE_REPLICA_URL')
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        replica = connections[REPLICA_DATABASE]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('sync_replica only copies SQLite databases')
+        if primary.settings_dict['NAME'] == replica.settings_dict['NAME']:
+            raise CommandError('The primary and the replica are the same file')
+
+        primary.ensure_connection()
+        replica.ensure_connection()
+        # The online backup API copies a consistent snapshot while others keep writing
+        primary.connection.backup(replica.connection)
+
+        # Cached report responses may have been built from the old copy
+        invalidate(*ALL_NAMESPACES)
+        self.stdout.write(self.style.SUCCESS(
+            f"Copied {primary.settings_dict['NAME']} to {replica.settings_dict['NAME']}"
+        ))
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:35
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef
+
+
+def populate_dashboard_stats(apps, schema_editor):
+    DashboardStat = apps.get_model('reports', 'DashboardStat')
+    Student = apps.get_model('students', 'Student')
+    StudentVaccination = apps.get_model('vaccination_drives', 'StudentVaccination')
+
+    vaccinated = StudentVaccination.objects.filter(student=OuterRef('pk'))
+    grades = Student.objects.order_by().values('grade').annotate(
+        students=Count('id'),
+        vaccinated_students=Count('id', filter=Exists(vaccinated))
+    )
+    vaccines = StudentVaccination.objects.order_by().values('vaccination_drive__vaccine').annotate(
+        vaccinated_students=Count('student', distinct=True)
+    )
+
+    rows = [DashboardStat(scope='grade', key=grade['grade'], students=grade['students'],
+                          vaccinated_students=grade['vaccinated_students']) for grade in grades]
+    rows.append(DashboardStat(scope='total', key=0, students=sum(row.students for row in rows),
+                              vaccinated_students=sum(row.vaccinated_students for row in rows)))
+    rows.extend(DashboardStat(scope='vaccine', key=vaccine['vaccination_drive__vaccine'],
+                              vaccinated_students=vaccine['vaccinated_students']) for vaccine in vaccines)
+    DashboardStat.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('students', '0003_student_grade_integer'),
+        ('vaccination_drives', '0004_vaccinationdrive_grade_range'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('total', 'Total'), ('grade', 'Grade'), ('vaccine', 'Vaccine')], max_length=10)),
+                ('key', models.PositiveIntegerField(default=0)),
+                ('students', models.PositiveIntegerField(default=0)),
+                ('vaccinated_students', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('scope', 'key')},
+            },
+        ),
+        migrations.RunPython(populate_dashboard_stats, migrations.RunPython.noop),
+    ]
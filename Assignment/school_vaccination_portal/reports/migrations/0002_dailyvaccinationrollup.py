@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_daily_rollup(apps, schema_editor):
+    DailyVaccinationRollup = apps.get_model('reports', 'DailyVaccinationRollup')
+    StudentVaccination = apps.get_model('vaccination_drives', 'StudentVaccination')
+
+    groups = StudentVaccination.objects.order_by().values(
+        'date_administered', 'vaccine_id', 'student__grade'
+    ).annotate(doses=Count('id'))
+    DailyVaccinationRollup.objects.bulk_create([
+        DailyVaccinationRollup(day=group['date_administered'], vaccine_id=group['vaccine_id'],
+                               grade=group['student__grade'], doses=group['doses'])
+        for group in groups
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('vaccination_drives', '0005_studentvaccination_vaccine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyVaccinationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('grade', models.PositiveSmallIntegerField()),
+                ('doses', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vaccine', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='vaccination_drives.vaccine')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vaccine', 'day'], name='rollup_vaccine_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'vaccine', 'grade'), name='rollup_day_vaccine_grade_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_daily_rollup, migrations.RunPython.noop),
+    ]
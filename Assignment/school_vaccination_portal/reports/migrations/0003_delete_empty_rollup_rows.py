@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:35
+
+from django.db import migrations
+
+
+def delete_empty_rollup_rows(apps, schema_editor):
+    # Left behind by decrements before DailyVaccinationRollup.adjust deleted them
+    DailyVaccinationRollup = apps.get_model('reports', 'DailyVaccinationRollup')
+    DailyVaccinationRollup.objects.filter(doses=0).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_dailyvaccinationrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_empty_rollup_rows, migrations.RunPython.noop),
+    ]
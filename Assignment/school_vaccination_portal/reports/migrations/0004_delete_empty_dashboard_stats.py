@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:35
+
+from django.db import migrations
+
+
+def delete_empty_dashboard_stats(apps, schema_editor):
+    # Left behind by decrements before DashboardStat.adjust deleted them
+    DashboardStat = apps.get_model('reports', 'DashboardStat')
+    DashboardStat.objects.filter(students=0, vaccinated_students=0).exclude(scope='total').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_delete_empty_rollup_rows'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_empty_dashboard_stats, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,107 @@
 from django.db import models
+from django.db.models.functions import Greatest
 
-# Create your models here.
+
+class DashboardStat(models.Model):
+    """
+    Running totals behind the dashboard, kept up to date by signals (see
+    reports/signals.py) and rebuilt with `manage.py rebuild_dashboard_stats`.
+    
+    One row holds the school-wide totals, one row per grade, and one row per
+    vaccine (where vaccinated_students counts students given that vaccine).
+    """
+    SCOPE_TOTAL = 'total'
+    SCOPE_GRADE = 'grade'
+    SCOPE_VACCINE = 'vaccine'
+    SCOPE_CHOICES = [
+        (SCOPE_TOTAL, 'Total'),
+        (SCOPE_GRADE, 'Grade'),
+        (SCOPE_VACCINE, 'Vaccine'),
+    ]
+    
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    # Grade number or vaccine id; 0 for the total row
+    key = models.PositiveIntegerField(default=0)
+    students = models.PositiveIntegerField(default=0)
+    vaccinated_students = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('scope', 'key')
+    
+    @classmethod
+    def adjust(cls, scope, key, students=0, vaccinated_students=0):
+        """
+        Atomically add to one row's counters, creating the row if needed.
+        Grade and vaccine rows are deleted once both counters are zero, as
+        the rebuild only writes rows for grades and vaccines in use.
+        """
+        if not students and not vaccinated_students:
+            return
+        
+        queryset = cls.objects.filter(scope=scope, key=key)
+        changes = {
+            # Never let a drifted counter go negative
+            'students': Greatest(models.F('students') + students, 0),
+            'vaccinated_students': Greatest(models.F('vaccinated_students') + vaccinated_students, 0),
+        }
+        if not queryset.update(**changes):
+            if scope == cls.SCOPE_TOTAL or students > 0 or vaccinated_students > 0:
+                cls.objects.get_or_create(scope=scope, key=key)
+                queryset.update(**changes)
+        elif scope != cls.SCOPE_TOTAL and (students < 0 or vaccinated_students < 0):
+            queryset.filter(students=0, vaccinated_students=0).delete()
+    
+    def __str__(self):
+        if self.scope == self.SCOPE_TOTAL:
+            return 'All students'
+        return f"{self.get_scope_display()} {self.key}"
+
+
+class DailyVaccinationRollup(models.Model):
+    """
+    Doses given per day, vaccine and (current) student grade, kept up to date
+    by signals (see reports/signals.py) so the time series report never has
+    to scan StudentVaccination. Rebuilt with `manage.py backfill_daily_rollup`.
+    """
+    day = models.DateField()
+    # No database constraint: the row is dropped by a Vaccine post_delete
+    # receiver, after the cascaded vaccinations have been uncounted
+    vaccine = models.ForeignKey(
+        'vaccination_drives.Vaccine', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+'
+    )
+    grade = models.PositiveSmallIntegerField()
+    doses = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            # Leads with day, so it also serves date range scans
+            models.UniqueConstraint(fields=['day', 'vaccine', 'grade'], name='rollup_day_vaccine_grade_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['vaccine', 'day'], name='rollup_vaccine_day_idx'),
+        ]
+    
+    @classmethod
+    def adjust(cls, day, vaccine_id, grade, doses):
+        """
+        Atomically add to one row's dose count, creating the row if needed
+        and deleting it once it drops to zero, as the rebuild never writes
+        empty rows.
+        """
+        if not doses:
+            return
+        
+        queryset = cls.objects.filter(day=day, vaccine_id=vaccine_id, grade=grade)
+        # Never let a drifted counter go negative
+        changes = {'doses': Greatest(models.F('doses') + doses, 0)}
+        if doses < 0:
+            if queryset.update(**changes):
+                queryset.filter(doses=0).delete()
+        elif not queryset.update(**changes):
+            cls.objects.get_or_create(day=day, vaccine_id=vaccine_id, grade=grade)
+            queryset.update(**changes)
+    
+    def __str__(self):
+        return f"{self.day} vaccine {self.vaccine_id} grade {self.grade}: {self.doses}"
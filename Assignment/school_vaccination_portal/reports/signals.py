@@ -0,0 +1,148 @@
+# reports/signals.py
+
+import threading
+from collections import Counter
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from students.models import Student
+from vaccination_drives.models import Vaccine, VaccinationDrive, StudentVaccination
+from .models import DailyVaccinationRollup, DashboardStat
+from .stats import count_doses, count_students, count_vaccinated_students, count_vaccines, move_student_doses
+
+
+def _student_grade(student_id):
+    return Student.objects.filter(pk=student_id).values_list('grade', flat=True).first()
+
+
+def _has_vaccinations(student_id):
+    return StudentVaccination.objects.filter(student_id=student_id).exists()
+
+
+@receiver(post_save, sender=Student)
+def count_student_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    
+    if created:
+        count_students([instance.grade])
+    else:
+        # Move the student's counts to their new grade
+        loaded_grade = getattr(instance, '_loaded_grade', None)
+        if loaded_grade is not None and loaded_grade != instance.grade:
+            count_students([loaded_grade], -1)
+            count_students([instance.grade])
+            if _has_vaccinations(instance.pk):
+                count_vaccinated_students([loaded_grade], -1)
+                count_vaccinated_students([instance.grade])
+                move_student_doses(instance.pk, loaded_grade, instance.grade)
+    
+    instance._loaded_grade = instance.grade
+
+
+@receiver(post_delete, sender=Student)
+def count_student_on_delete(sender, instance, **kwargs):
+    # Their vaccinations were deleted (and counted) first by the cascade
+    count_students([instance.grade], -1)
+
+
+def _add_vaccination(student_id, vaccine_id, day):
+    grade = _student_grade(student_id)
+    count_vaccines([vaccine_id])
+    count_doses([(day, vaccine_id, grade)])
+    # The row is already saved, so a first vaccination leaves exactly one
+    if StudentVaccination.objects.filter(student_id=student_id).count() == 1:
+        count_vaccinated_students([grade])
+
+
+def _remove_vaccination(student_id, vaccine_id, day):
+    grade = _student_grade(student_id)
+    count_vaccines([vaccine_id], -1)
+    count_doses([(day, vaccine_id, grade)], -1)
+    if grade is not None and not _has_vaccinations(student_id):
+        count_vaccinated_students([grade], -1)
+
+
+@receiver(post_save, sender=StudentVaccination)
+def count_vaccination_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    
+    if created:
+        _add_vaccination(instance.student_id, instance.vaccine_id, instance.date_administered)
+        return
+    
+    # Treat a change of student or drive as removing the old record and adding the new one
+    loaded_student_id = getattr(instance, '_loaded_student_id', None)
+    old_vaccine_id = getattr(instance, '_loaded_vaccine_id', None)
+    old_day = getattr(instance, '_loaded_date_administered', None)
+    if loaded_student_id is None or old_vaccine_id is None:
+        return
+    
+    new_vaccine_id = instance.vaccine_id
+    if loaded_student_id != instance.student_id:
+        _remove_vaccination(loaded_student_id, old_vaccine_id, old_day)
+        _add_vaccination(instance.student_id, new_vaccine_id, instance.date_administered)
+    elif old_vaccine_id != new_vaccine_id or old_day != instance.date_administered:
+        # Same student, still vaccinated; only the vaccine totals and the dose's day move
+        count_vaccines([old_vaccine_id], -1)
+        count_vaccines([new_vaccine_id])
+        grade = _student_grade(instance.student_id)
+        count_doses([(old_day, old_vaccine_id, grade)], -1)
+        count_doses([(instance.date_administered, new_vaccine_id, grade)])
+
+
+# Vaccinations queued for deletion per student, so that when several of one
+# student's vaccinations are deleted together (e.g. by deleting the student)
+# only the last post_delete decides whether they are still vaccinated
+_pending = threading.local()
+
+
+def _pending_deletes():
+    if not hasattr(_pending, 'students'):
+        _pending.students = Counter()
+    return _pending.students
+
+
+@receiver(pre_delete, sender=StudentVaccination)
+def queue_vaccination_delete(sender, instance, **kwargs):
+    _pending_deletes()[instance.student_id] += 1
+
+
+@receiver(post_delete, sender=StudentVaccination)
+def count_vaccination_on_delete(sender, instance, **kwargs):
+    pending = _pending_deletes()
+    pending[instance.student_id] -= 1
+    if pending[instance.student_id] > 0:
+        count_vaccines([instance.vaccine_id], -1)
+        count_doses([(instance.date_administered, instance.vaccine_id, _student_grade(instance.student_id))], -1)
+        return
+    
+    del pending[instance.student_id]
+    _remove_vaccination(instance.student_id, instance.vaccine_id, instance.date_administered)
+
+
+@receiver(post_save, sender=VaccinationDrive)
+def move_vaccine_counts(sender, instance, created, raw=False, **kwargs):
+    # VaccinationDrive.save() copies a new vaccine onto the drive's
+    # vaccinations with a plain UPDATE, so move their counts here
+    if raw or created or not instance.vaccine_changed:
+        return
+    
+    moved = StudentVaccination.objects.filter(vaccination_drive=instance).order_by().values(
+        'date_administered', 'student__grade'
+    ).annotate(doses=Count('id'))
+    total = 0
+    for group in moved:
+        day, grade, doses = group['date_administered'], group['student__grade'], group['doses']
+        DailyVaccinationRollup.adjust(day, instance._loaded_vaccine_id, grade, -doses)
+        DailyVaccinationRollup.adjust(day, instance.vaccine_id, grade, doses)
+        total += doses
+    DashboardStat.adjust(DashboardStat.SCOPE_VACCINE, instance._loaded_vaccine_id, vaccinated_students=-total)
+    DashboardStat.adjust(DashboardStat.SCOPE_VACCINE, instance.vaccine_id, vaccinated_students=total)
+
+
+@receiver(post_delete, sender=Vaccine)
+def drop_vaccine_stats(sender, instance, **kwargs):
+    DashboardStat.objects.filter(scope=DashboardStat.SCOPE_VACCINE, key=instance.pk).delete()
+    DailyVaccinationRollup.objects.filter(vaccine_id=instance.pk).delete()
@@ -0,0 +1,212 @@
+# reports/stats.py
+
+from collections import Counter
+from datetime import date, timedelta
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+from students.models import Student
+from vaccination_drives.models import Vaccine, VaccinationDrive, StudentVaccination
+from .models import DailyVaccinationRollup, DashboardStat
+
+
+def count_students(grades, delta=1):
+    """
+    Add delta to the student totals for each grade in `grades`.
+    """
+    for grade, count in Counter(grades).items():
+        DashboardStat.adjust(DashboardStat.SCOPE_GRADE, grade, students=count * delta)
+    if grades:
+        DashboardStat.adjust(DashboardStat.SCOPE_TOTAL, 0, students=len(grades) * delta)
+
+
+def count_vaccinated_students(grades, delta=1):
+    """
+    Add delta to the vaccinated totals for each grade in `grades`, one
+    entry per student who gained their first (or lost their last) vaccination.
+    """
+    for grade, count in Counter(grades).items():
+        DashboardStat.adjust(DashboardStat.SCOPE_GRADE, grade, vaccinated_students=count * delta)
+    if grades:
+        DashboardStat.adjust(DashboardStat.SCOPE_TOTAL, 0, vaccinated_students=len(grades) * delta)
+
+
+def count_vaccines(vaccine_ids, delta=1):
+    for vaccine_id, count in Counter(vaccine_ids).items():
+        DashboardStat.adjust(DashboardStat.SCOPE_VACCINE, vaccine_id, vaccinated_students=count * delta)
+
+
+def count_doses(doses, delta=1):
+    """
+    Add delta to the daily rollup for each (day, vaccine_id, grade) in `doses`.
+    """
+    for (day, vaccine_id, grade), count in Counter(doses).items():
+        if grade is not None:
+            DailyVaccinationRollup.adjust(day, vaccine_id, grade, count * delta)
+
+
+def move_student_doses(student_id, old_grade, new_grade):
+    """
+    Move a student's doses in the daily rollup after a grade change.
+    """
+    doses = list(StudentVaccination.objects.filter(
+        student_id=student_id
+    ).values_list('date_administered', 'vaccine_id'))
+    count_doses([(day, vaccine_id, old_grade) for day, vaccine_id in doses], -1)
+    count_doses([(day, vaccine_id, new_grade) for day, vaccine_id in doses])
+
+
+def record_vaccinations_created(vaccinations):
+    """
+    Update the stats for StudentVaccination rows saved with bulk_create,
+    which does not send post_save.
+    """
+    if not vaccinations:
+        return
+    
+    count_vaccines([v.vaccine_id for v in vaccinations])
+    count_doses([(v.date_administered, v.vaccine_id, v.student.grade) for v in vaccinations])
+    
+    # Students whose only vaccination is one of the new ones are newly vaccinated
+    student_ids = {v.student_id for v in vaccinations}
+    first_time = set(StudentVaccination.objects.filter(
+        student_id__in=student_ids
+    ).values('student_id').annotate(total=Count('id')).filter(total=1).values_list('student_id', flat=True))
+    
+    grades = {v.student_id: v.student.grade for v in vaccinations if v.student_id in first_time}
+    count_vaccinated_students(list(grades.values()))
+
+
+def rebuild_dashboard_stats():
+    """
+    Recompute every DashboardStat row from the source tables.
+    
+    Returns:
+        int: Number of rows written
+    """
+    with transaction.atomic():
+        vaccinated = StudentVaccination.objects.filter(student=OuterRef('pk'))
+        grades = Student.objects.order_by().values('grade').annotate(
+            students=Count('id'),
+            vaccinated_students=Count('id', filter=Exists(vaccinated))
+        )
+        vaccines = StudentVaccination.objects.order_by().values('vaccine').annotate(
+            vaccinated_students=Count('student', distinct=True)
+        )
+        
+        rows = [DashboardStat(
+            scope=DashboardStat.SCOPE_GRADE,
+            key=grade['grade'],
+            students=grade['students'],
+            vaccinated_students=grade['vaccinated_students']
+        ) for grade in grades]
+        rows.append(DashboardStat(
+            scope=DashboardStat.SCOPE_TOTAL,
+            key=0,
+            students=sum(row.students for row in rows),
+            vaccinated_students=sum(row.vaccinated_students for row in rows)
+        ))
+        rows.extend(DashboardStat(
+            scope=DashboardStat.SCOPE_VACCINE,
+            key=vaccine['vaccine'],
+            vaccinated_students=vaccine['vaccinated_students']
+        ) for vaccine in vaccines)
+        
+        DashboardStat.objects.all().delete()
+        DashboardStat.objects.bulk_create(rows)
+    
+    return len(rows)
+
+
+def rebuild_daily_rollup(start_date=None, end_date=None):
+    """
+    Recompute the daily rollup from StudentVaccination, for every day or
+    only for days between start_date and end_date (inclusive).
+    
+    Returns:
+        int: Number of rows written
+    """
+    vaccinations = StudentVaccination.objects.all()
+    rollups = DailyVaccinationRollup.objects.all()
+    if start_date:
+        vaccinations = vaccinations.filter(date_administered__gte=start_date)
+        rollups = rollups.filter(day__gte=start_date)
+    if end_date:
+        vaccinations = vaccinations.filter(date_administered__lte=end_date)
+        rollups = rollups.filter(day__lte=end_date)
+    
+    with transaction.atomic():
+        groups = vaccinations.order_by().values(
+            'date_administered', 'vaccine_id', 'student__grade'
+        ).annotate(doses=Count('id'))
+        rows = [DailyVaccinationRollup(
+            day=group['date_administered'],
+            vaccine_id=group['vaccine_id'],
+            grade=group['student__grade'],
+            doses=group['doses']
+        ) for group in groups]
+        
+        rollups.delete()
+        DailyVaccinationRollup.objects.bulk_create(rows, batch_size=1000)
+    
+    return len(rows)
+
+
+def percentage(part, whole):
+    """
+    `part` as a percentage of `whole`, to two decimal places; 0 when whole is 0.
+    """
+    if whole > 0:
+        return round((part / whole) * 100, 2)
+    return 0
+
+
+def get_dashboard_stats():
+    """
+    Build the dashboard summary from the precomputed DashboardStat rows.
+    
+    Returns:
+        dict: Totals plus per-grade and per-vaccine breakdowns
+    """
+    total = None
+    by_grade = []
+    by_vaccine = []
+    for stat in DashboardStat.objects.order_by('scope', 'key'):
+        if stat.scope == DashboardStat.SCOPE_TOTAL:
+            total = stat
+        elif stat.scope == DashboardStat.SCOPE_GRADE:
+            if stat.students:
+                by_grade.append(stat)
+        elif stat.vaccinated_students:
+            by_vaccine.append(stat)
+    
+    total_students = total.students if total else 0
+    vaccinated_students = total.vaccinated_students if total else 0
+    
+    # Drives move in and out of the 30-day window by date alone, so this stays
+    # a (cheap, indexed) query rather than a stored counter
+    thirty_days_later = date.today() + timedelta(days=30)
+    upcoming_drives = VaccinationDrive.objects.filter(
+        date__gte=date.today(),
+        date__lte=thirty_days_later
+    ).count()
+    
+    vaccines = Vaccine.objects.in_bulk([stat.key for stat in by_vaccine]) if by_vaccine else {}
+    
+    return {
+        'total_students': total_students,
+        'vaccinated_students': vaccinated_students,
+        'vaccination_percentage': percentage(vaccinated_students, total_students),
+        'upcoming_drives': upcoming_drives,
+        'by_grade': [{
+            'grade': stat.key,
+            'total_students': stat.students,
+            'vaccinated_students': stat.vaccinated_students,
+            'vaccination_percentage': percentage(stat.vaccinated_students, stat.students)
+        } for stat in by_grade],
+        'by_vaccine': [{
+            'vaccine_id': stat.key,
+            'vaccine_name': vaccines[stat.key].name,
+            'vaccinated_students': stat.vaccinated_students,
+            'vaccination_percentage': percentage(stat.vaccinated_students, total_students)
+        } for stat in by_vaccine if stat.key in vaccines],
+    }
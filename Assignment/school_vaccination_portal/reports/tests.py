@@ -1,3 +1,291 @@
+from datetime import date, timedelta
+
 from django.test import TestCase
+from school_vaccination_portal.cache import get_response_cache
+from students.models import Student
+from vaccination_drives.models import StudentVaccination, Vaccine, VaccinationDrive
+from .models import DailyVaccinationRollup, DashboardStat
+from .stats import rebuild_daily_rollup, rebuild_dashboard_stats
+
+
+class CounterMaintenanceTests(TestCase):
+    """
+    DashboardStat and DailyVaccinationRollup are kept up to date by signals;
+    after any sequence of changes they must equal a rebuild from scratch.
+    """
+
+    def setUp(self):
+        self.polio = Vaccine.objects.create(name='Polio')
+        self.mmr = Vaccine.objects.create(name='MMR')
+        self.drive = VaccinationDrive.objects.create(
+            vaccine=self.polio, date=date.today() + timedelta(days=20), doses_available=100, applicable_grades='5-8'
+        )
+        self.mmr_drive = VaccinationDrive.objects.create(
+            vaccine=self.mmr, date=date.today() + timedelta(days=20), doses_available=100, applicable_grades='5-8'
+        )
+        self.students = [
+            Student.objects.create(first_name=f'First{i}', last_name=f'Last{i}', student_id=f'RP{i:03d}',
+                                   date_of_birth=date(2012, 1, 1), grade=5 + i % 2, section='A')
+            for i in range(4)
+        ]
+
+    def vaccinate(self, student, days_ago=0, drive=None):
+        return StudentVaccination.objects.create(
+            student=student, vaccination_drive=drive or self.drive,
+            date_administered=date.today() - timedelta(days=days_ago)
+        )
+
+    def snapshot(self):
+        return (
+            sorted(DashboardStat.objects.values_list('scope', 'key', 'students', 'vaccinated_students')),
+            sorted(DailyVaccinationRollup.objects.values_list('day', 'vaccine_id', 'grade', 'doses')),
+        )
+
+    def assert_matches_rebuild(self):
+        maintained = self.snapshot()
+        rebuild_dashboard_stats()
+        rebuild_daily_rollup()
+        self.assertEqual(maintained, self.snapshot())
+
+    def test_creating_students_and_vaccinations(self):
+        self.vaccinate(self.students[0])
+        self.vaccinate(self.students[0], days_ago=1, drive=self.mmr_drive)
+        self.vaccinate(self.students[1])
+
+        self.assertEqual(DashboardStat.objects.get(scope=DashboardStat.SCOPE_TOTAL).vaccinated_students, 2)
+        self.assert_matches_rebuild()
+
+    def test_grade_change_moves_students_and_doses(self):
+        self.vaccinate(self.students[0], days_ago=2)
+        self.vaccinate(self.students[0], drive=self.mmr_drive)
+
+        student = Student.objects.get(pk=self.students[0].pk)
+        student.grade = 8
+        student.save()
+
+        self.assertEqual(DailyVaccinationRollup.objects.filter(grade=8).count(), 2)
+        self.assert_matches_rebuild()
+
+    def test_moving_a_vaccination_to_another_drive_and_day(self):
+        vaccination = self.vaccinate(self.students[0], days_ago=3)
+
+        vaccination.vaccination_drive = self.mmr_drive
+        vaccination.date_administered = date.today()
+        vaccination.save()
+
+        self.assert_matches_rebuild()
+
+    def test_changing_a_drives_vaccine(self):
+        self.vaccinate(self.students[0])
+        self.vaccinate(self.students[1])
+        self.vaccinate(self.students[1], drive=self.mmr_drive)
+
+        drive = VaccinationDrive.objects.get(pk=self.drive.pk)
+        drive.vaccine = Vaccine.objects.create(name='Hepatitis B')
+        drive.save()
+
+        self.assert_matches_rebuild()
+
+    def test_deletes_remove_rows_that_reach_zero(self):
+        self.vaccinate(self.students[0], days_ago=1)
+        self.vaccinate(self.students[0], drive=self.mmr_drive)
+        self.vaccinate(self.students[1]).delete()
+
+        # Student 1's only dose is gone; deleting student 0 cascades to both of theirs
+        Student.objects.get(pk=self.students[0].pk).delete()
+        Student.objects.get(pk=self.students[2].pk).delete()
+
+        self.assertFalse(DailyVaccinationRollup.objects.exists())
+        self.assertFalse(DashboardStat.objects.filter(scope=DashboardStat.SCOPE_VACCINE).exists())
+        self.assertFalse(DashboardStat.objects.filter(scope=DashboardStat.SCOPE_GRADE, key=5).exists())
+        self.assert_matches_rebuild()
+
+    def test_grade_emptied_by_a_move_is_removed(self):
+        for student in Student.objects.filter(grade=6):
+            student.grade = 7
+            student.save()
+
+        self.assertFalse(DashboardStat.objects.filter(scope=DashboardStat.SCOPE_GRADE, key=6).exists())
+        self.assert_matches_rebuild()
+
+    def test_mark_students_records_bulk_created_vaccinations(self):
+        self.vaccinate(self.students[0])
+
+        response = self.client.post(f'/api/drives/{self.drive.pk}/mark_students/', {
+            'student_ids': [student.pk for student in self.students]
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(DashboardStat.objects.get(scope=DashboardStat.SCOPE_TOTAL).vaccinated_students, 4)
+        self.assert_matches_rebuild()
+
+
+class CoverageTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.polio = Vaccine.objects.create(name='Polio')
+        self.mmr = Vaccine.objects.create(name='MMR')
+        self.polio_drive = VaccinationDrive.objects.create(
+            vaccine=self.polio, date=date.today() + timedelta(days=20), doses_available=100, applicable_grades='5-8'
+        )
+        self.mmr_drive = VaccinationDrive.objects.create(
+            vaccine=self.mmr, date=date.today() + timedelta(days=20), doses_available=100, applicable_grades='5-8'
+        )
+
+    def create_students(self, grade, count):
+        return [
+            Student.objects.create(first_name=f'First{i}', last_name=f'Last{i}', student_id=f'CV{grade}{i:03d}',
+                                   date_of_birth=date(2012, 1, 1), grade=grade, section='A')
+            for i in range(count)
+        ]
+
+    def coverage(self, query):
+        response = self.client.get(f'/api/reports/coverage/{query}', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def vaccinate(self, students, drive):
+        for student in students:
+            StudentVaccination.objects.create(student=student, vaccination_drive=drive)
+
+    def test_by_grade(self):
+        grade_5 = self.create_students(5, 4)
+        self.create_students(6, 3)
+        self.vaccinate(grade_5[:3], self.polio_drive)
+        # A second vaccine does not count the student twice
+        self.vaccinate(grade_5[:1], self.mmr_drive)
+
+        body = self.coverage('?group_by=grade')
+
+        self.assertEqual(body['group_by'], ['grade'])
+        self.assertEqual(body['rows'], 2)
+        self.assertEqual(body['columns'], {
+            'grade': [5, 6],
+            'total_students': [4, 3],
+            'vaccinated_students': [3, 0],
+            'unvaccinated_students': [1, 3],
+            'vaccination_percentage': [75.0, 0],
+        })
+
+    def test_by_vaccine(self):
+        students = self.create_students(5, 3)
+        self.vaccinate(students[:2], self.polio_drive)
+        self.vaccinate(students[:1], self.mmr_drive)
+
+        columns = self.coverage('?group_by=vaccine')['columns']
+
+        # Every vaccine is listed, ordered by name, against every student
+        self.assertEqual(columns['vaccine'], ['MMR', 'Polio'])
+        self.assertEqual(columns['total_students'], [3, 3])
+        self.assertEqual(columns['vaccinated_students'], [1, 2])
+        self.assertEqual(columns['vaccination_percentage'], [33.33, 66.67])
+
+        filtered = self.coverage(f'?group_by=vaccine&vaccine_id={self.polio.pk}')['columns']
+        self.assertEqual(filtered['vaccine'], ['Polio'])
+
+    def test_by_grade_and_vaccine(self):
+        self.vaccinate(self.create_students(5, 2)[:1], self.polio_drive)
+        self.vaccinate(self.create_students(6, 1), self.mmr_drive)
+
+        columns = self.coverage('?group_by=grade,vaccine')['columns']
+
+        self.assertEqual(list(zip(columns['grade'], columns['vaccine'], columns['vaccinated_students'])), [
+            (5, 'MMR', 0), (5, 'Polio', 1), (6, 'MMR', 1), (6, 'Polio', 0),
+        ])
+
+    def test_no_students(self):
+        self.assertEqual(self.coverage('?group_by=grade'), {
+            'group_by': ['grade'], 'rows': 0, 'columns': {
+                'grade': [], 'total_students': [], 'vaccinated_students': [],
+                'unvaccinated_students': [], 'vaccination_percentage': [],
+            },
+        })
+        # Ungrouped, the single row is all zeros rather than a division by zero
+        self.assertEqual(self.coverage('')['columns'], {
+            'total_students': [0], 'vaccinated_students': [0],
+            'unvaccinated_students': [0], 'vaccination_percentage': [0],
+        })
+        self.create_students(5, 2)
+        self.assertEqual(self.coverage('?group_by=grade&grade=6')['rows'], 0)
+
+    def test_invalid_parameters(self):
+        for query in ('?group_by=school', '?group_by=grade,grade', '?grade=five', '?vaccine_id=x'):
+            response = self.client.get(f'/api/reports/coverage/{query}', HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', response.json())
+
+
+class TimeseriesTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.polio = Vaccine.objects.create(name='Polio')
+        self.mmr = Vaccine.objects.create(name='MMR')
+        drives = {
+            vaccine: VaccinationDrive.objects.create(
+                vaccine=vaccine, date=date.today() + timedelta(days=20), doses_available=100, applicable_grades='5-8'
+            ) for vaccine in (self.polio, self.mmr)
+        }
+        # 3 March 2025 is a Monday; 1 April falls in the week of 31 March
+        doses = [
+            ('2025-03-03', self.polio, 5), ('2025-03-03', self.polio, 5), ('2025-03-04', self.mmr, 5),
+            ('2025-03-10', self.polio, 5), ('2025-04-01', self.mmr, 6),
+        ]
+        for i, (day, vaccine, grade) in enumerate(doses):
+            student = Student.objects.create(first_name=f'First{i}', last_name=f'Last{i}', student_id=f'TS{i:03d}',
+                                             date_of_birth=date(2012, 1, 1), grade=grade, section='A')
+            StudentVaccination.objects.create(student=student, vaccination_drive=drives[vaccine],
+                                              date_administered=date.fromisoformat(day))
+
+    def timeseries(self, query):
+        response = self.client.get(f'/api/reports/timeseries/{query}', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_periods(self):
+        expected = {
+            'day': {'period': ['2025-03-03', '2025-03-04', '2025-03-10', '2025-04-01'], 'doses': [2, 1, 1, 1]},
+            'week': {'period': ['2025-03-03', '2025-03-10', '2025-03-31'], 'doses': [3, 1, 1]},
+            'month': {'period': ['2025-03-01', '2025-04-01'], 'doses': [4, 1]},
+        }
+        for granularity, columns in expected.items():
+            body = self.timeseries(f'?granularity={granularity}')
+            self.assertEqual(body['granularity'], granularity)
+            self.assertEqual(body['rows'], len(columns['doses']))
+            self.assertEqual(body['columns'], columns)
+
+        # Days are the default
+        self.assertEqual(self.timeseries('')['columns'], expected['day'])
+
+    def test_series(self):
+        columns = self.timeseries('?granularity=week&series=vaccine')['columns']
+        self.assertEqual(list(zip(columns['period'], columns['vaccine'], columns['doses'])), [
+            ('2025-03-03', 'Polio', 2), ('2025-03-03', 'MMR', 1), ('2025-03-10', 'Polio', 1), ('2025-03-31', 'MMR', 1),
+        ])
+
+        columns = self.timeseries('?granularity=month&series=grade')['columns']
+        self.assertEqual(list(zip(columns['period'], columns['grade'], columns['doses'])), [
+            ('2025-03-01', 5, 4), ('2025-04-01', 6, 1),
+        ])
+
+    def test_range_and_filters(self):
+        body = self.timeseries('?granularity=week&start_date=2025-03-04&end_date=2025-03-31')
+        # Bounds apply to the day of each dose, not to the start of its week
+        self.assertEqual(body['columns'], {'period': ['2025-03-03', '2025-03-10'], 'doses': [1, 1]})
+        self.assertEqual((body['start_date'], body['end_date']), ('2025-03-04', '2025-03-31'))
+
+        columns = self.timeseries(f'?granularity=month&vaccine_id={self.mmr.pk}&grade=5')['columns']
+        self.assertEqual(columns, {'period': ['2025-03-01'], 'doses': [1]})
+
+    def test_empty_range(self):
+        for query in ('?start_date=2025-05-01', '?start_date=2025-03-05&end_date=2025-03-09',
+                      '?start_date=2025-04-01&end_date=2025-03-01', '?series=vaccine&grade=9'):
+            body = self.timeseries(query)
+            self.assertEqual(body['rows'], 0, query)
+            self.assertTrue(all(values == [] for values in body['columns'].values()), query)
 
-# Create your tests here.
+    def test_invalid_parameters(self):
+        for query in ('?granularity=year', '?granularity=', '?series=section', '?start_date=2025-13-01',
+                      '?end_date=03/01/2025', '?vaccine_id=polio', '?grade=5.5'):
+            response = self.client.get(f'/api/reports/timeseries/{query}', HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', response.json())
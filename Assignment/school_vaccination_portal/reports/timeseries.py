@@ -0,0 +1,77 @@
+# reports/timeseries.py
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from vaccination_drives.models import Vaccine
+from .models import DailyVaccinationRollup
+
+# Weeks start on Monday
+GRANULARITIES = {
+    'day': F('day'),
+    'week': TruncWeek('day'),
+    'month': TruncMonth('day'),
+}
+
+# Optional series to split the doses into
+SERIES_DIMENSIONS = ('vaccine', 'grade')
+
+
+def get_timeseries(granularity='day', series=None, start_date=None, end_date=None, vaccine_id=None, grade=None):
+    """
+    Doses given per period, read only from the daily rollup, so the cost
+    depends on the number of days in range rather than on the number of
+    vaccinations.
+
+    Args:
+        granularity: 'day', 'week' or 'month'
+        series: None, 'vaccine' or 'grade' to split each period
+        start_date, end_date: Inclusive date range of the doses
+        vaccine_id, grade: Only count these doses
+
+    Periods without doses are left out.
+
+    Returns:
+        dict: Columnar layout, one list per column:
+            {'granularity': 'week', 'series': 'vaccine', 'rows': n,
+             'columns': {'period': [...], 'vaccine': [...], 'doses': [...]}}
+    """
+    queryset = DailyVaccinationRollup.objects.filter(doses__gt=0)
+    if start_date:
+        queryset = queryset.filter(day__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(day__lte=end_date)
+    if vaccine_id is not None:
+        queryset = queryset.filter(vaccine_id=vaccine_id)
+    if grade is not None:
+        queryset = queryset.filter(grade=grade)
+
+    group_by = {'period': GRANULARITIES[granularity]}
+    if series == 'vaccine':
+        group_by['series_key'] = F('vaccine_id')
+    elif series == 'grade':
+        group_by['series_key'] = F('grade')
+
+    groups = queryset.values(**group_by).annotate(total=Sum('doses')).order_by(*group_by)
+
+    columns = {'period': []}
+    if series:
+        columns[series] = []
+    columns['doses'] = []
+
+    names = dict(Vaccine.objects.values_list('id', 'name')) if series == 'vaccine' else {}
+    for group in groups:
+        columns['period'].append(group['period'].isoformat())
+        if series == 'vaccine':
+            columns['vaccine'].append(names.get(group['series_key']))
+        elif series:
+            columns[series].append(group['series_key'])
+        columns['doses'].append(group['total'])
+
+    return {
+        'granularity': granularity,
+        'series': series,
+        'start_date': start_date.isoformat() if start_date else None,
+        'end_date': end_date.isoformat() if end_date else None,
+        'rows': len(columns['doses']),
+        'columns': columns,
+    }
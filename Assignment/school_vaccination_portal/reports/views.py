@@ -1,103 +1,122 @@
+from rest_framework import status
 from rest_framework.viewsets import ViewSet
+from datetime import date
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.db.models import Count
 from students.models import Student
 from vaccination_drives.models import Vaccine, VaccinationDrive, StudentVaccination
-import csv
-from django.http import HttpResponse
+from school_vaccination_portal.exports import EXPORT_FORMATS, EXPORT_RENDERER_CLASSES, streams_async
+from school_vaccination_portal.pagination import StudentVaccinationPagination
+from school_vaccination_portal.utils import filter_vaccination_report, generate_vaccination_report_export
+from school_vaccination_portal.cache import CachedResponseMixin
+from school_vaccination_portal.conditional import ConditionalGetMixin
+from school_vaccination_portal.databases import ReplicaReadMixin
+from .coverage import get_coverage, parse_group_by
+from .models import DashboardStat
+from .stats import get_dashboard_stats
+from .timeseries import GRANULARITIES, SERIES_DIMENSIONS, get_timeseries
 
-class ReportViewSet(ViewSet):
+class ReportViewSet(ReplicaReadMixin, CachedResponseMixin, ConditionalGetMixin, ViewSet):
+    cache_actions = ('dashboard_stats', 'vaccination_report', 'coverage', 'timeseries')
+    conditional_actions = ('dashboard_stats',)
+    
+    def get_validator_queryset(self):
+        # dashboard_stats is built from the DashboardStat rows (plus drive
+        # dates, covered by the drives namespace version)
+        return DashboardStat.objects.all()
+    
     @action(detail=False, methods=['get'])
     def dashboard_stats(self, request):
-        # Get total students count
-        total_students = Student.objects.count()
-        
-        # Get total vaccinated students (at least one vaccination)
-        vaccinated_students = StudentVaccination.objects.values('student').distinct().count()
-        
-        # Get upcoming vaccination drives
-        from datetime import date, timedelta
-        thirty_days_later = date.today() + timedelta(days=30)
-        upcoming_drives = VaccinationDrive.objects.filter(
-            date__gte=date.today(),
-            date__lte=thirty_days_later
-        ).count()
+        # Served from the precomputed DashboardStat rows instead of counting
+        # every student and vaccination on each load
+        return Response(get_dashboard_stats())
+    
+    @action(detail=False, methods=['get'])
+    def coverage(self, request):
+        """
+        Vaccinated and unvaccinated counts grouped by any of grade, section,
+        vaccine, month (administered) and birth_year, e.g.
+        ?group_by=grade,vaccine. Optional vaccine_id and grade filters.
+        """
+        try:
+            dimensions = parse_group_by(request.query_params.getlist('group_by'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calculate vaccination percentage
-        vaccination_percentage = 0
-        if total_students > 0:
-            vaccination_percentage = (vaccinated_students / total_students) * 100
+        filters = {}
+        for param in ('vaccine_id', 'grade'):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    filters[param] = int(value)
+                except ValueError:
+                    return Response({'error': f'{param} must be a whole number'}, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response({
-            'total_students': total_students,
-            'vaccinated_students': vaccinated_students,
-            'vaccination_percentage': round(vaccination_percentage, 2),
-            'upcoming_drives': upcoming_drives
-        })
+        return Response(get_coverage(dimensions, **filters))
     
     @action(detail=False, methods=['get'])
-    def vaccination_report(self, request):
-        # Filter parameters
-        vaccine_id = request.query_params.get('vaccine_id')
-        grade = request.query_params.get('grade')
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
+    def timeseries(self, request):
+        """
+        Doses per day, week or month (?granularity=), optionally split into a
+        series per vaccine or grade (?series=), between start_date and end_date.
+        Optional vaccine_id and grade filters.
+        """
+        params = request.query_params
+        granularity = params.get('granularity', 'day')
+        series = params.get('series') or None
         
-        # Start with all vaccinations
-        query = StudentVaccination.objects.all()
+        if granularity not in GRANULARITIES:
+            return Response({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        if series is not None and series not in SERIES_DIMENSIONS:
+            return Response({'error': f"series must be one of {', '.join(SERIES_DIMENSIONS)}"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Apply filters
-        if vaccine_id:
-            query = query.filter(vaccination_drive__vaccine_id=vaccine_id)
+        filters = {}
+        for param in ('start_date', 'end_date'):
+            value = params.get(param)
+            if value:
+                try:
+                    filters[param] = date.fromisoformat(value)
+                except ValueError:
+                    return Response({'error': f'{param} must be a date in YYYY-MM-DD format'}, status=status.HTTP_400_BAD_REQUEST)
+        for param in ('vaccine_id', 'grade'):
+            value = params.get(param)
+            if value:
+                try:
+                    filters[param] = int(value)
+                except ValueError:
+                    return Response({'error': f'{param} must be a whole number'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if grade:
-            query = query.filter(student__grade=grade)
-            
-        if start_date:
-            query = query.filter(date_administered__gte=start_date)
-            
-        if end_date:
-            query = query.filter(date_administered__lte=end_date)
+        return Response(get_timeseries(granularity, series, **filters))
+    
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERER_CLASSES)
+    def vaccination_report(self, request):
+        # Filter by vaccine_id, grade, start_date and end_date
+        query = filter_vaccination_report(request.query_params)
             
         # Format for API response
-        vaccinations = query.select_related('student', 'vaccination_drive__vaccine')
+        vaccinations = query.select_related('student', 'vaccine')
         
-        # Check if CSV export is requested
+        # Stream the whole filtered report for CSV/NDJSON exports
         format_type = request.query_params.get('format')
-        if format_type == 'csv':
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="vaccination_report.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow([
-                'Student ID', 'Student Name', 'Grade', 'Section', 
-                'Vaccine', 'Date Administered', 'Notes'
-            ])
-            
-            for v in vaccinations:
-                writer.writerow([
-                    v.student.student_id,
-                    v.student.full_name,
-                    v.student.grade,
-                    v.student.section,
-                    v.vaccination_drive.vaccine.name,
-                    v.date_administered,
-                    v.notes
-                ])
-                
-            return response
+        if format_type in EXPORT_FORMATS:
+            return generate_vaccination_report_export(
+                query, export_format=format_type, asynchronous=streams_async(request)
+            )
         
         # Return paginated JSON response
+        paginator = StudentVaccinationPagination()
+        page = paginator.paginate_queryset(vaccinations, request, view=self)
+        
         data = [{
             'id': v.id,
             'student_id': v.student.student_id,
             'student_name': v.student.full_name,
             'grade': v.student.grade,
             'section': v.student.section,
-            'vaccine_name': v.vaccination_drive.vaccine.name,
+            'vaccine_name': v.vaccine.name,
             'date_administered': v.date_administered,
             'notes': v.notes
-        } for v in vaccinations]
+        } for v in page]
         
-        return Response(data)
\ No newline at end of file
+        return paginator.get_paginated_response(data)
\ No newline at end of file
@@ -0,0 +1,196 @@
+# school_vaccination_portal/batch.py
+
+import io
+import json
+import logging
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Headers of the batch request that make no sense for its operations
+_DROPPED_META_PREFIXES = ('HTTP_IF_', 'HTTP_ACCEPT', 'CONTENT_')
+
+
+class _OperationFailed(Exception):
+    # Raised inside an operation's savepoint so its writes are rolled back
+    def __init__(self, result):
+        self.result = result
+
+
+class BatchView(APIView):
+    """
+    Run an ordered list of API operations in one request:
+
+        {"atomic": true, "operations": [
+            {"method": "POST", "path": "/api/vaccinations/", "body": {...}},
+            {"method": "PATCH", "path": "/api/students/12/", "body": {...}}
+        ]}
+
+    Each operation is dispatched to the view its path resolves to, with the
+    batch request's credentials, so it is authenticated, validated and
+    permission checked exactly as if it had been sent on its own.
+
+    With "atomic" (the default) the operations share one transaction: the
+    first one to fail rolls back all of them and the rest are not run.
+    Otherwise each operation runs in its own savepoint, so a failed one is
+    rolled back alone and the others are saved.
+
+    Operations are dispatched straight to their views, not through the
+    middleware stack: they are not timed by the request metrics, not
+    compressed, have no session and get no CSRF check of their own. The
+    batch request itself goes through all of it once, so authenticate with
+    a token rather than a session cookie.
+
+    The response has a status and body per operation, and whether anything
+    was committed. Its status is 200 if every operation succeeded, 207 if
+    only some did, and 422 if nothing was committed (an atomic batch rolled
+    back, or every operation failed). The whole batch is rejected with 400
+    if it is malformed and 413 if it has more than BATCH_MAX_OPERATIONS
+    operations.
+    """
+    def post(self, request):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return Response({'error': 'operations must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(operations) > settings.BATCH_MAX_OPERATIONS:
+            return Response(
+                {'error': f'A batch can have at most {settings.BATCH_MAX_OPERATIONS} operations'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        atomic = request.data.get('atomic', True)
+        if not isinstance(atomic, bool):
+            return Response({'error': 'atomic must be true or false'}, status=status.HTTP_400_BAD_REQUEST)
+
+        errors = {}
+        for index, operation in enumerate(operations):
+            error = self.validate_operation(operation)
+            if error:
+                errors[str(index)] = error
+        if errors:
+            return Response({'error': 'Invalid operations', 'operations': errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        try:
+            with transaction.atomic():
+                for operation in operations:
+                    try:
+                        # A savepoint per operation, so a failed one leaves nothing behind
+                        with transaction.atomic():
+                            result = self.run_operation(request, operation)
+                            if result['status'] >= 400:
+                                raise _OperationFailed(result)
+                    except _OperationFailed as e:
+                        results.append(e.result)
+                        if atomic:
+                            raise
+                    else:
+                        results.append(result)
+        except _OperationFailed:
+            failed = len(results) - 1
+            results.extend(
+                {'status': status.HTTP_424_FAILED_DEPENDENCY,
+                 'body': {'error': f'Not run: operation {failed} failed'}}
+                for _ in operations[len(results):]
+            )
+            return Response({'committed': False, 'results': results}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        succeeded = sum(result['status'] < 400 for result in results)
+        if succeeded == len(results):
+            response_status = status.HTTP_200_OK
+        elif succeeded:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_422_UNPROCESSABLE_ENTITY
+        return Response({'committed': bool(succeeded), 'results': results}, status=response_status)
+
+    def validate_operation(self, operation):
+        """
+        Returns:
+            str: What is wrong with the operation, or None
+        """
+        if not isinstance(operation, dict):
+            return 'Each operation must be an object'
+
+        method = operation.get('method')
+        if not isinstance(method, str) or method.upper() not in BATCH_METHODS:
+            return f"method must be one of {', '.join(BATCH_METHODS)}"
+
+        path = operation.get('path')
+        if not isinstance(path, str) or not path.startswith('/api/'):
+            return 'path must be an API path, e.g. /api/students/'
+        try:
+            match = resolve(urlsplit(path).path)
+        except Resolver404:
+            return f'No endpoint at {path}'
+        if getattr(match.func, 'view_class', None) is BatchView:
+            return 'Batches cannot be nested'
+        return None
+
+    def run_operation(self, request, operation):
+        """
+        Dispatch one operation to its view.
+
+        Returns:
+            dict: The response status and decoded body
+        """
+        method = operation['method'].upper()
+        parts = urlsplit(operation['path'])
+        body = b''
+        if operation.get('body') is not None:
+            body = json.dumps(operation['body']).encode('utf-8')
+
+        sub_request = HttpRequest()
+        sub_request.method = method
+        sub_request.path = sub_request.path_info = parts.path
+        sub_request.META = {
+            key: value for key, value in request.META.items()
+            if not key.startswith(_DROPPED_META_PREFIXES)
+        }
+        sub_request.META.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': parts.path,
+            'QUERY_STRING': parts.query,
+            'HTTP_ACCEPT': 'application/json, */*;q=0.1',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+        })
+        sub_request.GET = QueryDict(parts.query)
+        sub_request._stream = io.BytesIO(body)
+        sub_request._read_started = False
+        sub_request.resolver_match = match = resolve(parts.path)
+
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+            if response.streaming:
+                response.close()
+                return {
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'body': {'error': 'Streamed responses such as exports cannot be batched'},
+                }
+            if hasattr(response, 'render'):
+                response.render()
+        except Exception:
+            # Leave the other operations' results intact; the savepoint rolls this one back
+            logger.exception('Batch operation %s %s failed', method, operation['path'])
+            return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'error': 'Internal server error'}}
+
+        content = None
+        if response.content:
+            if response.get('Content-Type', '').startswith('application/json'):
+                content = json.loads(response.content)
+            else:
+                content = response.content.decode('utf-8', errors='replace')
+        return {'status': response.status_code, 'body': content}
@@ -0,0 +1,201 @@
+# school_vaccination_portal/cache.py
+
+import hashlib
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Namespaces that cached views declare and model changes invalidate
+STUDENTS = 'students'
+VACCINES = 'vaccines'
+DRIVES = 'drives'
+VACCINATIONS = 'vaccinations'
+ALL_NAMESPACES = (STUDENTS, VACCINES, DRIVES, VACCINATIONS)
+
+_VERSION_KEY = 'ns:{}'
+_STATS_KEYS = ('stats:hits', 'stats:misses')
+
+# Headers worth replaying on a cache hit besides Content-Type
+_CACHED_HEADERS = ('Content-Disposition', 'Content-Language')
+
+
+def get_response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _new_version():
+    # The time of the change in ns: an evicted version key never restarts at
+    # a number whose entries may still be cached, and ConditionalGetMixin can
+    # use it as a Last-Modified time
+    return time.time_ns()
+
+
+def get_namespace_versions(namespaces):
+    cache = get_response_cache()
+    keys = [_VERSION_KEY.format(name) for name in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*namespaces):
+    """
+    Bump the version of each namespace so every cached response built from
+    it stops matching. Old entries are left to expire or be evicted.
+    """
+    cache = get_response_cache()
+    cache.set_many({_VERSION_KEY.format(name): _new_version() for name in namespaces}, timeout=None)
+
+
+def invalidate_on_commit(*namespaces):
+    """
+    Invalidate once the current transaction commits, so a request that reads
+    in between cannot cache the old rows under the new version.
+    """
+    transaction.on_commit(lambda: invalidate(*namespaces))
+
+
+def _count(key):
+    cache = get_response_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Lost a race with another process creating the counter, or it was evicted
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_cache_stats():
+    """
+    Returns:
+        dict: Hit and miss counts since the counters were last evicted, and the hit ratio
+    """
+    counts = get_response_cache().get_many(_STATS_KEYS)
+    hits = counts.get('stats:hits', 0)
+    misses = counts.get('stats:misses', 0)
+    lookups = hits + misses
+    return {
+        'backend': settings.RESPONSE_CACHE_BACKEND,
+        'timeout': settings.RESPONSE_CACHE_TIMEOUT,
+        'max_entries': settings.RESPONSE_CACHE_MAX_ENTRIES,
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else 0,
+    }
+
+
+class CacheHit(Exception):
+    """
+    Raised from CachedResponseMixin.initial() to short-circuit the handler
+    once authentication and permissions have passed.
+    """
+    def __init__(self, response):
+        self.response = response
+
+
+class CachedResponseMixin:
+    """
+    Cache rendered GET responses for a ViewSet.
+
+    Entries are keyed by path, sorted query params, the negotiated format,
+    the caller's scope (see get_cache_scope) and the current version of each
+    namespace in `cache_namespaces`, so a model change bumps the version and
+    the stale entries simply stop being looked up.
+
+    Only 200 responses are cached, never streaming ones (exports) or the
+    browsable API, whose HTML includes the logged in user.
+    """
+    cache_namespaces = ALL_NAMESPACES
+    cache_actions = ('list', 'retrieve')
+    cache_timeout = None  # Defaults to settings.RESPONSE_CACHE_TIMEOUT
+
+    def get_cache_scope(self, request):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return 'anon'
+        return 'staff' if user.is_staff else 'user'
+
+    def get_cache_key(self, request):
+        params = sorted(
+            (key, value) for key in request.query_params for value in request.query_params.getlist(key)
+        )
+        versions = get_namespace_versions(self.cache_namespaces)
+        parts = [
+            request.path,
+            repr(params),
+            request.accepted_renderer.format,
+            self.get_cache_scope(request),
+            # Lists such as upcoming drives depend on today's date
+            date.today().isoformat(),
+            repr(versions),
+        ]
+        digest = hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+        return f'response:{digest}'
+
+    def _is_cacheable(self, request):
+        return (
+            request.method == 'GET'
+            and getattr(self, 'action', None) in self.cache_actions
+            and request.accepted_renderer.format != 'api'
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        self._cache_key = None
+        if not self._is_cacheable(request):
+            return
+
+        key = self.get_cache_key(request)
+        cached = get_response_cache().get(key)
+        if cached is not None:
+            _count('stats:hits')
+            content, content_type, headers = cached
+            response = HttpResponse(content, content_type=content_type)
+            for name, value in headers:
+                response[name] = value
+            response['X-Cache'] = 'HIT'
+            raise CacheHit(response)
+
+        _count('stats:misses')
+        self._cache_key = key
+
+    def handle_exception(self, exc):
+        if isinstance(exc, CacheHit):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        key = getattr(self, '_cache_key', None)
+        if key and response.status_code == 200 and isinstance(response, Response):
+            timeout = self.cache_timeout if self.cache_timeout is not None else settings.RESPONSE_CACHE_TIMEOUT
+
+            def store(rendered):
+                headers = [(name, rendered[name]) for name in _CACHED_HEADERS if rendered.has_header(name)]
+                get_response_cache().set(key, (rendered.content, rendered['Content-Type'], headers), timeout)
+
+            response.add_post_render_callback(store)
+            response['X-Cache'] = 'MISS'
+        return response
+
+
+class CacheStatsView(APIView):
+    """
+    Hit/miss counters for the response cache, for sizing it.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_cache_stats())
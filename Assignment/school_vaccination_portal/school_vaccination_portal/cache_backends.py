@@ -0,0 +1,45 @@
+# school_vaccination_portal/cache_backends.py
+
+import os
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+_MISSING = object()
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """
+    FileBasedCache that evicts least recently used entries instead of a
+    random sample once MAX_ENTRIES is reached. A file's mtime records its
+    last use; expiry (TTL) is still stored in the file itself.
+
+    Being on disk, it is shared by every worker process on the host, so
+    invalidations made by one process are seen by the others.
+    """
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            return default
+        try:
+            os.utime(self._key_to_file(key, version))
+        except FileNotFoundError:
+            pass
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return  # return early if no culling is required
+        if self._cull_frequency == 0:
+            return self.clear()  # Clear the cache when CULL_FREQUENCY = 0
+
+        def last_used(fname):
+            try:
+                return os.path.getmtime(fname)
+            except FileNotFoundError:
+                return 0
+
+        filelist.sort(key=last_used)
+        for fname in filelist[:int(num_entries / self._cull_frequency)]:
+            self._delete(fname)
@@ -0,0 +1,117 @@
+# school_vaccination_portal/conditional.py
+
+import hashlib
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_namespace_versions
+
+
+class NotModified(Exception):
+    """
+    Raised from ConditionalGetMixin.initial() to answer with the 304 it carries.
+    """
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Answer GETs whose ETag or Last-Modified still matches with 304 Not Modified.
+
+    The validators come from one aggregate query (max of `last_modified_field`
+    and the row count) over the same filtered queryset the action would
+    serialize, combined with the query params and the versions of the cache
+    namespaces the view reads. The namespace versions catch changes the
+    aggregate cannot see, such as a new vaccination showing up in a student's
+    status or doses_used moving on a drive without touching updated_at.
+
+    When combined with CachedResponseMixin, list it after that mixin; its
+    check then runs first and matching requests never reach the cache:
+
+        class StudentViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet)
+    """
+    conditional_actions = ('list', 'retrieve')
+    last_modified_field = 'updated_at'
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_validators(self, request):
+        """
+        Returns:
+            tuple: (etag, last_modified as a Unix timestamp)
+        """
+        summary = self.get_validator_queryset().order_by().aggregate(
+            last_modified=Max(self.last_modified_field),
+            count=Count('pk')
+        )
+        versions = get_namespace_versions(getattr(self, 'cache_namespaces', ()))
+
+        params = sorted(
+            (key, value) for key in request.query_params for value in request.query_params.getlist(key)
+        )
+        today = timezone.localdate()
+        parts = [
+            request.path,
+            repr(params),
+            request.accepted_renderer.format,
+            today.isoformat(),
+            str(summary['count']),
+            summary['last_modified'].isoformat() if summary['last_modified'] else '',
+            repr(versions),
+        ]
+        etag = hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+        # Namespace versions are the time of the last change (in ns), and
+        # date-dependent views (e.g. upcoming drives) change at midnight
+        timestamps = [version / 1e9 for version in versions if isinstance(version, int)]
+        timestamps.append(datetime.combine(today, time.min, tzinfo=timezone.get_current_timezone()).timestamp())
+        if summary['last_modified']:
+            timestamps.append(summary['last_modified'].astimezone(dt_timezone.utc).timestamp())
+
+        return quote_etag(etag), int(max(timestamps))
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        self._validators = None
+        if request.method not in ('GET', 'HEAD') or getattr(self, 'action', None) not in self.conditional_actions:
+            return
+
+        try:
+            self._validators = self.get_validators(request)
+        except (ValueError, ValidationError):
+            # A malformed filter or lookup; let the action report it
+            return
+
+        etag, last_modified = self._validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        validators = getattr(self, '_validators', None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Let browsers keep the body but check back on every poll
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
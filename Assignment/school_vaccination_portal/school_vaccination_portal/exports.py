@@ -0,0 +1,193 @@
+# school_vaccination_portal/exports.py
+
+import csv
+import json
+from itertools import islice
+
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+# Rows read from the database per round trip while streaming an export
+EXPORT_CHUNK_SIZE = 2000
+
+# Approximate size of each block handed to the WSGI server
+STREAM_BLOCK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """
+    File-like object that hands back whatever is written to it, so that
+    csv.writer can format a single row without an in-memory buffer.
+    """
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Lets `?format=csv` pass DRF content negotiation on export actions. The
+    export itself is streamed by the view; only error payloads are rendered.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, cls=DjangoJSONEncoder).encode(self.charset)
+
+
+class NDJSONRenderer(CSVRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+# Renderer list for actions that return a streaming export
+EXPORT_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer, NDJSONRenderer]
+
+
+def iter_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Read a queryset with a database cursor and yield it as lists of at most
+    `chunk_size` rows, so callers can run one grouped lookup per chunk.
+    """
+    iterator = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def aiter_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Async version of iter_chunks(), reading with the async ORM so the event
+    loop is free between chunks.
+    """
+    chunk = []
+    async for row in queryset.aiterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def streams_async(request):
+    """
+    Whether a response to this request is sent by the ASGI handler, which
+    consumes async iterators as they produce data. The WSGI handler would
+    read an async iterator to the end before sending anything.
+    """
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def _line_formatter(columns, export_format):
+    """
+    Returns:
+        tuple: (header line or None, function formatting one row as a line)
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        header = writer.writerow([label for _, label in columns])
+        return header, lambda row: writer.writerow([row[key] for key, _ in columns])
+
+    encoder = DjangoJSONEncoder()
+    return None, lambda row: encoder.encode({key: row[key] for key, _ in columns}) + '\n'
+
+
+class _BlockBuffer:
+    # Joins small lines into larger blocks to keep per-write overhead down
+    def __init__(self, block_size=STREAM_BLOCK_SIZE):
+        self.block_size = block_size
+        self.lines = []
+        self.size = 0
+
+    def add(self, line):
+        """
+        Returns:
+            bytes: A full block to send, or None while it is still filling
+        """
+        self.lines.append(line)
+        self.size += len(line)
+        if self.size >= self.block_size:
+            return self.take()
+        return None
+
+    def take(self):
+        block = ''.join(self.lines).encode('utf-8')
+        self.lines = []
+        self.size = 0
+        return block
+
+
+def _iter_blocks(rows, header, format_row):
+    buffer = _BlockBuffer()
+    if header is not None:
+        buffer.add(header)
+    for row in rows:
+        block = buffer.add(format_row(row))
+        if block is not None:
+            yield block
+    if buffer.lines:
+        yield buffer.take()
+
+
+async def _aiter_blocks(rows, header, format_row):
+    buffer = _BlockBuffer()
+    if header is not None:
+        buffer.add(header)
+    async for row in rows:
+        block = buffer.add(format_row(row))
+        if block is not None:
+            yield block
+    if buffer.lines:
+        yield buffer.take()
+
+
+def write_export(columns, rows, fileobj, export_format='csv'):
+    """
+    Write an export to a binary file object instead of an HTTP response,
+    e.g. for background jobs. Takes the same arguments as
+    streaming_export_response().
+    """
+    for block in _iter_blocks(rows, *_line_formatter(columns, export_format)):
+        fileobj.write(block)
+
+
+def streaming_export_response(columns, rows, filename, export_format='csv'):
+    """
+    Build a StreamingHttpResponse for an export.
+
+    Args:
+        columns (list): (key, label) pairs; CSV uses the labels as its header
+            row, NDJSON uses the keys as object keys
+        rows (iterable): Lazily produced dicts keyed by column key, or an
+            async iterable of them when served under ASGI
+        filename (str): Download name without extension
+        export_format (str): 'csv' or 'ndjson'
+
+    Returns:
+        StreamingHttpResponse: The export, produced row by row
+    """
+    header, format_row = _line_formatter(columns, export_format)
+    if hasattr(rows, '__aiter__'):
+        blocks = _aiter_blocks(rows, header, format_row)
+    else:
+        blocks = _iter_blocks(rows, header, format_row)
+    response = StreamingHttpResponse(blocks, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,448 @@
+# school_vaccination_portal/metrics.py
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+try:
+    import fcntl
+except ImportError:  # Windows: files of exited workers are kept
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    'portal_http_requests_total': (
+        'counter', 'Requests by view, action, method and status code', None),
+    'portal_http_request_duration_seconds': (
+        'histogram', 'Time until the last byte of the response was produced', LATENCY_BUCKETS),
+    'portal_http_request_db_queries': (
+        'histogram', 'SQL queries run per request', QUERY_BUCKETS),
+    'portal_http_request_db_duration_seconds': (
+        'histogram', 'Time spent in SQL per request', LATENCY_BUCKETS),
+    'portal_http_response_size_bytes': (
+        'histogram', 'Response body size in bytes, as sent (after compression)', SIZE_BUCKETS),
+}
+
+_METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+_FILE_PREFIX = 'metrics-'
+# metrics-<pid>-<start token>.json; the token keeps a later process that is
+# given the same PID from overwriting an exited worker's file. Files from
+# before the token was added are metrics-<pid>.json
+_WORKER_FILE = re.compile(r'^metrics-(\d+)(-[0-9a-f]+)?\.json$')
+# Totals of every exited worker, folded together
+_EXITED_FILE = 'metrics-exited.json'
+_LOCK_FILE = '.metrics.lock'
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms for this process.
+
+    With settings.METRICS_DIR set, each process writes its totals to its own
+    file there (at most every METRICS_FLUSH_INTERVAL seconds, and at exit)
+    and /api/metrics adds up every file, so a scrape that lands on any worker
+    sees all of them. Each scrape folds the files of workers that have exited
+    into one file (see merge_exited()), so the totals carry over restarts
+    while the directory stays small. They still go back to zero when the
+    directory is cleared, which Prometheus handles as a counter reset.
+
+    Workers are told apart by PID, so METRICS_DIR must not be shared between
+    hosts or containers.
+    """
+    def __init__(self):
+        self._reset()
+        # A forked worker starts its own file; the parent's totals are in the parent's
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        # (name, labels) -> value, or per-bucket counts + [sum, count] for histograms
+        self._samples = {}
+        self._last_flush = 0.0
+        self._filename = f'{_FILE_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:12]}.json'
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, labels)
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                # One slot per bucket plus +Inf, then sum and count
+                sample = self._samples[key] = [0] * (len(buckets) + 3)
+            index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+            sample[index] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                [name, [list(pair) for pair in labels], list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self._samples.items()
+            ]
+
+    def flush(self, force=False):
+        directory = settings.METRICS_DIR
+        if not directory or not self._samples:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+
+        os.makedirs(directory, exist_ok=True)
+        _write_samples(os.path.join(directory, self._filename), self.snapshot())
+
+    def merge_exited(self):
+        """
+        Add the files of workers whose PID is no longer running to the
+        exited workers' file and delete them. Merges hold the directory lock
+        exclusively and reads share it, so no scrape counts a file twice.
+        """
+        if fcntl is None:
+            return
+        directory = settings.METRICS_DIR
+        exited = [filename for filename in os.listdir(directory) if _has_exited(filename)]
+        if not exited:
+            return
+
+        with _directory_lock(directory, fcntl.LOCK_EX):
+            exited_path = os.path.join(directory, _EXITED_FILE)
+            samples = _read_samples(exited_path) or []
+            merged = []
+            for filename in exited:
+                path = os.path.join(directory, filename)
+                worker_samples = _read_samples(path)
+                # None: merged by another scrape while this one waited for the lock
+                if worker_samples is not None:
+                    samples.extend(worker_samples)
+                    merged.append(path)
+            if not merged:
+                return
+            _write_samples(exited_path, [
+                [name, [list(pair) for pair in labels], value]
+                for (name, labels), value in add_up(samples).items()
+            ])
+            for path in merged:
+                os.remove(path)
+
+    def collect(self):
+        """
+        Returns:
+            list: [name, labels, value] samples for every process
+        """
+        directory = settings.METRICS_DIR
+        if not directory:
+            return self.snapshot()
+
+        self.flush(force=True)
+        if not os.path.isdir(directory):
+            return []
+        self.merge_exited()
+        samples = []
+        with _directory_lock(directory, fcntl.LOCK_SH if fcntl else None):
+            for filename in os.listdir(directory):
+                if filename.startswith(_FILE_PREFIX) and filename.endswith('.json'):
+                    samples.extend(_read_samples(os.path.join(directory, filename)) or [])
+        return samples
+
+
+@contextmanager
+def _directory_lock(directory, operation):
+    if operation is None:
+        yield
+        return
+    with open(os.path.join(directory, _LOCK_FILE), 'w') as lock:
+        fcntl.flock(lock, operation)
+        yield
+
+
+def _has_exited(filename):
+    """
+    Whether filename is a worker's file and that worker's PID is not running.
+    """
+    match = _WORKER_FILE.match(filename)
+    if not match:
+        return False
+    try:
+        os.kill(int(match.group(1)), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        # Running as another user
+        return False
+    return False
+
+
+def _read_samples(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_samples(path, samples):
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(samples, f)
+    # Readers only ever see a complete file
+    os.replace(temp_path, path)
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush, force=True)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def add_up(samples):
+    """
+    Returns:
+        dict: (name, labels) -> the sum of the samples from every process
+    """
+    totals = {}
+    for name, labels, value in samples:
+        if name not in METRICS:
+            continue
+        key = (name, tuple(tuple(pair) for pair in labels))
+        if isinstance(value, list):
+            current = totals.get(key)
+            totals[key] = value if current is None else [a + b for a, b in zip(current, value)]
+        else:
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def render_metrics(samples):
+    """
+    Add up samples from every process and render them in the Prometheus
+    text exposition format.
+    """
+    totals = add_up(samples)
+
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (sample_name, labels), value in sorted(totals.items()):
+            if sample_name != name:
+                continue
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), value[:-2]):
+                cumulative += count
+                le = bound if bound == '+Inf' else _format_value(float(bound))
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-2])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+# The stats of the request being handled. Context variables follow the
+# request into the threads sync_to_async() runs its queries on under ASGI.
+_current_stats = ContextVar('request_stats', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def _install_query_recorder(sender=None, connection=None, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        # First in the list, so an execute_wrapper() block entered earlier
+        # still removes its own wrapper when it exits
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+# Every connection, on whichever thread it is opened
+connection_created.connect(_install_query_recorder)
+
+
+class _RequestStats:
+    """
+    Counts and times the SQL a request runs.
+    """
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+    @contextmanager
+    def track(self):
+        # Connections of this thread opened before this module was imported
+        for alias in connections:
+            _install_query_recorder(connection=connections[alias])
+        token = _current_stats.set(self)
+        try:
+            yield
+        finally:
+            _current_stats.reset(token)
+
+
+def _request_labels(request):
+    """
+    Label a request by the view class and ViewSet action it was routed to,
+    rather than its path, so there is one series per endpoint.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        view, action = 'unmatched', ''
+    else:
+        func = match.func
+        view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+        view = view_class.__name__ if view_class else getattr(func, '__name__', match.view_name)
+        # ViewSet.as_view() keeps the method -> action mapping it was routed with
+        action = (getattr(func, 'actions', None) or {}).get(request.method.lower(), '')
+    method = request.method if request.method in _METHODS else 'other'
+    return (('view', view), ('action', action), ('method', method))
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL query count and time, response size and status code
+    for every request, labelled by view and action. Exposed at /api/metrics.
+
+    Put it first in MIDDLEWARE so the timing covers the other middleware and
+    the size is the compressed size. Streamed responses (exports) are
+    recorded when the last chunk has been sent, including the queries run
+    while streaming. Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        stats = _RequestStats()
+        start = time.perf_counter()
+        with stats.track():
+            response = self.get_response(request)
+        return self.wrap_response(request, response, stats, start)
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        stats = _RequestStats()
+        start = time.perf_counter()
+        with stats.track():
+            response = await self.get_response(request)
+        return self.wrap_response(request, response, stats, start)
+
+    def wrap_response(self, request, response, stats, start):
+        labels = _request_labels(request)
+
+        def finish(size):
+            self.record(labels, response.status_code, time.perf_counter() - start, stats, size)
+
+        if not response.streaming:
+            finish(len(response.content))
+        elif response.is_async:
+            response.streaming_content = _astream(response.streaming_content, stats, finish)
+        else:
+            response.streaming_content = _stream(response.streaming_content, stats, finish)
+        return response
+
+    def record(self, labels, status_code, duration, stats, size):
+        registry.inc('portal_http_requests_total', labels + (('status', str(status_code)),))
+        registry.observe('portal_http_request_duration_seconds', labels, duration)
+        registry.observe('portal_http_request_db_queries', labels, stats.queries)
+        registry.observe('portal_http_request_db_duration_seconds', labels, stats.db_time)
+        registry.observe('portal_http_response_size_bytes', labels, size)
+        registry.flush()
+
+
+def _stream(chunks, stats, finish):
+    size = 0
+    try:
+        with stats.track():
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+    finally:
+        finish(size)
+
+
+async def _astream(chunks, stats, finish):
+    size = 0
+    try:
+        with stats.track():
+            async for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+    finally:
+        finish(size)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Requests must send settings.METRICS_TOKEN as
+    `Authorization: Bearer <token>`; with no token set it is closed.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        return HttpResponse('Set METRICS_TOKEN to enable metrics\n', status=403, content_type='text/plain')
+    supplied = request.META.get('HTTP_AUTHORIZATION', '')
+    if not constant_time_compare(supplied, f'Bearer {token}'):
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+
+    return HttpResponse(
+        render_metrics(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
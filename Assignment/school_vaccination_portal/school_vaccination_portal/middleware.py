@@ -0,0 +1,163 @@
+# school_vaccination_portal/middleware.py
+
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Content types worth compressing; everything else (images, archives) is passed through
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript')
+
+_ACCEPT_ENCODING_RE = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def _accepted_encodings(header):
+    """
+    Parse an Accept-Encoding header into {coding: q}.
+    """
+    encodings = {}
+    for part in header.split(','):
+        match = _ACCEPT_ENCODING_RE.match(part)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        encodings[match.group(1).lower()] = quality
+    return encodings
+
+
+def negotiate_encoding(header):
+    """
+    Pick 'br' or 'gzip' from an Accept-Encoding header, or None.
+    """
+    accepted = _accepted_encodings(header or '')
+    wildcard = accepted.get('*', 0)
+
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_q = None, 0
+    for coding in candidates:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_q:
+            best, best_q = coding, quality
+    return best
+
+
+def _compressor(encoding, level):
+    """
+    Return (compress, flush, finish) callables for an incremental encoder.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5))
+        return compressor.process, compressor.flush, compressor.finish
+
+    # wbits 16 + MAX_WBITS produces a gzip container instead of raw zlib
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def compress_bytes(data, encoding, level=6):
+    compress, _, finish = _compressor(encoding, level)
+    return compress(data) + finish()
+
+
+def compress_stream(chunks, encoding, level=6):
+    """
+    Compress an iterable of byte chunks, flushing after each one so clients
+    receive data as it is produced rather than after the last row.
+    """
+    compress, flush, finish = _compressor(encoding, level)
+    for chunk in chunks:
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_stream(chunks, encoding, level=6):
+    compress, flush, finish = _compressor(encoding, level)
+    async for chunk in chunks:
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli (when installed) or gzip, as negotiated
+    from Accept-Encoding.
+
+    Streamed exports are compressed chunk by chunk so the body is never
+    buffered. Regular responses smaller than COMPRESSION_MIN_SIZE bytes are
+    sent as-is since the CPU cost outweighs the bytes saved.
+
+    Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.level = getattr(settings, 'COMPRESSION_LEVEL', 6)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code == 304:
+            return response
+
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(response.streaming_content, encoding, self.level)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding, self.level)
+            # Length of the compressed stream is unknown up front
+            del response['Content-Length']
+        else:
+            compressed = compress_bytes(response.content, encoding, self.level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The representation changed, so a strong validator no longer applies
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = encoding
+        return response
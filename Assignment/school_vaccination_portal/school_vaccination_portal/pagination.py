@@ -0,0 +1,210 @@
+# school_vaccination_portal/pagination.py
+
+import base64
+import binascii
+import json
+import operator
+from datetime import date, datetime
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a composite, indexed ordering.
+
+    Instead of OFFSET, every page is fetched with a WHERE clause that seeks
+    past the last row of the previous page, so page N costs the same as
+    page 1. Cursors are opaque base64 tokens holding the boundary row's key
+    and the direction of travel.
+
+    Subclasses set `ordering` to a tuple of model fields that ends with a
+    unique column (normally 'id'). Prefix a field with '-' for descending.
+    """
+    ordering = ('id',)
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(position, reverse))
+
+        # Fetch one extra row to find out whether there is another page
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._row_key(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Ran off the end; the previous page is simply the first one
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self._row_key(self.page[0]), reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': position, **self.get_cursor_extra(reverse)}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('ascii'))
+        return replace_query_param(self.base_url, self.cursor_query_param, token.decode('ascii'))
+
+    def get_cursor_extra(self, reverse):
+        """
+        Extra keys for a cursor leading on from this page; read them back
+        from self.cursor on the next request.
+        """
+        return {}
+
+    def decode_cursor(self, request):
+        self.cursor = {}
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('ascii'))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        self.cursor = payload
+        return position, reverse
+
+    def _order_by(self, reverse):
+        if not reverse:
+            return list(self.ordering)
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def _seek_filter(self, position, reverse):
+        # (a, b, c) > (x, y, z) expands to
+        # a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        clauses = []
+        for i, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            clause = Q(**{f"{name}__{'lt' if descending else 'gt'}": position[i]})
+            for prev_field, prev_value in zip(self.ordering[:i], position[:i]):
+                clause &= Q(**{prev_field.lstrip('-'): prev_value})
+            clauses.append(clause)
+        return reduce(operator.or_, clauses)
+
+    def _row_key(self, row):
+        key = []
+        for field in self.ordering:
+            value = getattr(row, field.lstrip('-'))
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            key.append(value)
+        return key
+
+
+class StudentPagination(KeysetPagination):
+    ordering = ('grade', 'section', 'id')
+
+
+class StudentSearchPagination(KeysetPagination):
+    """
+    Search results, best match first.
+
+    search_rank is annotated by students.search.search_students. On SQLite
+    it is bm25(), which weighs every match against the whole table, so
+    adding, changing or deleting any student moves the scores of the others
+    (trigram similarity on PostgreSQL only changes with the student's own
+    row). Each page is a snapshot of the ranking when it was read, and
+    paging on after such a change can repeat or skip a student. Results
+    stop after `max_results` rows; narrow the search to reach the rest.
+    """
+    ordering = ('-search_rank', 'id')
+    max_results = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        rows = super().paginate_queryset(queryset, request, view)
+        # Rows ranked above this page
+        self.depth = self.cursor.get('d', 0)
+        if isinstance(self.depth, bool) or not isinstance(self.depth, int) or self.depth < 0:
+            raise NotFound(self.invalid_cursor_message)
+
+        if self.depth + len(rows) >= self.max_results:
+            rows = self.page = rows[:max(self.max_results - self.depth, 0)]
+            self.has_next = False
+        return rows
+
+    def get_cursor_extra(self, reverse):
+        if reverse:
+            return {'d': max(self.depth - self.page_size, 0)}
+        return {'d': self.depth + len(self.page)}
+
+
+class VaccinationDrivePagination(KeysetPagination):
+    ordering = ('date', 'id')
+
+
+class StudentVaccinationPagination(KeysetPagination):
+    ordering = ('date_administered', 'id')
+
+
+class JobPagination(KeysetPagination):
+    ordering = ('-id',)
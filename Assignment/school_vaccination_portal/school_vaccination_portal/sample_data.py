@@ -0,0 +1,307 @@
+# school_vaccination_portal/sample_data.py
+
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+FIRST_NAMES = [
+    'Aarav', 'Advait', 'Arjun', 'Arnav', 'Atharv', 'Ayaan', 'Dhruv', 'Ishaan', 'Kabir', 'Krish',
+    'Madhav', 'Om', 'Pranav', 'Reyansh', 'Rohan', 'Samar', 'Shaurya', 'Vihaan', 'Vivaan', 'Yash',
+    'Aanya', 'Anika', 'Anvi', 'Diya', 'Ishita', 'Kiara', 'Kavya', 'Manya', 'Myra', 'Nisha',
+    'Pari', 'Riya', 'Saanvi', 'Sara', 'Siya', 'Tanvi', 'Trisha', 'Vanya', 'Zara', 'Aadhya',
+    'Ananya', 'Avni', 'Aditi', 'Anaya', 'Aria', 'Eva', 'Ira', 'Kyra', 'Meera', 'Nyra'
+]
+
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Patel', 'Kumar', 'Singh', 'Rao', 'Joshi', 'Agarwal', 'Gupta', 'Shah',
+    'Mehta', 'Reddy', 'Nair', 'Pillai', 'Das', 'Bose', 'Banerjee', 'Mukherjee', 'Chatterjee', 'Sen',
+    'Choudhury', 'Yadav', 'Patil', 'Deshmukh', 'Iyer', 'Iyengar', 'Kaur', 'Malhotra', 'Kapoor', 'Khanna',
+    'Bhatia', 'Chauhan', 'Gill', 'Mehra', 'Ahuja', 'Arora', 'Chawla', 'Chopra', 'Bajwa', 'Bedi'
+]
+
+VACCINE_NAMES = [
+    'MMR', 'Polio', 'Hepatitis B', 'Tdap', 'HPV', 'Varicella', 'Influenza', 'Meningococcal',
+    'Hepatitis A', 'Typhoid', 'Japanese Encephalitis', 'COVID-19'
+]
+
+SECTIONS = ['A', 'B', 'C', 'D']
+
+# Share of the unvaccinated doses that come from students with no vaccinations at all
+REFUSAL_SHARE = 0.5
+
+
+class SampleDataOptions:
+    """
+    What to generate. Everything derives from `seed`, so the same options
+    produce the same students, drives and vaccinations whatever the number
+    of workers.
+    """
+    def __init__(self, students=800, grades=(5, 12), vaccines=5, drives=20, coverage=0.7,
+                 days=730, seed=42, id_prefix='ST', chunk_size=10000, batch_size=1000):
+        self.students = students
+        self.grades = grades
+        self.vaccines = vaccines
+        self.drives = drives
+        self.coverage = coverage
+        self.days = days
+        self.seed = seed
+        self.id_prefix = id_prefix
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+
+    def rng(self, *scope):
+        # String seeds hash the same in every process, unlike hash()
+        return random.Random(':'.join(map(str, (self.seed, *scope))))
+
+
+def student_id(options, index):
+    """
+    Sample student IDs are the prefix and the student's position, e.g.
+    ST0000042, so no two students can ever share one.
+    """
+    return f'{options.id_prefix}{index:07d}'
+
+
+def build_student(options, rng, index):
+    from students.models import Student
+
+    min_grade, max_grade = options.grades
+    # Round-robin, so every grade gets the same number of students
+    grade = min_grade + index % (max_grade - min_grade + 1)
+    # About 5 years older than their grade, born some time that year
+    birth_year = date.today().year - 5 - grade
+    return Student(
+        first_name=rng.choice(FIRST_NAMES),
+        last_name=rng.choice(LAST_NAMES),
+        student_id=student_id(options, index),
+        date_of_birth=date(birth_year, 1, 1) + timedelta(days=rng.randint(0, 364)),
+        grade=grade,
+        section=rng.choice(SECTIONS)
+    )
+
+
+def create_vaccines(options):
+    from vaccination_drives.models import Vaccine
+
+    names = [
+        VACCINE_NAMES[i] if i < len(VACCINE_NAMES) else f'Vaccine {i + 1}'
+        for i in range(options.vaccines)
+    ]
+    existing = {vaccine.name: vaccine for vaccine in Vaccine.objects.filter(name__in=names)}
+    Vaccine.objects.bulk_create([Vaccine(name=name) for name in names if name not in existing])
+    return list(Vaccine.objects.filter(name__in=names).order_by('id'))
+
+
+def create_drives(options, vaccines):
+    """
+    Drives spread over the past `days` (about one in ten in the coming
+    months, with no doses given yet), each for a random span of grades.
+    Created in bulk, since save() only accepts dates 15 or more days ahead.
+    """
+    from vaccination_drives.models import VaccinationDrive
+
+    if not vaccines:
+        return []
+
+    rng = options.rng('drives')
+    min_grade, max_grade = options.grades
+    today = date.today()
+    used_dates = set()
+    drives = []
+    for i in range(options.drives):
+        vaccine = vaccines[i % len(vaccines)]
+        # One drive per vaccine per day
+        while True:
+            if rng.random() < 0.1:
+                day = today + timedelta(days=rng.randint(16, 120))
+            else:
+                day = today - timedelta(days=rng.randint(1, max(options.days, 1)))
+            if (vaccine.id, day) not in used_dates:
+                used_dates.add((vaccine.id, day))
+                break
+        low = rng.randint(min_grade, max_grade)
+        high = min(max_grade, low + rng.randint(0, 3))
+        drives.append(VaccinationDrive(
+            vaccine=vaccine,
+            date=day,
+            doses_available=0,  # Sized to the doses given once they exist
+            applicable_grades=f'{low}-{high}' if high > low else str(low),
+            min_grade=low,
+            max_grade=high
+        ))
+    VaccinationDrive.objects.bulk_create(drives, batch_size=options.batch_size)
+    return list(VaccinationDrive.objects.filter(pk__in=[drive.pk for drive in drives]).order_by('id'))
+
+
+def generate_chunk(options, chunk, drives):
+    """
+    Create the students of one chunk and their vaccinations. Runs in a worker
+    process when generating in parallel, so it only takes picklable arguments.
+
+    Args:
+        options: SampleDataOptions
+        chunk: Chunk number; covers students chunk * chunk_size onwards
+        drives: (drive_id, vaccine_id, min_grade, max_grade, date) of past drives
+
+    Returns:
+        tuple: (students created, vaccinations created)
+    """
+    from students.models import Student
+    from vaccination_drives.models import StudentVaccination
+
+    start = chunk * options.chunk_size
+    end = min(start + options.chunk_size, options.students)
+
+    # Coverage differs a little by vaccine, like a real school's records
+    vaccine_ids = sorted({drive[1] for drive in drives})
+    vaccine_coverage = {
+        vaccine_id: min(1.0, max(0.0, options.coverage + options.rng('coverage', vaccine_id).uniform(-0.15, 0.15)))
+        for vaccine_id in vaccine_ids
+    }
+    drives_by_vaccine_grade = {}
+    for drive_id, vaccine_id, min_grade, max_grade, day in drives:
+        for grade in range(min_grade, max_grade + 1):
+            drives_by_vaccine_grade.setdefault((vaccine_id, grade), []).append((drive_id, day))
+
+    refusal = REFUSAL_SHARE * (1 - options.coverage)
+
+    # One RNG per student, so neither the chunk size nor the workers change the data
+    students = []
+    doses = []
+    for index in range(start, end):
+        rng = options.rng('student', index)
+        student = build_student(options, rng, index)
+        students.append(student)
+        # Some families skip every vaccine; the rest make up each vaccine's coverage
+        if rng.random() < refusal:
+            continue
+        for vaccine_id in vaccine_ids:
+            # One decision per (student, vaccine): never two doses of one vaccine
+            if rng.random() >= vaccine_coverage[vaccine_id] / (1 - refusal):
+                continue
+            candidates = drives_by_vaccine_grade.get((vaccine_id, student.grade))
+            if candidates:
+                doses.append((student.student_id, vaccine_id, rng.choice(candidates)))
+
+    with transaction.atomic():
+        Student.objects.bulk_create(students, batch_size=options.batch_size)
+
+    # Look the rows back up by student ID: not every backend returns new primary keys
+    ids = dict(Student.objects.filter(
+        student_id__range=(student_id(options, start), student_id(options, end - 1))
+    ).values_list('student_id', 'id'))
+
+    vaccinations = [
+        StudentVaccination(
+            student_id=ids[code],
+            vaccination_drive_id=drive_id,
+            vaccine_id=vaccine_id,
+            date_administered=day
+        )
+        for code, vaccine_id, (drive_id, day) in doses
+    ]
+    with transaction.atomic():
+        StudentVaccination.objects.bulk_create(vaccinations, batch_size=options.batch_size)
+
+    return len(students), len(vaccinations)
+
+
+def _init_worker():
+    import django
+    django.setup()
+    # Never share a connection inherited from the parent process
+    connections.close_all()
+
+
+def _run_chunk(args):
+    return generate_chunk(*args)
+
+
+def refresh_derived_data():
+    """
+    Bulk inserts skip the signals that keep the counters and summary tables
+    up to date; recompute them all.
+    """
+    from reports.stats import rebuild_daily_rollup, rebuild_dashboard_stats
+    from school_vaccination_portal.cache import ALL_NAMESPACES, invalidate
+    from vaccination_drives.models import StudentVaccination, VaccinationDrive
+
+    used = StudentVaccination.objects.filter(
+        vaccination_drive=OuterRef('pk')
+    ).order_by().values('vaccination_drive').annotate(total=Count('id')).values('total')
+    VaccinationDrive.objects.update(doses_used=Coalesce(Subquery(used, output_field=IntegerField()), 0))
+    # Every sample drive had enough doses for the students it vaccinated
+    VaccinationDrive.objects.filter(doses_available=0).update(doses_available=Greatest('doses_used', 50))
+
+    rebuild_dashboard_stats()
+    rebuild_daily_rollup()
+    invalidate(*ALL_NAMESPACES)
+
+
+def generate_sample_data(options, workers=1, progress=None):
+    """
+    Generate vaccines, drives, students and vaccinations.
+
+    Students are generated in chunks of `chunk_size`, which `workers`
+    processes can share out in any order: each student has its own seeded
+    RNG, so the data comes out the same either way.
+
+    Returns:
+        dict: Counts of what was created
+    """
+    vaccines = create_vaccines(options)
+    drives = create_drives(options, vaccines)
+    today = date.today()
+    past_drives = [
+        (drive.id, drive.vaccine_id, drive.min_grade, drive.max_grade, drive.date)
+        for drive in drives if drive.date <= today
+    ]
+
+    chunks = range((options.students + options.chunk_size - 1) // options.chunk_size)
+    tasks = [(options, chunk, past_drives) for chunk in chunks]
+
+    students = vaccinations = 0
+    if workers > 1 and len(tasks) > 1:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            for created in executor.map(_run_chunk, tasks):
+                students += created[0]
+                vaccinations += created[1]
+                if progress:
+                    progress(students, vaccinations)
+    else:
+        for task in tasks:
+            created = _run_chunk(task)
+            students += created[0]
+            vaccinations += created[1]
+            if progress:
+                progress(students, vaccinations)
+
+    refresh_derived_data()
+
+    return {
+        'vaccines': len(vaccines),
+        'drives': len(drives),
+        'students': students,
+        'vaccinations': vaccinations,
+    }
+
+
+def clear_sample_data():
+    """
+    Delete every student, drive and vaccination with plain DELETE statements
+    rather than loading each row to send delete signals; the derived counters
+    are recomputed by refresh_derived_data().
+    """
+    from students.models import Student
+    from vaccination_drives.models import StudentVaccination, VaccinationDrive
+
+    with transaction.atomic():
+        for model in (StudentVaccination, VaccinationDrive, Student):
+            connection = connections[router.db_for_write(model)]
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from school_vaccination_portal.databases import REPLICA_DATABASE, database_config
 
 
 
@@ -52,13 +53,17 @@ INSTALLED_APPS = [
     'students',
     'vaccination_drives',
     'reports',
+    'jobs',
 ]
 
 # Add this to your settings.py file
 AUTH_USER_MODEL = 'authentication.User'
 
 MIDDLEWARE = [
+    # First, so its timings and sizes cover the rest of the stack
+    'school_vaccination_portal.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'school_vaccination_portal.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -90,15 +95,77 @@ WSGI_APPLICATION = 'school_vaccination_portal.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# DATABASE_URL is the primary. With DATABASE_REPLICA_URL set, report views
+# and exports read from the replica (see school_vaccination_portal/databases.py).
+
+DATABASE_URL = os.environ.get('DATABASE_URL', f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL', '')
+
+_DATABASE_OPTIONS = {
+    'base_dir': BASE_DIR,
+    'conn_max_age': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+    'conn_health_checks': os.environ.get('DATABASE_CONN_HEALTH_CHECKS', 'True') == 'True',
+    'pool': os.environ.get('DATABASE_POOL', 'False') == 'True',
+    'sqlite_busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+}
 
 DATABASES = {
+    'default': database_config(DATABASE_URL, **_DATABASE_OPTIONS),
+}
+if DATABASE_REPLICA_URL:
+    DATABASES[REPLICA_DATABASE] = database_config(DATABASE_REPLICA_URL, **_DATABASE_OPTIONS)
+    # Tests have no replication; let the replica alias use the test primary
+    DATABASES[REPLICA_DATABASE]['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['school_vaccination_portal.databases.PrimaryReplicaRouter']
+
+
+# Cache
+# The response cache for read endpoints (see school_vaccination_portal/cache.py).
+# 'locmem' is per process; use 'file' when running several worker processes so
+# that invalidations are shared. 'none' disables caching.
+
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'locmem')
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR', str(BASE_DIR / 'cache'))
+RESPONSE_CACHE_ALIAS = 'responses'
+
+_RESPONSE_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'school_vaccination_portal.cache_backends.LRUFileBasedCache',
+    'none': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    RESPONSE_CACHE_ALIAS: {
+        'BACKEND': _RESPONSE_CACHE_BACKENDS[RESPONSE_CACHE_BACKEND],
+        'LOCATION': RESPONSE_CACHE_DIR if RESPONSE_CACHE_BACKEND == 'file' else 'responses',
+        'TIMEOUT': RESPONSE_CACHE_TIMEOUT,
+        'OPTIONS': {
+            'MAX_ENTRIES': RESPONSE_CACHE_MAX_ENTRIES,
+            # Evict a tenth of the entries (least recently used first) when full
+            'CULL_FREQUENCY': 10,
+        },
+    },
 }
 
 
+# Request metrics, exposed at /api/metrics (see school_vaccination_portal/metrics.py).
+# Each worker process writes its totals to METRICS_DIR and a scrape adds them
+# up; set it to an empty string for a single process to keep them in memory only.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / 'metrics'))
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1))
+# Scrapers send it as `Authorization: Bearer <token>`; /api/metrics is closed until it is set
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+TEST_RUNNER = 'school_vaccination_portal.test_runner.TestRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -135,6 +202,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded import files and finished job results
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_URL = 'media/'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -143,7 +214,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # settings.py
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ),
     # 'DEFAULT_PERMISSION_CLASSES': [
     #     'rest_framework.permissions.IsAuthenticated',
@@ -155,6 +226,10 @@ REST_FRAMEWORK = {
     ],
     'EXCEPTION_HANDLER': 'school_vaccination_portal.exception_handler.custom_exception_handler',
 }
+
+# Most operations one POST /api/batch/ request may contain
+BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', 100))
+
 # Add this to your settings.py
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -162,3 +237,18 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# Seconds an authenticated user is kept in memory between requests; 0 loads it every time
+AUTH_USER_CACHE_TIMEOUT = float(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 30))
+
+# Response compression (gzip, or brotli when the package is installed)
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5))
+
+# Background jobs (run with `python manage.py run_jobs`)
+JOB_WORKER_CONCURRENCY = int(os.environ.get('JOB_WORKER_CONCURRENCY', 1))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER', 3600))
+# Days the files of finished jobs are kept; 0 keeps them forever
+JOB_FILE_RETENTION_DAYS = int(os.environ.get('JOB_FILE_RETENTION_DAYS', 7))
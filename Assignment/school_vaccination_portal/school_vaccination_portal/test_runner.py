@@ -0,0 +1,16 @@
+# school_vaccination_portal/test_runner.py
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner that keeps the metrics of test requests in memory rather
+    than writing per-process files to the real METRICS_DIR. Tests of the
+    metrics files point METRICS_DIR at a temporary directory themselves.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Never disabled: the registry also flushes at exit, after teardown
+        override_settings(METRICS_DIR='').enable()
@@ -0,0 +1,386 @@
+import functools
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import zlib
+from datetime import date, timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from students.models import Student
+from vaccination_drives.models import StudentVaccination, Vaccine, VaccinationDrive
+from . import metrics, middleware, utils
+from .cache import get_response_cache
+from .databases import REPLICA_DATABASE, replica_reads
+from .exports import iter_chunks
+from .metrics import add_up, registry
+from .middleware import CompressionMiddleware, negotiate_encoding
+from .utils import generate_students_export
+
+
+class NegotiateEncodingTests(SimpleTestCase):
+    def test_gzip(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate_encoding('*'), 'gzip')
+
+    def test_identity_and_refusals(self):
+        self.assertIsNone(negotiate_encoding(None))
+        self.assertIsNone(negotiate_encoding('identity'))
+        self.assertIsNone(negotiate_encoding('gzip;q=0'))
+        self.assertIsNone(negotiate_encoding('*;q=0, identity'))
+
+    def test_brotli_preferred_when_installed(self):
+        self.assertEqual(negotiate_encoding('gzip, br'), 'gzip' if middleware.brotli is None else 'br')
+        with mock.patch.object(middleware, 'brotli', object()):
+            self.assertEqual(negotiate_encoding('gzip, br'), 'br')
+            self.assertEqual(negotiate_encoding('gzip;q=1.0, br;q=0.5'), 'gzip')
+            self.assertEqual(negotiate_encoding('br;q=0, *'), 'gzip')
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = b'{"results": [' + b'{"name": "student"},' * 50 + b'{}]}'
+
+    def process(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_compresses_when_accepted(self):
+        response = self.process(HttpResponse(self.body, content_type='application/json'))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_not_accepted(self):
+        response = self.process(HttpResponse(self.body, content_type='application/json'), accept_encoding='identity')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        # Caches must still keep the encodings apart
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response.content, self.body)
+
+    def test_small_responses_are_sent_as_is(self):
+        response = self.process(HttpResponse(b'{"ok": true}', content_type='application/json'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{"ok": true}')
+
+    def test_already_encoded_and_binary_responses_are_left_alone(self):
+        encoded = HttpResponse(self.body, content_type='application/json')
+        encoded['Content-Encoding'] = 'identity'
+        self.assertEqual(self.process(encoded).content, self.body)
+
+        image = self.process(HttpResponse(self.body, content_type='image/png'))
+        self.assertFalse(image.has_header('Content-Encoding'))
+
+    def test_strong_etag_is_weakened(self):
+        response = HttpResponse(self.body, content_type='application/json')
+        response['ETag'] = '"abc"'
+
+        self.assertEqual(self.process(response)['ETag'], 'W/"abc"')
+
+    def test_streams_are_compressed_chunk_by_chunk(self):
+        chunks = [b'id,name\n'] + [f'{i},student {i}\n'.encode() for i in range(200)]
+        response = self.process(StreamingHttpResponse(iter(chunks), content_type='text/csv'))
+
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b''.join(chunks))
+
+    @unittest.skipIf(middleware.brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        response = self.process(HttpResponse(self.body, content_type='application/json'), accept_encoding='br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(response.content), self.body)
+
+
+def create_export_students(count):
+    get_response_cache().clear()
+    return Student.objects.bulk_create([
+        Student(first_name=f'First{i}', last_name=f'Last{i}', student_id=f'EX{i:04d}',
+                date_of_birth=date(2012, 1, 1), grade=5, section='A')
+        for i in range(count)
+    ])
+
+
+class StudentExportTests(TestCase):
+    def setUp(self):
+        self.students = create_export_students(25)
+        drives = [
+            VaccinationDrive.objects.create(vaccine=Vaccine.objects.create(name=name), doses_available=100,
+                                            date=date.today() + timedelta(days=20), applicable_grades='5')
+            for name in ('Polio', 'MMR')
+        ]
+        StudentVaccination.objects.bulk_create([
+            StudentVaccination(student=student, vaccination_drive=drive, vaccine_id=drive.vaccine_id,
+                               date_administered=date(2026, 1, 1) + timedelta(days=i))
+            for student in self.students[:10] for i, drive in enumerate(drives)
+        ])
+
+    def test_vaccinations_are_read_once_per_chunk(self):
+        with mock.patch.object(utils, 'iter_chunks', functools.partial(iter_chunks, chunk_size=10)):
+            response = generate_students_export()
+            self.assertIsInstance(response, StreamingHttpResponse)
+
+            # The students, then one vaccination query for each of the 3 chunks
+            with self.assertNumQueries(4):
+                lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+
+        self.assertEqual(len(lines), 26)
+        self.assertEqual(lines[0], 'Student ID,First Name,Last Name,Date of Birth,Grade,Section,'
+                                   'Vaccination Status,Vaccines Received,Last Vaccination Date')
+        self.assertEqual(lines[1], 'EX0000,First0,Last0,2012-01-01,5,A,Vaccinated,"Polio, MMR",2026-01-02')
+        self.assertTrue(lines[-1].endswith('Not Vaccinated,,'))
+
+    def test_export_without_vaccination_status_reads_only_students(self):
+        response = generate_students_export(include_vaccination_status=False)
+
+        with self.assertNumQueries(1):
+            header = b''.join(response.streaming_content).splitlines()[0]
+        self.assertEqual(header, b'Student ID,First Name,Last Name,Date of Birth,Grade,Section')
+
+    def test_ndjson(self):
+        response = self.client.get('/api/students/export/?format=ndjson')
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="students.ndjson"')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[0], {
+            'student_id': 'EX0000', 'first_name': 'First0', 'last_name': 'Last0', 'date_of_birth': '2012-01-01',
+            'grade': 5, 'section': 'A', 'vaccination_status': 'Vaccinated', 'vaccines_received': 'Polio, MMR',
+            'last_vaccination_date': '2026-01-02',
+        })
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get('/api/students/export/?format=xml').status_code, 404)
+
+
+class CompressedExportTests(TestCase):
+    def setUp(self):
+        create_export_students(300)
+
+    def test_streamed_export_decodes_to_the_original_bytes(self):
+        plain = self.client.get('/api/students/export/')
+        original = b''.join(plain.streaming_content)
+
+        response = self.client.get('/api/students/export/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        compressed = b''.join(response.streaming_content)
+        self.assertLess(len(compressed), len(original))
+        self.assertEqual(zlib.decompress(compressed, 16 + zlib.MAX_WBITS), original)
+
+
+def histogram(name, labels):
+    return dict((tuple(map(tuple, sample[1])), sample[2]) for sample in registry.snapshot()
+                if sample[0] == name).get(labels)
+
+
+class RequestMetricsTests(TestCase):
+    labels = (('view', 'StudentViewSet'), ('action', 'list'), ('method', 'GET'))
+
+    def setUp(self):
+        get_response_cache().clear()
+        create_export_students(3)
+
+    def observed_queries(self, labels):
+        # [buckets..., sum, count]; absent until the first request
+        value = histogram('portal_http_request_db_queries', labels) or [0, 0]
+        return value[-2], value[-1]
+
+    def test_queries_are_counted_per_request(self):
+        before_sum, before_count = self.observed_queries(self.labels)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/students/', HTTP_ACCEPT='application/json').status_code, 200)
+
+        after_sum, after_count = self.observed_queries(self.labels)
+        self.assertEqual(after_count - before_count, 1)
+        self.assertEqual(after_sum - before_sum, len(queries))
+        self.assertGreater(len(queries), 0)
+
+    def test_queries_run_while_streaming_are_counted(self):
+        labels = (('view', 'StudentViewSet'), ('action', 'export'), ('method', 'GET'))
+        before_sum, before_count = self.observed_queries(labels)
+
+        response = self.client.get('/api/students/export/')
+        self.assertEqual(self.observed_queries(labels)[1], before_count)  # Not finished yet
+        with CaptureQueriesContext(connection) as queries:
+            b''.join(response.streaming_content)
+
+        after_sum, after_count = self.observed_queries(labels)
+        self.assertEqual(after_count - before_count, 1)
+        # The student and vaccination reads happen as the body is produced
+        self.assertEqual(after_sum - before_sum, len(queries))
+        self.assertEqual(len(queries), 2)
+
+
+class MetricsFileTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings_override = override_settings(METRICS_DIR=self.directory, METRICS_TOKEN='secret')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def exited_pid(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        return process.pid
+
+    def write(self, filename, samples):
+        with open(os.path.join(self.directory, filename), 'w') as f:
+            json.dump(samples, f)
+
+    def totals(self):
+        return {key: value for key, value in add_up(registry.collect()).items() if key[1] == (('view', 'Test'),)}
+
+    @unittest.skipIf(metrics.fcntl is None, 'exited workers are only merged where fcntl is available')
+    def test_exited_workers_are_folded_into_one_file(self):
+        counter = ('portal_http_requests_total', (('view', 'Test'),))
+        latency = ('portal_http_request_duration_seconds', (('view', 'Test'),))
+        buckets = len(metrics.LATENCY_BUCKETS) + 1
+        dead, legacy = self.exited_pid(), self.exited_pid()
+        self.write(f'metrics-{dead}-0123456789ab.json', [
+            ['portal_http_requests_total', [['view', 'Test']], 2],
+            ['portal_http_request_duration_seconds', [['view', 'Test']], [1] + [0] * (buckets - 1) + [0.5, 1]],
+        ])
+        self.write(f'metrics-{legacy}.json', [['portal_http_requests_total', [['view', 'Test']], 3]])
+        self.write('metrics-exited.json', [['portal_http_requests_total', [['view', 'Test']], 10]])
+        # A running worker (this process's parent) keeps its own file
+        self.write(f'metrics-{os.getppid()}-abcdef012345.json', [['portal_http_requests_total', [['view', 'Test']], 7]])
+
+        totals = self.totals()
+
+        self.assertEqual(totals[counter], 22)
+        self.assertEqual(totals[latency][-2:], [0.5, 1])
+        self.assertEqual(sorted(f for f in os.listdir(self.directory) if f.endswith('.json')), sorted([
+            'metrics-exited.json', f'metrics-{os.getppid()}-abcdef012345.json', registry._filename,
+        ]))
+        with open(os.path.join(self.directory, 'metrics-exited.json')) as f:
+            self.assertEqual(add_up(json.load(f))[counter], 15)
+        # Merging again changes nothing
+        self.assertEqual(self.totals(), totals)
+
+    def test_scrape_renders_every_file(self):
+        self.write(f'metrics-{os.getppid()}-abcdef012345.json', [['portal_http_requests_total', [['view', 'Test']], 4]])
+
+        response = self.client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('portal_http_requests_total{view="Test"} 4', response.content.decode())
+
+    def test_scrape_needs_the_token(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    A second connection to the test database stands in for the replica.
+    This is a TransactionTestCase so that it sees the primary's rows.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the runner set up the test databases: it has none to create
+        if REPLICA_DATABASE not in connections.settings:
+            primary = connections[DEFAULT_DB_ALIAS].settings_dict
+            connections.settings[REPLICA_DATABASE] = {
+                **primary, 'TEST': {**primary['TEST'], 'MIRROR': DEFAULT_DB_ALIAS},
+            }
+            cls.addClassCleanup(cls.remove_replica)
+        cls.databases = cls.databases | {REPLICA_DATABASE}
+
+    @classmethod
+    def remove_replica(cls):
+        connections[REPLICA_DATABASE].close()
+        del connections[REPLICA_DATABASE]
+        del connections.settings[REPLICA_DATABASE]
+
+    def setUp(self):
+        get_response_cache().clear()
+        create_export_students(3)
+
+    def capture(self):
+        return CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]), CaptureQueriesContext(connections[REPLICA_DATABASE])
+
+    def test_reads_inside_replica_reads_use_the_replica(self):
+        self.assertEqual(Student.objects.all().db, DEFAULT_DB_ALIAS)
+
+        primary, replica = self.capture()
+        with replica_reads(), primary, replica:
+            self.assertEqual(Student.objects.all().db, REPLICA_DATABASE)
+            self.assertEqual(Student.objects.count(), 3)
+            # Users and jobs are never read from the replica
+            self.assertEqual(get_user_model().objects.all().db, DEFAULT_DB_ALIAS)
+
+        self.assertEqual((len(primary), len(replica)), (0, 1))
+
+    def test_writes_use_the_primary(self):
+        primary, replica = self.capture()
+        with replica_reads(), primary, replica:
+            self.assertEqual(router.db_for_write(Student), DEFAULT_DB_ALIAS)
+            student = Student.objects.create(first_name='New', last_name='Student', student_id='RP999',
+                                             date_of_birth=date(2012, 1, 1), grade=5, section='A')
+            Student.objects.filter(pk=student.pk).update(section='B')
+
+        self.assertEqual(len(replica), 0)
+        self.assertGreater(len(primary), 0)
+        self.assertEqual(Student.objects.get(pk=student.pk).section, 'B')
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        primary, replica = self.capture()
+        with replica_reads(), primary, replica:
+            with transaction.atomic():
+                Student.objects.filter(student_id='EX0000').update(grade=9)
+                # Sees its own uncommitted write
+                self.assertEqual(Student.objects.filter(grade=9).count(), 1)
+            self.assertEqual(Student.objects.all().db, REPLICA_DATABASE)
+
+        self.assertEqual(len(replica), 0)
+
+    def test_report_views_and_streamed_exports_read_from_the_replica(self):
+        primary, replica = self.capture()
+        with primary, replica:
+            response = self.client.get('/api/reports/coverage/?group_by=grade', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['columns']['total_students'], [3])
+        self.assertEqual(len(primary), 0)
+        self.assertGreater(len(replica), 0)
+
+        response = self.client.get('/api/students/export/')
+        primary, replica = self.capture()
+        # The body is produced after the view returned, still on the replica
+        with primary, replica:
+            self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 4)
+        self.assertEqual((len(primary), len(replica)), (0, 2))
+
+    def test_without_a_replica_reads_use_the_primary(self):
+        with mock.patch.dict(settings.DATABASES):
+            del settings.DATABASES[REPLICA_DATABASE]
+            primary, replica = self.capture()
+            with replica_reads(), primary, replica:
+                self.assertEqual(Student.objects.count(), 3)
+                self.assertEqual(self.client.get('/api/reports/coverage/', HTTP_ACCEPT='application/json')
+                                 .json()['columns']['total_students'], [3])
+
+        self.assertEqual(len(replica), 0)
+        self.assertGreater(len(primary), 1)
@@ -15,12 +15,19 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+from .batch import BatchView
+from .cache import CacheStatsView
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('api/metrics', metrics_view, name='metrics'),
+    re_path(r'^api/batch/?$', BatchView.as_view(), name='batch'),
     path('api/', include('authentication.urls')),
     path('api/', include('students.urls')),
     path('api/', include('vaccination_drives.urls')),
     path('api/', include('reports.urls')),
+    path('api/', include('jobs.urls')),
 ]
\ No newline at end of file
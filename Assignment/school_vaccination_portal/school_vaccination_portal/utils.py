@@ -1,87 +1,219 @@
 # school_vaccination_portal/utils.py
 
+import codecs
 import csv
 import io
+from datetime import datetime
+from itertools import islice
+from django.db import IntegrityError, router, transaction
 from django.http import HttpResponse
 from students.models import Student
 from vaccination_drives.models import StudentVaccination
+from reports.stats import count_students
+from .cache import STUDENTS, invalidate_on_commit
+from .exports import aiter_chunks, iter_chunks, streaming_export_response
 
-def generate_students_csv(include_vaccination_status=True):
+STUDENT_EXPORT_COLUMNS = [
+    ('student_id', 'Student ID'),
+    ('first_name', 'First Name'),
+    ('last_name', 'Last Name'),
+    ('date_of_birth', 'Date of Birth'),
+    ('grade', 'Grade'),
+    ('section', 'Section'),
+]
+
+STUDENT_VACCINATION_COLUMNS = [
+    ('vaccination_status', 'Vaccination Status'),
+    ('vaccines_received', 'Vaccines Received'),
+    ('last_vaccination_date', 'Last Vaccination Date'),
+]
+
+VACCINATION_REPORT_COLUMNS = [
+    ('student_id', 'Student ID'),
+    ('student_name', 'Student Name'),
+    ('grade', 'Grade'),
+    ('section', 'Section'),
+    ('vaccine_name', 'Vaccine'),
+    ('date_administered', 'Date Administered'),
+    ('notes', 'Notes'),
+]
+
+
+def student_export_columns(include_vaccination_status=True):
+    columns = list(STUDENT_EXPORT_COLUMNS)
+    if include_vaccination_status:
+        columns.extend(STUDENT_VACCINATION_COLUMNS)
+    return columns
+
+
+def _student_export_queryset(using):
+    return Student.objects.using(using).order_by('id').values(
+        'id', 'student_id', 'first_name', 'last_name', 'date_of_birth', 'grade', 'section'
+    )
+
+
+def _chunk_vaccinations_queryset(chunk, using):
+    # One grouped vaccination lookup for the whole chunk
+    return StudentVaccination.objects.using(using).filter(
+        student_id__in=[student['id'] for student in chunk]
+    ).order_by('id').values_list('student_id', 'vaccine__name', 'date_administered')
+
+
+def _student_export_row(student, vaccinations, include_vaccination_status):
+    row = dict(student)
+    row['date_of_birth'] = student['date_of_birth'].strftime('%Y-%m-%d') if student['date_of_birth'] else ''
+    
+    if include_vaccination_status:
+        received = vaccinations.get(student['id'])
+        if received:
+            row['vaccination_status'] = 'Vaccinated'
+            row['vaccines_received'] = ', '.join(name for name, _ in received)
+            row['last_vaccination_date'] = max(day for _, day in received).strftime('%Y-%m-%d')
+        else:
+            row['vaccination_status'] = 'Not Vaccinated'
+            row['vaccines_received'] = ''
+            row['last_vaccination_date'] = ''
+    return row
+
+
+def iter_student_rows(include_vaccination_status=True, using=None):
+    """
+    Yield one export row (a dict keyed like STUDENT_EXPORT_COLUMNS) per
+    student, reading students in chunks with one vaccination query each.
+    `using` reads from that database alias instead of the routed one.
+    """
+    for chunk in iter_chunks(_student_export_queryset(using)):
+        vaccinations = {}
+        if include_vaccination_status:
+            for student_id, vaccine_name, date_administered in _chunk_vaccinations_queryset(chunk, using):
+                vaccinations.setdefault(student_id, []).append((vaccine_name, date_administered))
+        
+        for student in chunk:
+            yield _student_export_row(student, vaccinations, include_vaccination_status)
+
+
+async def aiter_student_rows(include_vaccination_status=True, using=None):
+    """
+    Async version of iter_student_rows() for responses sent under ASGI.
+    """
+    async for chunk in aiter_chunks(_student_export_queryset(using)):
+        vaccinations = {}
+        if include_vaccination_status:
+            async for student_id, vaccine_name, date_administered in _chunk_vaccinations_queryset(chunk, using):
+                vaccinations.setdefault(student_id, []).append((vaccine_name, date_administered))
+        
+        for student in chunk:
+            yield _student_export_row(student, vaccinations, include_vaccination_status)
+
+
+def generate_students_export(include_vaccination_status=True, export_format='csv', asynchronous=False):
     """
-    Generate a CSV file containing all student data.
+    Stream all student data as CSV or NDJSON.
+    
+    Students are read in chunks with a database cursor and each chunk's
+    vaccinations are fetched in a single query, so memory use does not grow
+    with the size of the roster.
     
     Args:
         include_vaccination_status (bool): Whether to include vaccination status columns
+        export_format (str): 'csv' or 'ndjson'
+        asynchronous (bool): Read with the async ORM; for responses sent under ASGI
         
     Returns:
-        HttpResponse: A response with the CSV file attached
+        StreamingHttpResponse: A response with the export file attached
     """
-    # Create a file-like buffer to receive CSV data
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
+    # The rows are read after the view has returned, so choose the database now
+    iter_rows = aiter_student_rows if asynchronous else iter_student_rows
+    return streaming_export_response(
+        student_export_columns(include_vaccination_status),
+        iter_rows(include_vaccination_status, using=router.db_for_read(Student)),
+        'students',
+        export_format
+    )
+
+
+def filter_vaccination_report(params):
+    """
+    Build the StudentVaccination queryset for the vaccination report from
+    request query params (vaccine_id, grade, start_date, end_date).
+    """
+    query = StudentVaccination.objects.all()
     
-    # Define column headers
-    headers = [
-        'Student ID', 
-        'First Name', 
-        'Last Name', 
-        'Date of Birth', 
-        'Grade', 
-        'Section'
-    ]
+    vaccine_id = params.get('vaccine_id')
+    grade = params.get('grade')
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
     
-    if include_vaccination_status:
-        headers.extend(['Vaccination Status', 'Vaccines Received', 'Last Vaccination Date'])
+    if vaccine_id:
+        query = query.filter(vaccine_id=vaccine_id)
     
-    # Write header row
-    writer.writerow(headers)
-    
-    # Fetch all students (with prefetch for vaccination data if needed)
-    if include_vaccination_status:
-        students = Student.objects.prefetch_related('studentvaccination_set__vaccination_drive__vaccine').all()
-    else:
-        students = Student.objects.all()
-    
-    # Write data rows
-    for student in students:
-        # Basic student data
-        row = [
-            student.student_id,
-            student.first_name,
-            student.last_name,
-            student.date_of_birth.strftime('%Y-%m-%d') if student.date_of_birth else '',
-            student.grade,
-            student.section
-        ]
+    if grade:
+        try:
+            query = query.filter(student__grade=int(grade))
+        except ValueError:
+            query = query.none()
         
-        # Add vaccination data if requested
-        if include_vaccination_status:
-            # Get all vaccinations for this student
-            vaccinations = StudentVaccination.objects.filter(student=student).select_related('vaccination_drive__vaccine')
-            
-            if vaccinations.exists():
-                # Get list of vaccine names
-                vaccine_names = [v.vaccination_drive.vaccine.name for v in vaccinations]
-                
-                # Get the latest vaccination date
-                latest_date = max([v.date_administered for v in vaccinations])
-                
-                row.extend([
-                    'Vaccinated',
-                    ', '.join(vaccine_names),
-                    latest_date.strftime('%Y-%m-%d')
-                ])
-            else:
-                row.extend(['Not Vaccinated', '', ''])
+    if start_date:
+        query = query.filter(date_administered__gte=start_date)
         
-        writer.writerow(row)
+    if end_date:
+        query = query.filter(date_administered__lte=end_date)
     
-    # Create the HTTP response with CSV content
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="students.csv"'
+    return query
+
+
+def _vaccination_report_values(queryset):
+    return queryset.order_by('date_administered', 'id').values(
+        'student__student_id', 'student__first_name', 'student__last_name',
+        'student__grade', 'student__section', 'vaccine__name',
+        'date_administered', 'notes'
+    )
+
+
+def _vaccination_report_row(record):
+    return {
+        'student_id': record['student__student_id'],
+        'student_name': f"{record['student__first_name']} {record['student__last_name']}",
+        'grade': record['student__grade'],
+        'section': record['student__section'],
+        'vaccine_name': record['vaccine__name'],
+        'date_administered': record['date_administered'],
+        'notes': record['notes']
+    }
+
+
+def iter_vaccination_report_rows(queryset):
+    for chunk in iter_chunks(_vaccination_report_values(queryset)):
+        for record in chunk:
+            yield _vaccination_report_row(record)
+
+
+async def aiter_vaccination_report_rows(queryset):
+    async for chunk in aiter_chunks(_vaccination_report_values(queryset)):
+        for record in chunk:
+            yield _vaccination_report_row(record)
+
+
+def generate_vaccination_report_export(queryset, export_format='csv', asynchronous=False):
+    """
+    Stream a filtered StudentVaccination queryset as CSV or NDJSON.
     
-    return response
+    Args:
+        queryset (QuerySet): The already filtered vaccinations to export
+        export_format (str): 'csv' or 'ndjson'
+        asynchronous (bool): Read with the async ORM; for responses sent under ASGI
+        
+    Returns:
+        StreamingHttpResponse: A response with the report file attached
+    """
+    # The rows are read after the view has returned, so choose the database now
+    iter_rows = aiter_vaccination_report_rows if asynchronous else iter_vaccination_report_rows
+    return streaming_export_response(
+        VACCINATION_REPORT_COLUMNS,
+        iter_rows(queryset.using(queryset.db)),
+        'vaccination_report',
+        export_format
+    )
 
 
 def generate_students_template_csv():
@@ -123,4 +255,159 @@ def generate_students_template_csv():
     response = HttpResponse(buffer.getvalue(), content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="students_template.csv"'
     
-    return response
\ No newline at end of file
+    return response
+
+# Columns a bulk import file must provide
+STUDENT_IMPORT_FIELDS = ['first_name', 'last_name', 'student_id', 'date_of_birth', 'grade', 'section']
+
+# Rows resolved against the database and inserted per transaction
+IMPORT_CHUNK_SIZE = 1000
+
+
+def _detect_encoding(upload):
+    """
+    Decode the upload once, chunk by chunk, to decide between UTF-8 and
+    latin-1 without holding the whole file in memory.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for chunk in upload.chunks():
+            decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'latin-1'
+    upload.seek(0)
+    return encoding
+
+
+def _insert_students(students):
+    """
+    Insert one batch in a transaction. If the batch hits a constraint (for
+    example a student created concurrently), fall back to row-by-row inserts
+    under savepoints so only the offending rows are reported.
+    """
+    try:
+        with transaction.atomic():
+            Student.objects.bulk_create([student for _, student in students])
+            # bulk_create skips the post_save signal, so count the students here
+            count_students([student.grade for _, student in students])
+            invalidate_on_commit(STUDENTS)
+        return len(students), []
+    except IntegrityError:
+        pass
+    
+    created = 0
+    errors = []
+    with transaction.atomic():
+        for row_num, student in students:
+            try:
+                with transaction.atomic():
+                    student.save()
+                created += 1
+            except IntegrityError as e:
+                errors.append(f"Row {row_num}: Error with student {student.student_id}: {str(e)}")
+    return created, errors
+
+
+def _import_chunk(rows):
+    created_ids = set()
+    errors = []
+    
+    # Resolve every student_id in the chunk with one query
+    existing = set(Student.objects.filter(
+        student_id__in=[row.get('student_id') for _, row in rows]
+    ).values_list('student_id', flat=True))
+    
+    students = []
+    for row_num, row in rows:
+        student_id = row.get('student_id')
+        
+        if student_id in existing:
+            errors.append(f"Row {row_num}: Student with ID {student_id} already exists")
+            continue
+        
+        if student_id in created_ids:
+            errors.append(f"Row {row_num}: Student with ID {student_id} appears more than once in the file")
+            continue
+        
+        # Validate date format
+        try:
+            date_of_birth = datetime.strptime(row.get('date_of_birth') or '', '%Y-%m-%d').date()
+        except ValueError:
+            errors.append(f"Row {row_num}: Invalid date format for {student_id}. Use YYYY-MM-DD")
+            continue
+        
+        # Validate grade
+        try:
+            grade = int((row.get('grade') or '').strip())
+            if grade < 0:
+                raise ValueError
+        except ValueError:
+            errors.append(f"Row {row_num}: Invalid grade for {student_id}. Use a whole number")
+            continue
+        
+        created_ids.add(student_id)
+        students.append((row_num, Student(
+            first_name=row.get('first_name'),
+            last_name=row.get('last_name'),
+            student_id=student_id,
+            date_of_birth=date_of_birth,
+            grade=grade,
+            section=row.get('section')
+        )))
+    
+    created = 0
+    if students:
+        created, insert_errors = _insert_students(students)
+        errors.extend(insert_errors)
+    
+    return created, errors
+
+
+def import_students_csv(upload, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Import students from an uploaded CSV file.
+    
+    The file is decoded as a stream and processed in chunks: each chunk
+    checks for existing student IDs with a single query and is inserted with
+    bulk_create inside its own transaction.
+    
+    Args:
+        upload (UploadedFile): The CSV file from the request
+        chunk_size (int): Rows per lookup/insert batch
+        progress (callable): Optional progress(rows_processed, students_created, errors)
+            hook called after every chunk
+        
+    Returns:
+        tuple: (number of students created, list of per-row error messages)
+        
+    Raises:
+        ValueError: If the header is missing required columns
+    """
+    encoding = _detect_encoding(upload)
+    reader = csv.DictReader(codecs.iterdecode(upload, encoding))
+    
+    header = reader.fieldnames
+    missing = [field for field in STUDENT_IMPORT_FIELDS if field not in (header or [])]
+    if missing:
+        raise ValueError(f'CSV file is missing required columns: {", ".join(missing)}')
+    
+    students_created = 0
+    rows_processed = 0
+    errors = []
+    
+    rows = enumerate(reader, start=2)  # Start at 2 to account for header row
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        created, chunk_errors = _import_chunk(chunk)
+        students_created += created
+        rows_processed += len(chunk)
+        errors.extend(chunk_errors)
+        
+        if progress:
+            progress(rows_processed, students_created, errors)
+    
+    return students_created, errors
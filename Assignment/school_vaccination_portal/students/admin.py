@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Student
+from .search import search_students
 # Register your models here.
 
 @admin.register(Student)
@@ -7,7 +8,7 @@ class StudentAdmin(admin.ModelAdmin):
     # Display these fields in the list view
     list_display = ('student_id', 'first_name', 'last_name', 'grade', 'section', 'date_of_birth')
     
-    # Allow searching by these fields
+    # Allow searching by these fields (through the search index, see get_search_results)
     search_fields = ('student_id', 'first_name', 'last_name')
     
     # Add filters on the right side
@@ -24,4 +25,9 @@ class StudentAdmin(admin.ModelAdmin):
     )
     
     # Order by these fields by default
-    ordering = ('grade', 'section', 'last_name', 'first_name')
\ No newline at end of file
+    ordering = ('grade', 'section', 'last_name', 'first_name')
+    
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_students(queryset, text=search_term), False
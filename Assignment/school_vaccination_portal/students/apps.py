@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class StudentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'students'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(signals.ensure_search_index, sender=self)
@@ -0,0 +1,239 @@
+# students/bulk.py
+
+from collections import Counter
+from itertools import cycle
+
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from reports.stats import count_doses, count_students, count_vaccinated_students, count_vaccines
+from school_vaccination_portal.cache import DRIVES, STUDENTS, VACCINATIONS, invalidate_on_commit
+from vaccination_drives.models import StudentVaccination, VaccinationDrive
+from .models import Student
+
+# Rows per UPDATE/DELETE; each chunk is its own short transaction
+BULK_CHUNK_SIZE = 1000
+
+SECTION_RULES = ('round_robin', 'alphabetical')
+
+# Students in this grade graduate rather than move up
+TOP_GRADE = 12
+
+
+def _chunks(queryset, chunk_size):
+    """
+    Yield lists of up to chunk_size primary keys of the queryset, in id
+    order. Each list is read just before it is used, so rows changed by
+    earlier chunks are never picked up twice.
+    """
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def students_matching(grades=None, student_id_prefix=None):
+    """
+    Students in any of `grades` (all grades if None) whose student ID
+    starts with `student_id_prefix`, if given.
+    """
+    queryset = Student.objects.all()
+    if grades is not None:
+        queryset = queryset.filter(grade__in=grades)
+    if student_id_prefix:
+        queryset = queryset.filter(student_id__startswith=student_id_prefix)
+    return queryset
+
+
+def promote_students(grades=None, by=1, chunk_size=BULK_CHUNK_SIZE, dry_run=False):
+    """
+    Move the students of `grades` (every student if None) up `by` grades
+    with one UPDATE per chunk, keeping the dashboard counts and the daily
+    rollup in step.
+
+    Not idempotent: if a run stops halfway, promote the students that are
+    left by grade and ID prefix rather than running it again.
+
+    Raises:
+        ValueError: If `by` is less than 1, or some of the students would
+            pass TOP_GRADE; delete the graduates with delete_students() first
+
+    Returns:
+        int: Students promoted, or that would be with dry_run
+    """
+    if by < 1:
+        raise ValueError('Students can only be promoted by 1 or more grades')
+
+    queryset = students_matching(grades)
+    graduating = queryset.filter(grade__gt=TOP_GRADE - by).count()
+    if graduating:
+        raise ValueError(
+            f'{graduating} students would pass grade {TOP_GRADE}; '
+            'delete the graduating students first'
+        )
+    if dry_run:
+        return queryset.count()
+
+    promoted = 0
+    now = timezone.now()
+    for ids in _chunks(queryset, chunk_size):
+        with transaction.atomic():
+            old_grades = dict(Student.objects.filter(pk__in=ids).values_list('pk', 'grade'))
+            doses = list(StudentVaccination.objects.filter(student_id__in=ids).values_list(
+                'student_id', 'date_administered', 'vaccine_id'
+            ))
+            Student.objects.filter(pk__in=ids).update(grade=F('grade') + by, updated_at=now)
+
+            count_students(list(old_grades.values()), -1)
+            count_students([grade + by for grade in old_grades.values()])
+            vaccinated = [old_grades[student_id] for student_id in {dose[0] for dose in doses}]
+            count_vaccinated_students(vaccinated, -1)
+            count_vaccinated_students([grade + by for grade in vaccinated])
+            count_doses([(day, vaccine_id, old_grades[student_id]) for student_id, day, vaccine_id in doses], -1)
+            count_doses([(day, vaccine_id, old_grades[student_id] + by) for student_id, day, vaccine_id in doses])
+            # Vaccination and report rows show the student's grade
+            invalidate_on_commit(STUDENTS, VACCINATIONS)
+        promoted += len(old_grades)
+    return promoted
+
+
+def assign_sections(students, sections, rule):
+    """
+    Pick a section for each student, in the order given.
+
+    Args:
+        students (list): Primary keys, ordered by last and first name
+        sections (list): Section names to fill
+        rule (str): 'round_robin' deals the students out one at a time, so
+            every section gets a spread of the alphabet; 'alphabetical'
+            gives each section a consecutive block of names
+
+    Returns:
+        dict: Student primary key -> section
+    """
+    if rule not in SECTION_RULES:
+        raise ValueError(f"Unknown section rule '{rule}'. Use one of {', '.join(SECTION_RULES)}")
+    if not sections:
+        raise ValueError('At least one section is needed')
+
+    if rule == 'round_robin':
+        return dict(zip(students, cycle(sections)))
+
+    # Blocks differ in size by at most one student
+    block, extra = divmod(len(students), len(sections))
+    assignment = {}
+    start = 0
+    for index, section in enumerate(sections):
+        end = start + block + (1 if index < extra else 0)
+        assignment.update((student, section) for student in students[start:end])
+        start = end
+    return assignment
+
+
+def reassign_sections(sections, rule='round_robin', grades=None, chunk_size=BULK_CHUNK_SIZE, dry_run=False):
+    """
+    Redistribute the students of each grade in `grades` (all grades if None)
+    over `sections` by `rule` (see assign_sections()). Only students whose
+    section changes are updated, with one UPDATE per section per chunk.
+
+    Each grade is read, assigned and updated in one transaction, so the
+    sections are worked out from the grade as it is when it is written.
+    Students added to a grade after it has been processed keep the section
+    they were given.
+
+    Returns:
+        int: Students moved to another section, or that would be with dry_run
+    """
+    if rule not in SECTION_RULES:
+        raise ValueError(f"Unknown section rule '{rule}'. Use one of {', '.join(SECTION_RULES)}")
+    if not sections:
+        raise ValueError('At least one section is needed')
+
+    queryset = students_matching(grades)
+    now = timezone.now()
+    moved = 0
+    for grade in sorted(queryset.order_by().values_list('grade', flat=True).distinct()):
+        with transaction.atomic():
+            students = list(queryset.filter(grade=grade).order_by('last_name', 'first_name', 'pk').values_list(
+                'pk', 'section'
+            ))
+            assignment = assign_sections([pk for pk, _ in students], sections, rule)
+            changes = sorted((pk, assignment[pk]) for pk, section in students if assignment[pk] != section)
+            moved += len(changes)
+            if dry_run or not changes:
+                continue
+
+            for start in range(0, len(changes), chunk_size):
+                by_section = {}
+                for pk, section in changes[start:start + chunk_size]:
+                    by_section.setdefault(section, []).append(pk)
+                for section, ids in by_section.items():
+                    Student.objects.filter(pk__in=ids).update(section=section, updated_at=now)
+            invalidate_on_commit(STUDENTS)
+    return moved
+
+
+def _delete_rows(model, column, values):
+    connection = connections[router.db_for_write(model)]
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+            f'WHERE {connection.ops.quote_name(column)} IN ({placeholders})',
+            values
+        )
+
+
+def delete_students(grades=None, student_id_prefix=None, chunk_size=BULK_CHUNK_SIZE, dry_run=False):
+    """
+    Delete the students matching the filters (see students_matching()) and
+    their vaccinations with one DELETE statement each per chunk.
+
+    The statements go straight to the database: no delete signals are sent
+    and Django collects no cascades. The vaccinations (the only rows that
+    reference a student) are deleted first, and the counters the signals
+    would have updated are adjusted per chunk instead. The search index is
+    kept in sync by its own triggers.
+
+    Raises:
+        ValueError: If neither filter is given; deleting every student is
+            what clear_sample_data() is for
+
+    Returns:
+        dict: Students and vaccinations deleted, or that would be with dry_run
+    """
+    if grades is None and not student_id_prefix:
+        raise ValueError('Give the grades or the student ID prefix of the students to delete')
+
+    queryset = students_matching(grades, student_id_prefix)
+    if dry_run:
+        return {
+            'students': queryset.count(),
+            'vaccinations': StudentVaccination.objects.filter(student__in=queryset).count(),
+        }
+
+    deleted = {'students': 0, 'vaccinations': 0}
+    for ids in _chunks(queryset, chunk_size):
+        with transaction.atomic():
+            grades_by_student = dict(Student.objects.filter(pk__in=ids).values_list('pk', 'grade'))
+            doses = list(StudentVaccination.objects.filter(student_id__in=ids).values_list(
+                'student_id', 'vaccination_drive_id', 'vaccine_id', 'date_administered'
+            ))
+            _delete_rows(StudentVaccination, 'student_id', ids)
+            _delete_rows(Student, 'id', ids)
+
+            for drive_id, count in Counter(dose[1] for dose in doses).items():
+                VaccinationDrive.adjust_doses_used(drive_id, -count)
+            # One dose per vaccine per student, so each dose is one vaccinated student
+            count_vaccines([dose[2] for dose in doses], -1)
+            count_doses([(day, vaccine_id, grades_by_student[student_id])
+                         for student_id, _, vaccine_id, day in doses], -1)
+            count_vaccinated_students([grades_by_student[student_id] for student_id in {dose[0] for dose in doses}], -1)
+            count_students(list(grades_by_student.values()), -1)
+            invalidate_on_commit(STUDENTS, DRIVES, VACCINATIONS)
+        deleted['students'] += len(grades_by_student)
+        deleted['vaccinations'] += len(doses)
+    return deleted
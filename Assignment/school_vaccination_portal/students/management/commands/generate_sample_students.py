@@ -1,80 +1,104 @@
 # students/management/commands/generate_sample_students.py
 
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from students.models import Student
-from datetime import date, timedelta
-import random
-import string
+from school_vaccination_portal.sample_data import (
+    SampleDataOptions, clear_sample_data, generate_sample_data
+)
+
+MIN_GRADE, MAX_GRADE = 5, 12
+
 
 class Command(BaseCommand):
-    help = 'Generate sample student data for grades 5-12'
+    help = (
+        'Generate sample students for grades 5-12, with vaccines, drives and vaccination records. '
+        'The same --seed always generates the same data.'
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument('--per_grade', type=int, default=100, 
+        parser.add_argument('--per_grade', type=int, default=100,
                             help='Number of students to generate per grade (default: 100)')
-        parser.add_argument('--clear', action='store_true', 
-                            help='Clear existing students before generating new ones')
+        parser.add_argument('--students', type=int,
+                            help='Total number of students; overrides --per_grade')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete all students, drives and vaccinations before generating new ones')
+        parser.add_argument('--vaccines', type=int, default=5,
+                            help='Number of vaccines to use, created if missing (default: 5)')
+        parser.add_argument('--drives', type=int, default=20,
+                            help='Number of vaccination drives, mostly in the past (default: 20)')
+        parser.add_argument('--coverage', type=float, default=0.7,
+                            help='Share of eligible students vaccinated with each vaccine, 0-1 (default: 0.7)')
+        parser.add_argument('--days', type=int, default=730,
+                            help='How far back past drives go, in days (default: 730)')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed (default: 42)')
+        parser.add_argument('--id-prefix', default='ST',
+                            help='Prefix of the generated student IDs, e.g. ST0000001 (default: ST)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes generating students in parallel (default: 1). '
+                                 'Pays off on PostgreSQL; SQLite allows one writer at a time')
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Students generated per unit of work (default: 10000)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per INSERT statement (default: 1000)')
 
     def handle(self, *args, **options):
+        students = options['students']
+        if students is None:
+            students = options['per_grade'] * (MAX_GRADE - MIN_GRADE + 1)
+        if students < 0 or options['vaccines'] < 0 or options['drives'] < 0:
+            raise CommandError('Counts cannot be negative')
+        if not 0 <= options['coverage'] <= 1:
+            raise CommandError('--coverage must be between 0 and 1')
+        if options['workers'] < 1 or options['chunk_size'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers, --chunk-size and --batch-size must be at least 1')
+        if students > 10 ** 7:
+            raise CommandError('At most 10,000,000 students can be generated')
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            # Parallel writers would only queue up behind SQLite's database lock
+            self.stderr.write(self.style.WARNING('SQLite allows one writer at a time; ignoring --workers'))
+            workers = 1
+
+        sample_options = SampleDataOptions(
+            students=students,
+            grades=(MIN_GRADE, MAX_GRADE),
+            vaccines=options['vaccines'],
+            drives=options['drives'],
+            coverage=options['coverage'],
+            days=options['days'],
+            seed=options['seed'],
+            id_prefix=options['id_prefix'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size']
+        )
+
         if options['clear']:
-            self.stdout.write('Clearing existing student data...')
-            Student.objects.all().delete()
-        
-        per_grade = options['per_grade']
-        
-        # First names pool
-        first_names = [
-            'Aarav', 'Advait', 'Arjun', 'Arnav', 'Atharv', 'Ayaan', 'Dhruv', 'Ishaan', 'Kabir', 'Krish',
-            'Madhav', 'Om', 'Pranav', 'Reyansh', 'Rohan', 'Samar', 'Shaurya', 'Vihaan', 'Vivaan', 'Yash',
-            'Aanya', 'Anika', 'Anvi', 'Diya', 'Ishita', 'Kiara', 'Kavya', 'Manya', 'Myra', 'Nisha',
-            'Pari', 'Riya', 'Saanvi', 'Sara', 'Siya', 'Tanvi', 'Trisha', 'Vanya', 'Zara', 'Aadhya',
-            'Ananya', 'Avni', 'Aditi', 'Anaya', 'Aria', 'Eva', 'Ira', 'Kyra', 'Meera', 'Nyra'
-        ]
-        
-        # Last names pool
-        last_names = [
-            'Sharma', 'Verma', 'Patel', 'Kumar', 'Singh', 'Rao', 'Joshi', 'Agarwal', 'Gupta', 'Shah',
-            'Mehta', 'Reddy', 'Nair', 'Pillai', 'Das', 'Bose', 'Banerjee', 'Mukherjee', 'Chatterjee', 'Sen',
-            'Choudhury', 'Yadav', 'Patil', 'Deshmukh', 'Iyer', 'Iyengar', 'Kaur', 'Malhotra', 'Kapoor', 'Khanna',
-            'Bhatia', 'Chauhan', 'Gill', 'Mehra', 'Ahuja', 'Arora', 'Chawla', 'Chopra', 'Bajwa', 'Bedi'
-        ]
-        
-        # Sections
-        sections = ['A', 'B', 'C', 'D']
-        
-        students_created = 0
-        
-        # Generate students for each grade
-        for grade in range(5, 13):  # 5 to 12
-            self.stdout.write(f'Generating students for grade {grade}')
-            
-            for i in range(per_grade):
-                # Generate a random date of birth appropriate for the grade
-                # Calculate approximate age based on grade (e.g., Grade 5 ~ 10-11 years old)
-                approx_age = 5 + grade
-                birth_year = date.today().year - approx_age
-                
-                # Random DOB within the school year
-                start_date = date(birth_year, 1, 1)
-                end_date = date(birth_year, 12, 31)
-                days_between = (end_date - start_date).days
-                random_days = random.randint(0, days_between)
-                date_of_birth = start_date + timedelta(days=random_days)
-                
-                # Generate unique student ID (format: GR<grade><section><3-digit number>)
-                section = random.choice(sections)
-                student_id = f"GR{grade}{section}{i+1:03d}"
-                
-                # Create student
-                Student.objects.create(
-                    first_name=random.choice(first_names),
-                    last_name=random.choice(last_names),
-                    student_id=student_id,
-                    date_of_birth=date_of_birth,
-                    grade=str(grade),
-                    section=section
-                )
-                
-                students_created += 1
-        
-        self.stdout.write(self.style.SUCCESS(f'Successfully created {students_created} students'))
\ No newline at end of file
+            self.stdout.write('Clearing existing students, drives and vaccinations...')
+            clear_sample_data()
+        elif Student.objects.filter(student_id__startswith=options['id_prefix']).exists():
+            raise CommandError(
+                f"Students with IDs starting with '{options['id_prefix']}' already exist; "
+                'use --clear or a different --id-prefix'
+            )
+
+        self.stdout.write(
+            f"Generating {students} students, {options['drives']} drives and "
+            f"vaccinations for {options['vaccines']} vaccines (seed {options['seed']})"
+        )
+        start = time.monotonic()
+
+        def progress(students_created, vaccinations_created):
+            self.stdout.write(f'  {students_created}/{students} students, {vaccinations_created} vaccinations')
+
+        created = generate_sample_data(sample_options, workers=workers, progress=progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully created {created['students']} students, {created['drives']} drives and "
+            f"{created['vaccinations']} vaccinations for {created['vaccines']} vaccines "
+            f'in {time.monotonic() - start:.1f}s'
+        ))
@@ -0,0 +1,17 @@
+# students/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from students.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Drop and rebuild the student search index from the student table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database to rebuild the index in')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the student search index ({connection.vendor})'))
@@ -0,0 +1,64 @@
+# students/management/commands/student_rollover.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from students.bulk import BULK_CHUNK_SIZE, SECTION_RULES, delete_students, promote_students, reassign_sections
+
+
+class Command(BaseCommand):
+    help = (
+        'Year-end student changes in bulk: promote grades, reassign sections or delete '
+        'graduated students. Runs as chunked UPDATE/DELETE statements; use --dry-run to '
+        'see how many students would change'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('operation', choices=['promote', 'sections', 'delete'],
+                            help='promote: move students up a grade; sections: reassign sections; '
+                                 'delete: delete students and their vaccinations')
+        parser.add_argument('--grades', type=int, nargs='+', help='Only students in these grades')
+        parser.add_argument('--all', action='store_true',
+                            help='Every grade; promote and sections need this or --grades')
+        parser.add_argument('--by', type=int, default=1, help='Grades to promote by (default: 1)')
+        parser.add_argument('--sections', nargs='+', help='Sections to fill, e.g. A B C (for sections)')
+        parser.add_argument('--rule', choices=SECTION_RULES, default='round_robin',
+                            help='round_robin deals students out by name; alphabetical gives each section '
+                                 'a block of names (default: round_robin)')
+        parser.add_argument('--id-prefix', help='Only students whose ID starts with this (for delete)')
+        parser.add_argument('--chunk-size', type=int, default=BULK_CHUNK_SIZE,
+                            help=f'Students per UPDATE/DELETE transaction (default: {BULK_CHUNK_SIZE})')
+        parser.add_argument('--dry-run', action='store_true', help='Count the students that would change')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        operation = options['operation']
+        if operation in ('promote', 'sections') and not options['grades'] and not options['all']:
+            raise CommandError('Give --grades, or --all to change every grade')
+        dry_run = options['dry_run']
+        would = 'would be ' if dry_run else ''
+        start = time.monotonic()
+        try:
+            if operation == 'promote':
+                count = promote_students(grades=options['grades'], by=options['by'],
+                                         chunk_size=options['chunk_size'], dry_run=dry_run)
+                summary = f"{count} students {would}promoted by {options['by']} grade(s)"
+            elif operation == 'sections':
+                if not options['sections']:
+                    raise CommandError('--sections is required')
+                count = reassign_sections(options['sections'], rule=options['rule'], grades=options['grades'],
+                                          chunk_size=options['chunk_size'], dry_run=dry_run)
+                summary = f'{count} students {would}moved to another section'
+            else:
+                deleted = delete_students(grades=options['grades'], student_id_prefix=options['id_prefix'],
+                                          chunk_size=options['chunk_size'], dry_run=dry_run)
+                summary = f"{deleted['students']} students and {deleted['vaccinations']} vaccinations {would}deleted"
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if dry_run:
+            self.stdout.write(f'Dry run: {summary}')
+            return
+        self.stdout.write(self.style.SUCCESS(f'{summary} in {time.monotonic() - start:.1f}s'))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['grade', 'section', 'id'], name='student_grade_section_idx'),
+        ),
+    ]
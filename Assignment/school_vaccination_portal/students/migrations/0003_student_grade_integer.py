@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:05
+
+from django.db import migrations, models
+
+
+def copy_grades(apps, schema_editor):
+    Student = apps.get_model('students', 'Student')
+
+    students = []
+    for student in Student.objects.only('id', 'grade').iterator(chunk_size=2000):
+        try:
+            student.grade_int = int(student.grade.strip())
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"Student {student.pk} has a non-numeric grade {student.grade!r}; fix it before migrating."
+            )
+        students.append(student)
+        if len(students) >= 2000:
+            Student.objects.bulk_update(students, ['grade_int'])
+            students = []
+    if students:
+        Student.objects.bulk_update(students, ['grade_int'])
+
+
+def copy_grades_back(apps, schema_editor):
+    Student = apps.get_model('students', 'Student')
+    Student.objects.update(grade=models.functions.Cast('grade_int', models.CharField(max_length=10)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_student_student_grade_section_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='grade_int',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        # Nullable while both columns exist so the migration can be reversed
+        migrations.AlterField(
+            model_name='student',
+            name='grade',
+            field=models.CharField(max_length=10, null=True),
+        ),
+        migrations.RunPython(copy_grades, copy_grades_back),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='student_grade_section_idx',
+        ),
+        migrations.RemoveField(
+            model_name='student',
+            name='grade',
+        ),
+        migrations.RenameField(
+            model_name='student',
+            old_name='grade_int',
+            new_name='grade',
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='grade',
+            field=models.PositiveSmallIntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['grade', 'section', 'id'], name='student_grade_section_idx'),
+        ),
+    ]
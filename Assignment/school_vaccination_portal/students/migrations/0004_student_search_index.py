@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def install(apps, schema_editor):
+    from students.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from students.search import uninstall_search_index
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_student_grade_integer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSearchIndex',
+            fields=[
+                ('student', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='students.student')),
+                ('document', models.TextField(db_column='students_student_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'students_student_fts',
+                'managed': False,
+            },
+        ),
+        # Backend-specific SQL (FTS5 table and triggers, or trigram indexes); see students/search.py
+        migrations.RunPython(install, uninstall),
+    ]
@@ -5,14 +5,59 @@ class Student(models.Model):
     last_name = models.CharField(max_length=100)
     student_id = models.CharField(max_length=20, unique=True)
     date_of_birth = models.DateField()
-    grade = models.CharField(max_length=10)
+    grade = models.PositiveSmallIntegerField()
     section = models.CharField(max_length=10)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset pagination order for the student list
+            models.Index(fields=['grade', 'section', 'id'], name='student_grade_section_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored grade so a grade change can move the dashboard counts
+        instance._loaded_grade = instance.__dict__.get('grade')
+        return instance
+    
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.student_id})"
 
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
+
+
+class FullTextMatch(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class StudentSearchIndex(models.Model):
+    """
+    The SQLite FTS5 student search index, created and kept in sync outside
+    of Django (see students/search.py). Mapped as a read-only model so a
+    search is one join rather than a subquery per student.
+    """
+    student = models.OneToOneField(
+        Student, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column='rowid', db_constraint=False, related_name='search_index'
+    )
+    # FTS5's hidden column named after the table, the left side of MATCH
+    document = models.TextField(db_column='students_student_fts')
+    # bm25() score of the current MATCH, lower is more relevant
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'students_student_fts'
+
+
+StudentSearchIndex._meta.get_field('document').register_lookup(FullTextMatch)
@@ -0,0 +1,199 @@
+# students/search.py
+
+import operator
+import re
+from functools import reduce
+
+from django.db import connections
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Greatest
+
+# SQLite: an FTS5 index over the student table ("external content", so the
+# text is not stored twice), kept in sync by triggers so bulk_create and
+# QuerySet.update() are covered too. PostgreSQL: trigram GIN indexes on the
+# same upper-cased expressions the icontains lookups compile to.
+FTS_TABLE = 'students_student_fts'
+SEARCH_FIELDS = ('first_name', 'last_name', 'student_id')
+NAME_FIELDS = ('first_name', 'last_name')
+
+_SQLITE_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    first_name, last_name, student_id,
+    content='students_student', content_rowid='id', prefix='2 3'
+)
+"""
+
+_SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON students_student BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, student_id)
+            VALUES (new.id, new.first_name, new.last_name, new.student_id);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON students_student BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, student_id)
+            VALUES ('delete', old.id, old.first_name, old.last_name, old.student_id);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF first_name, last_name, student_id ON students_student BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, student_id)
+            VALUES ('delete', old.id, old.first_name, old.last_name, old.student_id);
+            INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, student_id)
+            VALUES (new.id, new.first_name, new.last_name, new.student_id);
+        END
+    """,
+}
+
+_POSTGRESQL_INDEXES = {
+    f'student_{field}_trgm': (
+        f'CREATE INDEX IF NOT EXISTS student_{field}_trgm ON students_student '
+        f'USING gin (UPPER({field}::text) gin_trgm_ops)'
+    )
+    for field in SEARCH_FIELDS
+}
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(term):
+    """
+    Split a search term into the lower-cased words the index is built from,
+    e.g. 'Smith, Jo' -> ['smith', 'jo'] and 'ST-01' -> ['st', '01'].
+    """
+    return _TOKEN_RE.findall((term or '').lower())
+
+
+def install_search_index(connection):
+    """
+    Create the search index for the connection's backend if any part of it
+    is missing, and fill it from the student table.
+
+    Safe to run repeatedly: SQLite drops a table's triggers whenever a
+    migration rebuilds the table, so this runs after every migrate.
+
+    Returns:
+        bool: True if anything had to be created
+    """
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND tbl_name = 'students_student')",
+                [FTS_TABLE]
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = {FTS_TABLE, *_SQLITE_TRIGGERS} - existing
+            if not missing:
+                return False
+
+            cursor.execute(_SQLITE_TABLE)
+            for sql in _SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            # Writes made while a trigger was missing never reached the index
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        return True
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = 'students_student'"
+            )
+            missing = set(_POSTGRESQL_INDEXES) - {row[0] for row in cursor.fetchall()}
+            if not missing:
+                return False
+
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for name in missing:
+                cursor.execute(_POSTGRESQL_INDEXES[name])
+        return True
+
+    return False
+
+
+def uninstall_search_index(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for name in _SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            for name in _POSTGRESQL_INDEXES:
+                cursor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def rebuild_search_index(connection):
+    """
+    Drop and recreate the search index from the student table.
+    """
+    uninstall_search_index(connection)
+    install_search_index(connection)
+
+
+def _fts_match(tokens_by_columns):
+    # Every token must match as a word prefix in one of its columns, e.g.
+    # {first_name last_name} : "jo"* AND {first_name last_name} : "sm"*
+    # Tokens are \w+ runs, so quoting them is all the escaping they need.
+    return ' AND '.join(
+        f'{{{" ".join(columns)}}} : "{token}"*'
+        for columns, tokens in tokens_by_columns
+        for token in tokens
+    )
+
+
+def search_students(queryset, text=None, name=None, student_id=None):
+    """
+    Filter students by prefix search and annotate each with a relevance score.
+
+    Args:
+        queryset: A Student queryset
+        text: Matched against names and student IDs
+        name: Matched against first and last names
+        student_id: Matched against student IDs
+
+    Every word of each term must match the start of a word in its fields,
+    so 'jo sm' finds 'John Smith' and 'st-00' finds 'ST-001'.
+
+    Returns:
+        QuerySet: Matching students with a `search_rank` annotation; higher
+        is more relevant
+    """
+    tokens_by_columns = [
+        (columns, tokenize(term))
+        for columns, term in ((SEARCH_FIELDS, text), (NAME_FIELDS, name), (('student_id',), student_id))
+        if term is not None
+    ]
+    if not tokens_by_columns or not all(tokens for _, tokens in tokens_by_columns):
+        # A term with nothing searchable in it, e.g. only punctuation
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'sqlite':
+        # FTS5's rank is bm25(), where lower means more relevant
+        return queryset.filter(
+            search_index__document__match=_fts_match(tokens_by_columns)
+        ).annotate(search_rank=-F('search_index__rank'))
+
+    # PostgreSQL's icontains is served by the trigram indexes; other backends scan
+    conditions = [
+        reduce(operator.or_, (Q(**{f'{column}__icontains': token}) for column in columns))
+        for columns, tokens in tokens_by_columns
+        for token in tokens
+    ]
+    queryset = queryset.filter(reduce(operator.and_, conditions))
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        terms = [' '.join(tokens) for _, tokens in tokens_by_columns]
+        similarities = [
+            TrigramSimilarity(column, term)
+            for (columns, _), term in zip(tokens_by_columns, terms)
+            for column in columns
+        ]
+        rank = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        return queryset.annotate(search_rank=rank)
+
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
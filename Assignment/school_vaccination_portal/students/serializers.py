@@ -1,3 +1,4 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Student
 from vaccination_drives.models import StudentVaccination
@@ -7,17 +8,29 @@ class StudentSerializer(serializers.ModelSerializer):
         model = Student
         fields = '__all__'
 
+def prefetch_vaccinations(queryset):
+    """
+    Attach each student's vaccinations (with their vaccine) to the queryset
+    so that VaccinationStatusField can be rendered for a whole page in a single
+    extra query instead of one per student.
+    """
+    return queryset.prefetch_related(
+        Prefetch(
+            'studentvaccination_set',
+            queryset=StudentVaccination.objects.select_related('vaccine').order_by('id')
+        )
+    )
+
 class VaccinationStatusField(serializers.Field):
     def to_representation(self, value):
-        from vaccination_drives.models import StudentVaccination
-        
         try:
-            # Use select_related to reduce database queries
-            vaccinations = StudentVaccination.objects.filter(student=value).select_related(
-                'vaccination_drive__vaccine'
-            )
+            # Served from the prefetch cache when the queryset went through
+            # prefetch_vaccinations(), otherwise falls back to a single query
+            vaccinations = value.studentvaccination_set.all()
+            if 'studentvaccination_set' not in getattr(value, '_prefetched_objects_cache', {}):
+                vaccinations = vaccinations.select_related('vaccine')
             
-            if not vaccinations.exists():
+            if not vaccinations:
                 return {
                     'status': 'Not Vaccinated',
                     'count': 0,
@@ -30,7 +43,7 @@ class VaccinationStatusField(serializers.Field):
                 try:
                     vaccines.append({
                         'id': vacc.id,
-                        'vaccine_name': vacc.vaccination_drive.vaccine.name,
+                        'vaccine_name': vacc.vaccine.name,
                         'date': vacc.date_administered.strftime('%Y-%m-%d')
                     })
                 except Exception as e:
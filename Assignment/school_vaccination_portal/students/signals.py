@@ -0,0 +1,22 @@
+# students/signals.py
+
+from django.db import connections, router
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from school_vaccination_portal.cache import STUDENTS, invalidate_on_commit
+from .models import Student
+from .search import install_search_index
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def invalidate_student_responses(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_on_commit(STUDENTS)
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    # Any later migration that rebuilds the student table on SQLite drops
+    # the search triggers with it; put them back and refill the index
+    if router.allow_migrate_model(using, Student):
+        install_search_index(connections[using])
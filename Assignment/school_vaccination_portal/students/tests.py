@@ -1,3 +1,669 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from authentication.authentication import user_cache
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from reports.models import DailyVaccinationRollup, DashboardStat
+from reports.stats import rebuild_daily_rollup, rebuild_dashboard_stats
+from rest_framework_simplejwt.tokens import RefreshToken
+from school_vaccination_portal.cache import get_response_cache
+from school_vaccination_portal.pagination import StudentSearchPagination
+from school_vaccination_portal.utils import import_students_csv
+from vaccination_drives.models import StudentVaccination, Vaccine, VaccinationDrive
+from .bulk import delete_students, promote_students, reassign_sections
+from .models import Student
+from .search import search_students
+
+
+def create_students(count, grades=(5, 6, 7), sections=('A', 'B'), prefix='ST'):
+    return Student.objects.bulk_create([
+        Student(
+            first_name=f'First{i}', last_name=f'Last{i}', student_id=f'{prefix}{i:05d}',
+            date_of_birth=date(2012, 1, 1), grade=grades[i % len(grades)], section=sections[i % len(sections)]
+        )
+        for i in range(count)
+    ])
+
+
+class CacheClearingTestCase(TestCase):
+    def setUp(self):
+        # Test transactions never commit, so responses cached by an earlier
+        # test are never invalidated and would outlive its rows
+        get_response_cache().clear()
+
+    def walk(self, url):
+        """
+        Follow `next` links from url.
+
+        Returns:
+            list: Every page's response data
+        """
+        pages = []
+        while url:
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            url = pages[-1]['next']
+        return pages
+
+
+class StudentPaginationTests(CacheClearingTestCase):
+    def test_pages_cover_every_student_once_in_keyset_order(self):
+        create_students(23)
+        pages = self.walk('/api/students/?page_size=5')
+
+        rows = [row for page in pages for row in page['results']]
+        self.assertEqual(len(pages), 5)
+        self.assertEqual(
+            [row['id'] for row in rows],
+            list(Student.objects.order_by('grade', 'section', 'id').values_list('id', flat=True))
+        )
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_link_returns_the_page_before(self):
+        create_students(12)
+        pages = self.walk('/api/students/?page_size=5')
+
+        previous = self.client.get(pages[2]['previous'], HTTP_ACCEPT='application/json').json()
+        self.assertEqual(previous['results'], pages[1]['results'])
+        self.assertIsNotNone(previous['previous'])
+        self.assertIsNotNone(previous['next'])
+
+    def test_rows_added_before_the_cursor_do_not_shift_later_pages(self):
+        create_students(10, grades=(6,))
+        first = self.client.get('/api/students/?page_size=4', HTTP_ACCEPT='application/json').json()
+        # Sorts before every existing student; an OFFSET page would repeat a row
+        create_students(3, grades=(5,), prefix='EARLY')
+        get_response_cache().clear()
+
+        rest = self.walk(first['next'])
+        ids = [row['id'] for row in first['results']] + [row['id'] for page in rest for row in page['results']]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), set(Student.objects.filter(grade=6).values_list('id', flat=True)))
+
+    def test_filters_are_kept_in_the_next_link(self):
+        create_students(12)
+        pages = self.walk('/api/students/?grade=6&page_size=2')
+
+        grades = {row['grade'] for page in pages for row in page['results']}
+        self.assertEqual(grades, {6})
+        self.assertEqual(sum(len(page['results']) for page in pages), 4)
+
+    def test_invalid_cursor_is_not_found(self):
+        create_students(3)
+        response = self.client.get('/api/students/?cursor=not-a-cursor', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+class StudentListQueryTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.drives = [
+            VaccinationDrive.objects.create(
+                vaccine=Vaccine.objects.create(name=name), date=date.today() + timedelta(days=20),
+                doses_available=500, applicable_grades='5-7'
+            )
+            for name in ('Polio', 'MMR')
+        ]
+
+    def add_vaccinated_students(self, count, prefix):
+        students = create_students(count, prefix=prefix)
+        StudentVaccination.objects.bulk_create([
+            StudentVaccination(student=student, vaccination_drive=drive, vaccine_id=drive.vaccine_id)
+            for student in students for drive in self.drives
+        ])
+
+    def count_list_queries(self):
+        # bulk_create invalidates nothing, so drop the previous roster's page
+        get_response_cache().clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/students/?page_size=100', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(row['vaccination_status']['count'] == 2 for row in response.json()['results']))
+        return len(response.json()['results']), len(queries)
+
+    def test_query_count_does_not_grow_with_the_roster(self):
+        self.add_vaccinated_students(3, 'SMALL')
+        small_rows, small_queries = self.count_list_queries()
+
+        self.add_vaccinated_students(60, 'LARGE')
+        large_rows, large_queries = self.count_list_queries()
+
+        self.assertEqual((small_rows, large_rows), (3, 63))
+        self.assertEqual(small_queries, large_queries)
+
+    def test_detail_loads_vaccinations_in_one_query(self):
+        self.add_vaccinated_students(1, 'ONE')
+        student = Student.objects.get()
+
+        # Validators, the student, then their vaccinations with vaccines
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/students/{student.pk}/', HTTP_ACCEPT='application/json')
+        self.assertEqual(len(response.json()['vaccination_status']['vaccines']), 2)
+
+
+def csv_upload(lines, encoding='utf-8'):
+    header = 'first_name,last_name,student_id,date_of_birth,grade,section'
+    return SimpleUploadedFile('students.csv', '\n'.join([header, *lines]).encode(encoding), content_type='text/csv')
+
+
+class StudentImportTests(CacheClearingTestCase):
+    def test_rows_are_imported_in_chunks(self):
+        progress = []
+        lines = [f'Ann,Lee,IM{i:03d},2012-01-0{i + 1},{5 + i % 2},A' for i in range(5)]
+        created, errors = import_students_csv(
+            csv_upload(lines), chunk_size=2, progress=lambda rows, created, errors: progress.append((rows, created))
+        )
+
+        self.assertEqual((created, errors), (5, []))
+        self.assertEqual(progress, [(2, 2), (4, 4), (5, 5)])
+        self.assertEqual(Student.objects.filter(student_id__startswith='IM').count(), 5)
+        # bulk_create sends no signals; the import counts the students itself
+        self.assertEqual(DashboardStat.objects.get(scope='total').students, 5)
+        self.assertEqual(DashboardStat.objects.get(scope='grade', key=5).students, 3)
+
+    def test_duplicates_are_reported_and_skipped(self):
+        create_students(1, prefix='DUP')
+        lines = [
+            'Ann,Lee,DUP00000,2012-01-01,5,A',   # Already in the database
+            'Bob,Kay,NEW1,2012-01-01,5,A',
+            'Bob,Kay,NEW1,2012-01-01,5,A',       # Twice in the same chunk
+            'Cat,Ng,NEW2,2012-01-01,6,B',
+            'Cat,Ng,NEW2,2012-01-01,6,B',        # Again in a later chunk
+        ]
+        created, errors = import_students_csv(csv_upload(lines), chunk_size=4)
+
+        self.assertEqual(created, 2)
+        self.assertEqual(errors, [
+            'Row 2: Student with ID DUP00000 already exists',
+            'Row 4: Student with ID NEW1 appears more than once in the file',
+            'Row 6: Student with ID NEW2 already exists',
+        ])
+        self.assertEqual(Student.objects.count(), 3)
+
+    def test_invalid_rows_are_reported_and_valid_rows_imported(self):
+        lines = [
+            'Ann,Lee,OK1,2012-01-01,5,A',
+            'Bob,Kay,BAD1,01/02/2012,5,A',
+            'Cat,Ng,BAD2,2012-01-01,five,B',
+            'Dan,Oh,BAD3,2012-01-01,-1,B',
+        ]
+        created, errors = import_students_csv(csv_upload(lines))
+
+        self.assertEqual(created, 1)
+        self.assertEqual(errors, [
+            'Row 3: Invalid date format for BAD1. Use YYYY-MM-DD',
+            'Row 4: Invalid grade for BAD2. Use a whole number',
+            'Row 5: Invalid grade for BAD3. Use a whole number',
+        ])
+        self.assertEqual(list(Student.objects.values_list('student_id', flat=True)), ['OK1'])
+
+    def test_latin1_file_is_decoded(self):
+        created, errors = import_students_csv(csv_upload(['José,Núñez,L1,2012-01-01,5,A'], encoding='latin-1'))
+
+        self.assertEqual((created, errors), (1, []))
+        self.assertEqual(Student.objects.get(student_id='L1').first_name, 'José')
+
+    def test_missing_columns_are_rejected(self):
+        upload = SimpleUploadedFile('students.csv', b'first_name,last_name\nAnn,Lee\n', content_type='text/csv')
+        response = self.client.post('/api/students/bulk_import/', {'file': upload})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('missing required columns', response.json()['error'])
+        self.assertFalse(Student.objects.exists())
+
+    def test_bulk_import_endpoint_returns_row_errors(self):
+        lines = ['Ann,Lee,API1,2012-01-01,5,A', 'Bob,Kay,API2,not-a-date,5,A']
+        response = self.client.post('/api/students/bulk_import/', {'file': csv_upload(lines)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'message': 'Successfully imported 1 students',
+            'errors': ['Row 3: Invalid date format for API2. Use YYYY-MM-DD'],
+        })
+
+
+class ResponseCacheTests(CacheClearingTestCase):
+    def get(self, url, **extra):
+        return self.client.get(url, HTTP_ACCEPT='application/json', **extra)
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        create_students(3)
+
+        first = self.get('/api/students/')
+        second = self.get('/api/students/')
+
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(self.get('/api/students/?grade=5')['X-Cache'], 'MISS')
+
+    def test_write_invalidates_the_namespace_once_committed(self):
+        student = create_students(1)[0]
+        self.get(f'/api/students/{student.pk}/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/students/{student.pk}/', {'first_name': 'Renamed'},
+                                         content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.get(f'/api/students/{student.pk}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['first_name'], 'Renamed')
+
+    def test_uncommitted_write_does_not_invalidate(self):
+        # Until the transaction commits another request could still read and
+        # cache the old rows, so the version must not move yet
+        create_students(2)
+        self.get('/api/students/')
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Student.objects.create(first_name='New', last_name='Kid', student_id='LATE',
+                                   date_of_birth=date(2012, 1, 1), grade=5, section='A')
+
+        self.assertTrue(callbacks)
+        self.assertEqual(self.get('/api/students/')['X-Cache'], 'HIT')
+
+    def test_vaccination_invalidates_student_responses(self):
+        student = create_students(1)[0]
+        drive = VaccinationDrive.objects.create(
+            vaccine=Vaccine.objects.create(name='Polio'), date=date.today() + timedelta(days=20),
+            doses_available=10, applicable_grades='5-7'
+        )
+        self.assertEqual(self.get('/api/students/').json()['results'][0]['vaccination_status']['count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentVaccination.objects.create(student=student, vaccination_drive=drive)
+
+        response = self.get('/api/students/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['vaccination_status']['count'], 1)
+
+
+class ConditionalGetTests(CacheClearingTestCase):
+    def get(self, url, **extra):
+        return self.client.get(url, HTTP_ACCEPT='application/json', **extra)
+
+    def test_list_answers_a_matching_etag_with_304(self):
+        create_students(3)
+        response = self.get('/api/students/')
+        etag = response['ETag']
+
+        not_modified = self.get('/api/students/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(not_modified.content, b'')
+        # Each filter is its own representation
+        self.assertEqual(self.get('/api/students/?grade=5', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_etag_changes_when_the_row_changes(self):
+        student = create_students(1)[0]
+        etag = self.get(f'/api/students/{student.pk}/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/students/{student.pk}/', {'section': 'C'}, content_type='application/json')
+
+        response = self.get(f'/api/students/{student.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['section'], 'C')
+
+    def test_if_modified_since(self):
+        create_students(2)
+        last_modified = self.get('/api/students/')['Last-Modified']
+
+        self.assertEqual(self.get('/api/students/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_compressed_responses_carry_a_weak_etag_that_still_matches(self):
+        create_students(40)
+        response = self.get('/api/students/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+
+        response = self.get('/api/students/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_dashboard_stats_etag_follows_the_counters(self):
+        etag = self.get('/api/reports/dashboard_stats/')['ETag']
+        self.assertEqual(self.get('/api/reports/dashboard_stats/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(first_name='New', last_name='Kid', student_id='DASH1',
+                                   date_of_birth=date(2012, 1, 1), grade=5, section='A')
+
+        response = self.get('/api/reports/dashboard_stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_students'], 1)
+
+
+class StudentSearchTests(CacheClearingTestCase):
+    def search(self, **terms):
+        return set(search_students(Student.objects.all(), **terms).values_list('student_id', flat=True))
+
+    def add(self, first_name, last_name, student_id):
+        return Student.objects.create(first_name=first_name, last_name=last_name, student_id=student_id,
+                                      date_of_birth=date(2012, 1, 1), grade=5, section='A')
+
+    def test_every_word_matches_a_word_prefix(self):
+        self.add('John', 'Smith', 'ST-001')
+        self.add('Joan', 'Smythe', 'ST-002')
+        self.add('Mary', 'Johnson', 'ST-003')
+
+        self.assertEqual(self.search(name='jo sm'), {'ST-001', 'ST-002'})
+        self.assertEqual(self.search(name='smi'), {'ST-001'})
+        self.assertEqual(self.search(name='john'), {'ST-001', 'ST-003'})
+        self.assertEqual(self.search(student_id='st-00'), {'ST-001', 'ST-002', 'ST-003'})
+        self.assertEqual(self.search(text='mary st-003'), {'ST-003'})
+        self.assertEqual(self.search(name='--'), set())
+
+    def test_index_follows_saves_and_deletes(self):
+        student = self.add('Alice', 'Brown', 'FT1')
+
+        student.last_name = 'Green'
+        student.save()
+        self.assertEqual(self.search(name='brown'), set())
+        self.assertEqual(self.search(name='green'), {'FT1'})
+
+        student.delete()
+        self.assertEqual(self.search(name='alice'), set())
+
+    def test_index_follows_bulk_create_and_queryset_update(self):
+        create_students(3, prefix='BULK')
+        self.assertEqual(self.search(name='first1'), {'BULK00001'})
+
+        Student.objects.filter(student_id='BULK00001').update(first_name='Zed')
+        self.assertEqual(self.search(name='first1'), set())
+        self.assertEqual(self.search(name='zed'), {'BULK00001'})
+
+        Student.objects.filter(student_id__startswith='BULK').delete()
+        self.assertEqual(self.search(name='zed'), set())
+
+    def test_pages_cover_every_match_once(self):
+        create_students(17)
+        for i in range(3):
+            self.add('Other', 'Person', f'NO{i}')
+
+        pages = self.walk('/api/students/?name=first&page_size=4')
+
+        ids = [row['student_id'] for page in pages for row in page['results']]
+        self.assertEqual(len(pages), 5)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), {f'ST{i:05d}' for i in range(17)})
+
+        previous = self.client.get(pages[2]['previous'], HTTP_ACCEPT='application/json').json()
+        self.assertEqual(previous['results'], pages[1]['results'])
+
+    @mock.patch.object(StudentSearchPagination, 'max_results', 7)
+    def test_results_stop_at_max_results(self):
+        create_students(12)
+
+        pages = self.walk('/api/students/?name=first&page_size=3')
+
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        self.assertIsNone(pages[-1]['next'])
+
+    def test_cursor_with_a_bad_depth_is_not_found(self):
+        create_students(3)
+        token = base64.urlsafe_b64encode(json.dumps({'p': [0, 1], 'd': -1}).encode('ascii')).decode('ascii')
+
+        response = self.client.get(f'/api/students/?name=first&cursor={token}', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+class BatchTests(CacheClearingTestCase):
+    def batch(self, operations, **options):
+        return self.client.post('/api/batch/', {'operations': operations, **options}, content_type='application/json')
+
+    def create(self, student_id, grade=5):
+        return {'method': 'POST', 'path': '/api/students/', 'body': {
+            'first_name': 'Ann', 'last_name': 'Lee', 'student_id': student_id,
+            'date_of_birth': '2012-01-01', 'grade': grade, 'section': 'A',
+        }}
+
+    def test_all_operations_succeed(self):
+        student = create_students(1)[0]
+        response = self.batch([
+            self.create('B1'),
+            {'method': 'PATCH', 'path': f'/api/students/{student.pk}/', 'body': {'section': 'C'}},
+            {'method': 'GET', 'path': f'/api/students/{student.pk}/'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['committed'])
+        self.assertEqual([result['status'] for result in response.json()['results']], [201, 200, 200])
+        # Later operations see the earlier ones' writes
+        self.assertEqual(response.json()['results'][2]['body']['section'], 'C')
+        self.assertTrue(Student.objects.filter(student_id='B1').exists())
+
+    def test_atomic_batch_rolls_back_on_the_first_failure(self):
+        response = self.batch([self.create('B1'), self.create('B2', grade='x'), self.create('B3')])
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(response.json()['committed'])
+        self.assertEqual([result['status'] for result in response.json()['results']], [201, 400, 424])
+        self.assertFalse(Student.objects.exists())
+
+    def test_non_atomic_batch_keeps_the_operations_that_succeeded(self):
+        response = self.batch([self.create('B1'), self.create('B1'), self.create('B3')], atomic=False)
+
+        self.assertEqual(response.status_code, 207)
+        self.assertTrue(response.json()['committed'])
+        self.assertEqual([result['status'] for result in response.json()['results']], [201, 400, 201])
+        self.assertEqual(set(Student.objects.values_list('student_id', flat=True)), {'B1', 'B3'})
+
+    def test_non_atomic_batch_where_everything_fails(self):
+        response = self.batch([self.create('B1', grade='x')], atomic=False)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(response.json()['committed'])
+
+    @override_settings(BATCH_MAX_OPERATIONS=2)
+    def test_too_many_operations(self):
+        response = self.batch([self.create('B1'), self.create('B2'), self.create('B3')])
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Student.objects.exists())
+
+    def test_malformed_operations_are_rejected_before_any_run(self):
+        response = self.batch([
+            self.create('B1'),
+            {'method': 'POST', 'path': '/api/batch/', 'body': {'operations': []}},
+            {'method': 'TRACE', 'path': '/api/students/'},
+            {'method': 'GET', 'path': '/admin/'},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['operations'], {
+            '1': 'Batches cannot be nested',
+            '2': 'method must be one of GET, POST, PUT, PATCH, DELETE',
+            '3': 'path must be an API path, e.g. /api/students/',
+        })
+        self.assertFalse(Student.objects.exists())
+        self.assertEqual(self.batch([]).status_code, 400)
+
+
+class BulkOperationTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.students = create_students(12, grades=(10, 11), sections=('A',))
+        self.drive = VaccinationDrive.objects.create(
+            vaccine=Vaccine.objects.create(name='Polio'), date=date.today() + timedelta(days=20),
+            doses_available=100, applicable_grades='10-11'
+        )
+        # bulk_create sends no signals; count the vaccinations below the same way
+        StudentVaccination.objects.bulk_create([
+            StudentVaccination(student=student, vaccination_drive=self.drive, vaccine_id=self.drive.vaccine_id,
+                               date_administered=date.today() - timedelta(days=i % 3))
+            for i, student in enumerate(self.students[:7])
+        ])
+        VaccinationDrive.objects.filter(pk=self.drive.pk).update(doses_used=7)
+        rebuild_dashboard_stats()
+        rebuild_daily_rollup()
+
+    def snapshot(self):
+        return (
+            sorted(DashboardStat.objects.values_list('scope', 'key', 'students', 'vaccinated_students')),
+            sorted(DailyVaccinationRollup.objects.values_list('day', 'vaccine_id', 'grade', 'doses')),
+        )
+
+    def assert_counters_match_rebuild(self):
+        maintained = self.snapshot()
+        rebuild_dashboard_stats()
+        rebuild_daily_rollup()
+        self.assertEqual(maintained, self.snapshot())
+        drive = VaccinationDrive.objects.annotate(actual=Count('studentvaccination')).get(pk=self.drive.pk)
+        self.assertEqual(drive.doses_used, drive.actual)
+
+    def test_promote_in_chunks(self):
+        self.assertEqual(promote_students(grades=[10], chunk_size=4), 6)
+
+        self.assertEqual(Student.objects.filter(grade=11).count(), 12)
+        self.assert_counters_match_rebuild()
+
+    def test_promote_refuses_to_pass_the_top_grade(self):
+        with self.assertRaisesMessage(ValueError, '6 students would pass grade 12'):
+            promote_students(by=2)
+        with self.assertRaisesMessage(ValueError, 'promoted by 1 or more'):
+            promote_students(grades=[10], by=0)
+        self.assertEqual(Student.objects.filter(grade=10).count(), 6)
+
+    def test_dry_run_changes_nothing(self):
+        before = self.snapshot()
+
+        self.assertEqual(promote_students(grades=[10], dry_run=True), 6)
+        self.assertEqual(delete_students(grades=[11], dry_run=True), {'students': 6, 'vaccinations': 3})
+
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(Student.objects.filter(grade=10).count(), 6)
+
+    def test_reassign_sections_round_robin(self):
+        moved = reassign_sections(['A', 'B', 'C'], chunk_size=2)
+
+        self.assertEqual(moved, 8)  # A third of each grade stays in A
+        for grade in (10, 11):
+            sections = Student.objects.filter(grade=grade).values('section').annotate(n=Count('id'))
+            self.assertEqual(sorted((row['section'], row['n']) for row in sections), [('A', 2), ('B', 2), ('C', 2)])
+        self.assertEqual(reassign_sections(['A', 'B', 'C']), 0)
+
+    def test_reassign_sections_alphabetical(self):
+        reassign_sections(['A', 'B'], rule='alphabetical', grades=[10])
+
+        ordered = Student.objects.filter(grade=10).order_by('last_name', 'first_name', 'pk')
+        self.assertEqual(list(ordered.values_list('section', flat=True)), ['A', 'A', 'A', 'B', 'B', 'B'])
+
+    def test_delete_in_chunks(self):
+        deleted = delete_students(grades=[11], chunk_size=4)
+
+        self.assertEqual(deleted, {'students': 6, 'vaccinations': 3})
+        self.assertFalse(Student.objects.filter(grade=11).exists())
+        self.assertEqual(StudentVaccination.objects.count(), 4)
+        self.assertEqual(set(search_students(Student.objects.all(), name='first').values_list('grade', flat=True)),
+                         {10})
+        self.assert_counters_match_rebuild()
+
+    def test_delete_needs_a_filter(self):
+        with self.assertRaises(ValueError):
+            delete_students()
+        self.assertEqual(Student.objects.count(), 12)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkEndpointTests(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        # Rolled back users' IDs are reused by the next test
+        user_cache.clear()
+        User = get_user_model()
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        self.teacher = User.objects.create_user('teacher', password='x')
+        create_students(6, grades=(5, 6))
+
+    def post(self, action, data, user=None):
+        headers = {}
+        if user:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+        return self.client.post(f'/api/students/{action}/', data, content_type='application/json', **headers)
+
+    def test_only_staff_can_run_bulk_actions(self):
+        for action in ('bulk_promote', 'bulk_reassign_sections', 'bulk_delete'):
+            self.assertEqual(self.post(action, {'grades': [5]}).status_code, 401)
+            self.assertEqual(self.post(action, {'grades': [5]}, self.teacher).status_code, 403)
+        self.assertEqual(Student.objects.filter(grade=5).count(), 3)
+
+    def test_whole_school_changes_must_be_confirmed(self):
+        response = self.post('bulk_promote', {}, self.staff)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('"all": true', response.json()['error'])
+        self.assertEqual(self.post('bulk_reassign_sections', {'sections': ['A']}, self.staff).status_code, 400)
+
+        response = self.post('bulk_promote', {'all': True}, self.staff)
+        self.assertEqual(response.json(), {'dry_run': False, 'promoted': 6})
+
+    def test_invalid_parameters(self):
+        for data in ({'grades': [5], 'by': 0}, {'grades': [5], 'by': '1'}, {'grades': []},
+                     {'grades': [5], 'dry_run': 'yes'}):
+            self.assertEqual(self.post('bulk_promote', data, self.staff).status_code, 400)
+        self.assertEqual(self.post('bulk_reassign_sections', {'all': True, 'sections': ['A'], 'rule': 'random'},
+                                   self.staff).status_code, 400)
+        self.assertEqual(self.post('bulk_delete', {}, self.staff).status_code, 400)
+        self.assertEqual(Student.objects.filter(grade=5).count(), 3)
+
+    def test_bulk_delete(self):
+        response = self.post('bulk_delete', {'student_id_prefix': 'ST0000'}, self.staff)
+
+        self.assertEqual(response.json(), {'dry_run': False, 'deleted': {'students': 6, 'vaccinations': 0}})
+        self.assertFalse(Student.objects.exists())
+
+
+class StudentGradeMigrationTests(TransactionTestCase):
+    """
+    students.0003 turns the free-text grade into an integer column.
+    """
+    before = [('students', '0002_student_student_grade_section_idx')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        self.addCleanup(self.migrate_to_latest)
+        self.OldStudent = self.executor.loader.project_state(self.before).apps.get_model('students', 'Student')
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate([('students', '0003_student_grade_integer')])
+
+    def add(self, student_id, grade):
+        self.OldStudent.objects.create(first_name='Ann', last_name='Lee', student_id=student_id,
+                                       date_of_birth=date(2012, 1, 1), grade=grade, section='A')
+
+    def test_numeric_grades_become_integers(self):
+        self.add('G1', '5')
+        self.add('G2', ' 12 ')
+
+        self.migrate()
+
+        Student = self.executor.loader.project_state([('students', '0003_student_grade_integer')]).apps.get_model(
+            'students', 'Student'
+        )
+        self.assertEqual(dict(Student.objects.values_list('student_id', 'grade')), {'G1': 5, 'G2': 12})
+
+    def test_non_numeric_grade_stops_the_migration(self):
+        self.add('G1', '5')
+        self.add('LEGACY', 'Grade 5')
+
+        with self.assertRaisesMessage(ValueError, "non-numeric grade 'Grade 5'"):
+            self.migrate()
+
+        # Rolled back: the text column and its values are still there
+        self.assertEqual(set(self.OldStudent.objects.values_list('grade', flat=True)), {'5', 'Grade 5'})
+        self.OldStudent.objects.filter(student_id='LEGACY').update(grade='5')
@@ -1,16 +1,48 @@
-from django.db import models  
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-import csv
-import io
+from .bulk import SECTION_RULES, delete_students, promote_students, reassign_sections
 from .models import Student
-from .serializers import StudentSerializer, StudentDetailSerializer, StudentListSerializer
-from school_vaccination_portal.utils import generate_students_csv, generate_students_template_csv
+from .search import search_students
+from .serializers import StudentSerializer, StudentDetailSerializer, StudentListSerializer, prefetch_vaccinations
+from school_vaccination_portal.cache import CachedResponseMixin
+from school_vaccination_portal.conditional import ConditionalGetMixin
+from school_vaccination_portal.databases import replica_reads
+from school_vaccination_portal.pagination import StudentPagination, StudentSearchPagination
+from school_vaccination_portal.exports import EXPORT_FORMATS, EXPORT_RENDERER_CLASSES, streams_async
+from school_vaccination_portal.utils import generate_students_export, generate_students_template_csv, import_students_csv
 
-class StudentViewSet(viewsets.ModelViewSet):
+def _parse_bulk_params(data, whole_school=False):
+    """
+    Read the `grades` (list of ints) and `dry_run` parameters shared by the
+    bulk actions. With `whole_school`, leaving out `grades` means every
+    grade, but only when the caller also sends `"all": true`.
+
+    Raises:
+        ValueError: If either is malformed, or all grades are meant but not confirmed
+    """
+    grades = data.get('grades')
+    if grades is not None:
+        if not isinstance(grades, list) or not grades:
+            raise ValueError('grades must be a non-empty list of grades')
+        try:
+            grades = [int(grade) for grade in grades]
+        except (TypeError, ValueError):
+            raise ValueError('grades must be a non-empty list of grades')
+    elif whole_school and data.get('all') is not True:
+        raise ValueError('Give the grades to change, or "all": true to change every grade')
+
+    dry_run = data.get('dry_run', False)
+    if not isinstance(dry_run, bool):
+        raise ValueError('dry_run must be true or false')
+    return grades, dry_run
+
+
+class StudentViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
+    pagination_class = StudentPagination
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -19,6 +51,15 @@ class StudentViewSet(viewsets.ModelViewSet):
             return StudentDetailSerializer
         return StudentSerializer
     
+    @property
+    def paginator(self):
+        # Searches page through the results best match first
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            searching = self.action == 'list' and (params.get('name') or params.get('student_id'))
+            self._paginator = StudentSearchPagination() if searching else StudentPagination()
+        return self._paginator
+    
     def get_queryset(self):
         queryset = Student.objects.all()
         
@@ -29,24 +70,22 @@ class StudentViewSet(viewsets.ModelViewSet):
         vaccination_status = self.request.query_params.get('vaccination_status')
         vaccine_id = self.request.query_params.get('vaccine_id')
         
-        if name:
-            queryset = queryset.filter(
-                models.Q(first_name__icontains=name) | 
-                models.Q(last_name__icontains=name)
-            )
+        if name or student_id:
+            # Indexed prefix search; see students/search.py
+            queryset = search_students(queryset, name=name or None, student_id=student_id or None)
         
         if grade:
-            queryset = queryset.filter(grade=grade)
-            
-        if student_id:
-            queryset = queryset.filter(student_id__icontains=student_id)
+            try:
+                queryset = queryset.filter(grade=int(grade))
+            except ValueError:
+                queryset = queryset.none()
             
         if vaccination_status and vaccine_id:
             from vaccination_drives.models import StudentVaccination, Vaccine
             try:
                 vaccine = Vaccine.objects.get(id=vaccine_id)
                 vaccinated_student_ids = StudentVaccination.objects.filter(
-                    vaccination_drive__vaccine=vaccine
+                    vaccine=vaccine
                 ).values_list('student_id', flat=True)
                 
                 if vaccination_status.lower() == 'yes':
@@ -55,6 +94,10 @@ class StudentViewSet(viewsets.ModelViewSet):
                     queryset = queryset.exclude(id__in=vaccinated_student_ids)
             except Vaccine.DoesNotExist:
                 pass
+        
+        # Load vaccination status for the whole page in one query
+        if self.action in ('list', 'retrieve'):
+            queryset = prefetch_vaccinations(queryset)
                 
         return queryset
     
@@ -66,83 +109,106 @@ class StudentViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Please upload a CSV file'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Decode the file with a more robust approach
-            try:
-                decoded_file = csv_file.read().decode('utf-8')
-            except UnicodeDecodeError:
-                # Try different encoding if utf-8 fails
-                decoded_file = csv_file.read().decode('latin-1')
-            
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-            
-            # Check if required columns are present
-            required_fields = ['first_name', 'last_name', 'student_id', 'date_of_birth', 'grade', 'section']
-            header = reader.fieldnames
-            
-            if not header or not all(field in header for field in required_fields):
-                missing = [field for field in required_fields if field not in (header or [])]
-                return Response({
-                    'error': f'CSV file is missing required columns: {", ".join(missing)}'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Process the CSV data
-            students_created = 0
-            errors = []
-            
-            for row_num, row in enumerate(reader, start=2):  # Start at 2 to account for header row
-                try:
-                    # Check if student ID already exists
-                    if Student.objects.filter(student_id=row.get('student_id')).exists():
-                        errors.append(f"Row {row_num}: Student with ID {row.get('student_id')} already exists")
-                        continue
-                    
-                    # Validate date format
-                    try:
-                        date_of_birth = datetime.strptime(row.get('date_of_birth', ''), '%Y-%m-%d').date()
-                    except ValueError:
-                        errors.append(f"Row {row_num}: Invalid date format for {row.get('student_id')}. Use YYYY-MM-DD")
-                        continue
-                    
-                    # Create the student
-                    Student.objects.create(
-                        first_name=row.get('first_name'),
-                        last_name=row.get('last_name'),
-                        student_id=row.get('student_id'),
-                        date_of_birth=date_of_birth,
-                        grade=row.get('grade'),
-                        section=row.get('section')
-                    )
-                    students_created += 1
-                except Exception as e:
-                    errors.append(f"Row {row_num}: Error with student {row.get('student_id', 'unknown')}: {str(e)}")
-            
-            # Return appropriate response
-            if students_created > 0:
-                return Response({
-                    'message': f'Successfully imported {students_created} students',
-                    'errors': errors
-                })
-            else:
-                return Response({
-                    'error': 'No students were imported',
-                    'details': errors
-                }, status=status.HTTP_400_BAD_REQUEST)
-                
+            students_created, errors = import_students_csv(csv_file)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        # Return appropriate response
+        if students_created > 0:
+            return Response({
+                'message': f'Successfully imported {students_created} students',
+                'errors': errors
+            })
+        else:
+            return Response({
+                'error': 'No students were imported',
+                'details': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERER_CLASSES)
     def export(self, request):
         """
-        Export all students data as CSV
+        Stream all students data as CSV (default) or NDJSON (?format=ndjson)
         """
         include_vaccination = request.query_params.get('include_vaccination', 'true').lower() == 'true'
-        return generate_students_csv(include_vaccination_status=include_vaccination)
+        export_format = request.query_params.get('format', 'csv')
+        
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': f'Unsupported export format: {export_format}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        with replica_reads():
+            return generate_students_export(
+                include_vaccination_status=include_vaccination,
+                export_format=export_format,
+                asynchronous=streams_async(request)
+            )
     
     @action(detail=False, methods=['get'])
     def template(self, request):
         """
         Download a CSV template for bulk student import
         """
-        return generate_students_template_csv()
\ No newline at end of file
+        return generate_students_template_csv()
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_promote(self, request):
+        """
+        Move the students of `grades` (every student with `"all": true`) up
+        `by` grades (default 1), e.g. at the end of the school year. Students
+        in the top grade must be deleted first
+        """
+        try:
+            grades, dry_run = _parse_bulk_params(request.data, whole_school=True)
+            by = request.data.get('by', 1)
+            if isinstance(by, bool) or not isinstance(by, int):
+                raise ValueError('by must be a whole number of grades')
+            promoted = promote_students(grades=grades, by=by, dry_run=dry_run)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'dry_run': dry_run, 'promoted': promoted})
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_reassign_sections(self, request):
+        """
+        Redistribute the students of each of `grades` (every grade with
+        `"all": true`) over `sections`, by `rule` ('round_robin' or 'alphabetical')
+        """
+        sections = request.data.get('sections')
+        rule = request.data.get('rule', 'round_robin')
+        
+        if not isinstance(sections, list) or not sections or not all(
+            isinstance(section, str) and section for section in sections
+        ):
+            return Response({'error': 'sections must be a non-empty list of section names'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if rule not in SECTION_RULES:
+            return Response({'error': f"rule must be one of {', '.join(SECTION_RULES)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            grades, dry_run = _parse_bulk_params(request.data, whole_school=True)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        moved = reassign_sections(sections, rule=rule, grades=grades, dry_run=dry_run)
+        return Response({'dry_run': dry_run, 'moved': moved})
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def bulk_delete(self, request):
+        """
+        Delete the students of `grades` and/or with IDs starting with
+        `student_id_prefix`, e.g. a graduated cohort, with their vaccinations
+        """
+        try:
+            grades, dry_run = _parse_bulk_params(request.data)
+            deleted = delete_students(
+                grades=grades,
+                student_id_prefix=request.data.get('student_id_prefix') or None,
+                dry_run=dry_run
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'dry_run': dry_run, 'deleted': deleted})
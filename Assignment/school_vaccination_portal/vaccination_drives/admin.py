@@ -10,7 +10,8 @@ class VaccineAdmin(admin.ModelAdmin):
 
 @admin.register(VaccinationDrive)
 class VaccinationDriveAdmin(admin.ModelAdmin):
-    list_display = ('vaccine', 'date', 'doses_available', 'applicable_grades')
+    list_display = ('vaccine', 'date', 'doses_available', 'doses_used', 'applicable_grades')
+    readonly_fields = ('doses_used',)
     list_filter = ('vaccine', 'date')
     date_hierarchy = 'date'
     
@@ -26,13 +27,13 @@ class VaccinationDriveAdmin(admin.ModelAdmin):
 @admin.register(StudentVaccination)
 class StudentVaccinationAdmin(admin.ModelAdmin):
     list_display = ('student', 'vaccination_drive', 'date_administered')
-    list_filter = ('vaccination_drive__vaccine', 'date_administered')
+    list_filter = ('vaccine', 'date_administered')
     search_fields = ('student__first_name', 'student__last_name', 'student__student_id')
     date_hierarchy = 'date_administered'
     
     # Custom method to display vaccine name
     def vaccine_name(self, obj):
-        return obj.vaccination_drive.vaccine.name
+        return obj.vaccine.name
     vaccine_name.short_description = 'Vaccine'
     
     # Add the custom method to list_display
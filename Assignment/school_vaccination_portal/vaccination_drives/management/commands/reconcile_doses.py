@@ -0,0 +1,46 @@
+# vaccination_drives/management/commands/reconcile_doses.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from school_vaccination_portal.cache import DRIVES, invalidate
+from vaccination_drives.models import StudentVaccination, VaccinationDrive
+
+
+class Command(BaseCommand):
+    help = 'Recount doses_used for every vaccination drive and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted drives without changing them')
+
+    def handle(self, *args, **options):
+        drives = VaccinationDrive.objects.annotate(
+            actual_doses=Count('studentvaccination')
+        ).select_related('vaccine').order_by('id')
+        
+        drifted = []
+        for drive in drives:
+            if drive.doses_used != drive.actual_doses:
+                self.stdout.write(f'{drive}: doses_used is {drive.doses_used}, actual count is {drive.actual_doses}')
+                drifted.append(drive.id)
+        
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All doses_used counters are accurate'))
+            return
+        
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} drives have drifted (dry run, nothing changed)'))
+            return
+        
+        # Recount inside the UPDATE itself so doses recorded meanwhile are not lost
+        used = StudentVaccination.objects.filter(
+            vaccination_drive=OuterRef('pk')
+        ).order_by().values('vaccination_drive').annotate(total=Count('id')).values('total')
+        
+        VaccinationDrive.objects.filter(id__in=drifted).update(
+            doses_used=Coalesce(Subquery(used, output_field=IntegerField()), 0)
+        )
+        invalidate(DRIVES)
+        
+        self.stdout.write(self.style.SUCCESS(f'Repaired doses_used on {len(drifted)} drives'))
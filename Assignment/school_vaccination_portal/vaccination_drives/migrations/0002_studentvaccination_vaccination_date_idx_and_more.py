@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_student_student_grade_section_idx'),
+        ('vaccination_drives', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentvaccination',
+            index=models.Index(fields=['date_administered', 'id'], name='vaccination_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccinationdrive',
+            index=models.Index(fields=['date', 'id'], name='drive_date_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:29
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_doses_used(apps, schema_editor):
+    VaccinationDrive = apps.get_model('vaccination_drives', 'VaccinationDrive')
+    StudentVaccination = apps.get_model('vaccination_drives', 'StudentVaccination')
+
+    used = StudentVaccination.objects.filter(
+        vaccination_drive=OuterRef('pk')
+    ).order_by().values('vaccination_drive').annotate(total=Count('id')).values('total')
+
+    VaccinationDrive.objects.update(
+        doses_used=Coalesce(Subquery(used, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination_drives', '0002_studentvaccination_vaccination_date_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaccinationdrive',
+            name='doses_used',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_doses_used, migrations.RunPython.noop),
+    ]
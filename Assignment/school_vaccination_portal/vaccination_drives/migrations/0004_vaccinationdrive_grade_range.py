@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:05
+
+from django.db import migrations, models
+
+
+def populate_grade_range(apps, schema_editor):
+    VaccinationDrive = apps.get_model('vaccination_drives', 'VaccinationDrive')
+
+    for drive in VaccinationDrive.objects.only('id', 'applicable_grades'):
+        try:
+            if '-' in drive.applicable_grades:
+                min_grade, max_grade = map(int, drive.applicable_grades.split('-'))
+            else:
+                min_grade = max_grade = int(drive.applicable_grades)
+        except ValueError:
+            # Left empty; such a drive matches no students until it is corrected
+            continue
+        VaccinationDrive.objects.filter(pk=drive.pk).update(min_grade=min_grade, max_grade=max_grade)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination_drives', '0003_vaccinationdrive_doses_used'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaccinationdrive',
+            name='min_grade',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='vaccinationdrive',
+            name='max_grade',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_grade_range, migrations.RunPython.noop),
+    ]
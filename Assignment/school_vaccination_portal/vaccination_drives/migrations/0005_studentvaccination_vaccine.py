@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_vaccine(apps, schema_editor):
+    VaccinationDrive = apps.get_model('vaccination_drives', 'VaccinationDrive')
+    StudentVaccination = apps.get_model('vaccination_drives', 'StudentVaccination')
+
+    StudentVaccination.objects.update(
+        vaccine=Subquery(VaccinationDrive.objects.filter(pk=OuterRef('vaccination_drive')).values('vaccine')[:1])
+    )
+
+    # The unique (student, vaccine) constraint added below would fail on these
+    duplicates = list(StudentVaccination.objects.order_by().values('student', 'vaccine').annotate(
+        total=Count('id')
+    ).filter(total__gt=1)[:20])
+    if duplicates:
+        pairs = ', '.join(f"student {row['student']} / vaccine {row['vaccine']}" for row in duplicates)
+        raise ValueError(
+            f"Students vaccinated more than once for the same vaccine: {pairs}. "
+            "Remove the extra vaccination records and run the migration again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_student_grade_integer'),
+        ('vaccination_drives', '0004_vaccinationdrive_grade_range'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentvaccination',
+            name='vaccine',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='vaccination_drives.vaccine'),
+        ),
+        migrations.RunPython(backfill_vaccine, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='studentvaccination',
+            name='vaccine',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, to='vaccination_drives.vaccine'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentvaccination',
+            constraint=models.UniqueConstraint(fields=('student', 'vaccine'), name='vaccination_student_vaccine_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='studentvaccination',
+            index=models.Index(fields=['vaccine', 'date_administered', 'id'], name='vaccination_vaccine_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentvaccination',
+            index=models.Index(fields=['vaccine', 'student'], name='vaccination_vaccine_stud_idx'),
+        ),
+    ]
@@ -1,9 +1,24 @@
-from django.db import models
+from django.db import models, transaction
 from datetime import date, timedelta
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 
+def parse_grade_range(value):
+    """
+    Parse an applicable_grades string into (min_grade, max_grade),
+    e.g. '5-7' -> (5, 7) and '6' -> (6, 6). Raises ValueError if malformed.
+    """
+    if '-' in value:
+        min_grade, max_grade = map(int, value.split('-'))
+    else:
+        min_grade = max_grade = int(value)
+    
+    if min_grade < 0 or min_grade > max_grade:
+        raise ValueError(f"Invalid grade range: {value}")
+    return min_grade, max_grade
+
+
 class Vaccine(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
@@ -15,11 +30,29 @@ class VaccinationDrive(models.Model):
     vaccine = models.ForeignKey(Vaccine, on_delete=models.CASCADE)
     date = models.DateField()
     doses_available = models.PositiveIntegerField()
+    # Maintained by the StudentVaccination signals; see `manage.py reconcile_doses`
+    doses_used = models.PositiveIntegerField(default=0, editable=False)
     applicable_grades = models.CharField(max_length=100, help_text="E.g., '5-7' for grades 5 to 7")
+    # Parsed from applicable_grades on save so the database can filter by grade
+    min_grade = models.PositiveSmallIntegerField(null=True, editable=False)
+    max_grade = models.PositiveSmallIntegerField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='drive_date_idx'),
+        ]
+    
     def clean(self):
+        # Store the grade range as integers
+        try:
+            self.min_grade, self.max_grade = parse_grade_range(self.applicable_grades)
+        except ValueError:
+            raise ValidationError({
+                'applicable_grades': "Enter a grade (e.g. '6') or a grade range (e.g. '5-7')."
+            })
+        
         # Ensure drive is scheduled at least 15 days in advance
         min_date = date.today() + timedelta(days=15)
         if self.date < min_date:
@@ -37,46 +70,152 @@ class VaccinationDrive(models.Model):
             raise ValidationError({
                 'date': f"A drive for {self.vaccine.name} already exists on this date."
             })
+        
+        # Switching the vaccine must not give a student a second dose of the new one
+        if self.vaccine_changed:
+            conflicts = StudentVaccination.objects.filter(
+                vaccination_drive=self
+            ).exclude(vaccine_id=self.vaccine_id).filter(
+                student__studentvaccination__vaccine_id=self.vaccine_id
+            )
+            if conflicts.exists():
+                raise ValidationError({
+                    'vaccine': f"Some students in this drive have already been vaccinated for {self.vaccine.name}."
+                })
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored vaccine so a change can be copied to the drive's vaccinations
+        instance._loaded_vaccine_id = instance.__dict__.get('vaccine_id')
+        return instance
+    
+    @property
+    def vaccine_changed(self):
+        loaded_vaccine_id = getattr(self, '_loaded_vaccine_id', None)
+        return loaded_vaccine_id is not None and loaded_vaccine_id != self.vaccine_id
     
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
+        # One transaction, so a vaccine change that breaks the one-dose-per-vaccine
+        # constraint (a dose recorded after clean()) leaves the drive unchanged too
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Keep the vaccine copied onto this drive's vaccinations in step
+            if self.vaccine_changed:
+                self.studentvaccination_set.update(vaccine_id=self.vaccine_id)
+        self._loaded_vaccine_id = self.vaccine_id
     
     @property
     def is_past(self):
         return self.date < date.today()
     
+    @property
+    def grade_range(self):
+        return self.min_grade, self.max_grade
+    
+    def includes_grade(self, grade):
+        if grade is None or self.min_grade is None:
+            return False
+        return self.min_grade <= grade <= self.max_grade
+    
+    def eligible_students(self):
+        """
+        Students in this drive's grade range who have not yet received its
+        vaccine, as a single query served by the student grade index.
+        """
+        from students.models import Student
+        
+        if self.min_grade is None:
+            return Student.objects.none()
+        
+        already_vaccinated = StudentVaccination.objects.filter(
+            student=models.OuterRef('pk'),
+            vaccine_id=self.vaccine_id
+        )
+        return Student.objects.filter(
+            grade__gte=self.min_grade,
+            grade__lte=self.max_grade
+        ).exclude(models.Exists(already_vaccinated))
+    
+    @property
+    def doses_remaining(self):
+        return max(self.doses_available - self.doses_used, 0)
+    
+    @classmethod
+    def adjust_doses_used(cls, drive_id, delta):
+        """
+        Atomically add delta to a drive's doses_used counter in the database.
+        """
+        if not delta:
+            return
+        queryset = cls.objects.filter(pk=drive_id)
+        if delta < 0:
+            # Never let a drifted counter go negative
+            queryset = queryset.filter(doses_used__gte=-delta)
+        queryset.update(doses_used=models.F('doses_used') + delta)
+    
     def __str__(self):
         return f"{self.vaccine.name} Drive on {self.date}"
 
 class StudentVaccination(models.Model):
     student = models.ForeignKey('students.Student', on_delete=models.CASCADE)
     vaccination_drive = models.ForeignKey(VaccinationDrive, on_delete=models.CASCADE)
+    # Copied from the drive on save so the one-dose-per-vaccine rule and the
+    # vaccine filters need no join; the composite indexes below lead with it
+    vaccine = models.ForeignKey(Vaccine, on_delete=models.CASCADE, editable=False, db_index=False)
     date_administered = models.DateField(default=date.today)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         unique_together = ('student', 'vaccination_drive')
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'vaccine'], name='vaccination_student_vaccine_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date_administered', 'id'], name='vaccination_date_idx'),
+            # Report filtered by vaccine and date range, in pagination order
+            models.Index(fields=['vaccine', 'date_administered', 'id'], name='vaccination_vaccine_date_idx'),
+            # "Vaccinated with X" student filters, without touching the table
+            models.Index(fields=['vaccine', 'student'], name='vaccination_vaccine_stud_idx'),
+        ]
         
     def clean(self):
         if not self.student or not self.vaccination_drive:
             return  # Skip validation if student or vaccination_drive is not set
+        
+        self.vaccine_id = self.vaccination_drive.vaccine_id
             
         # Ensure a student is not vaccinated twice for the same vaccine
         existing_vaccinations = StudentVaccination.objects.filter(
             student=self.student,
-            vaccination_drive__vaccine=self.vaccination_drive.vaccine
+            vaccine_id=self.vaccine_id
         ).exclude(id=self.id).exists()
         
         if existing_vaccinations:
             raise ValidationError(
-                f"Student {self.student.full_name} has already been vaccinated for {self.vaccination_drive.vaccine.name}."
+                f"Student {self.student.full_name} has already been vaccinated for {self.vaccine.name}."
             )
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored drive and student so a move can adjust both sides' counters
+        instance._loaded_drive_id = instance.__dict__.get('vaccination_drive_id')
+        instance._loaded_student_id = instance.__dict__.get('student_id')
+        instance._loaded_vaccine_id = instance.__dict__.get('vaccine_id')
+        instance._loaded_date_administered = instance.__dict__.get('date_administered')
+        return instance
+    
     def save(self, *args, **kwargs):
         self.clean()
         super().save(*args, **kwargs)
+        # Every post_save receiver has seen the change; compare later saves to this one
+        self._loaded_drive_id = self.vaccination_drive_id
+        self._loaded_student_id = self.student_id
+        self._loaded_vaccine_id = self.vaccine_id
+        self._loaded_date_administered = self.date_administered
     
     def __str__(self):
-        return f"{self.student.full_name} - {self.vaccination_drive.vaccine.name}"
\ No newline at end of file
+        return f"{self.student.full_name} - {self.vaccine.name}"
\ No newline at end of file
@@ -11,20 +11,19 @@ class VaccineSerializer(serializers.ModelSerializer):
 class VaccinationDriveSerializer(serializers.ModelSerializer):
     vaccine_name = serializers.ReadOnlyField(source='vaccine.name')
     is_past = serializers.ReadOnlyField()
-    doses_used = serializers.SerializerMethodField()
+    doses_used = serializers.ReadOnlyField()
+    doses_remaining = serializers.ReadOnlyField()
     
     class Meta:
         model = VaccinationDrive
         fields = ['id', 'vaccine', 'vaccine_name', 'date', 'doses_available', 
-                  'applicable_grades', 'created_at', 'updated_at', 'is_past', 'doses_used']
-    
-    def get_doses_used(self, obj):
-        return StudentVaccination.objects.filter(vaccination_drive=obj).count()
+                  'applicable_grades', 'min_grade', 'max_grade', 'created_at', 'updated_at',
+                  'is_past', 'doses_used', 'doses_remaining']
 
 class StudentVaccinationSerializer(serializers.ModelSerializer):
     student_name = serializers.ReadOnlyField(source='student.full_name')
     student_id = serializers.ReadOnlyField(source='student.student_id')
-    vaccine_name = serializers.ReadOnlyField(source='vaccination_drive.vaccine.name')
+    vaccine_name = serializers.ReadOnlyField(source='vaccine.name')
     
     class Meta:
         model = StudentVaccination
@@ -43,7 +42,7 @@ class StudentVaccinationSerializer(serializers.ModelSerializer):
             vaccine = vaccination_drive.vaccine
             existing_vaccination = StudentVaccination.objects.filter(
                 student=student,
-                vaccination_drive__vaccine=vaccine
+                vaccine_id=vaccination_drive.vaccine_id
             ).exists()
             
             if existing_vaccination:
@@ -52,24 +51,20 @@ class StudentVaccinationSerializer(serializers.ModelSerializer):
                 )
             
             # Check if student is in applicable grades for this drive
-            student_grade = int(student.grade)
             applicable_grades = vaccination_drive.applicable_grades
             
-            if '-' in applicable_grades:
-                min_grade, max_grade = map(int, applicable_grades.split('-'))
-                if student_grade < min_grade or student_grade > max_grade:
+            if not vaccination_drive.includes_grade(student.grade):
+                if '-' in applicable_grades:
                     raise serializers.ValidationError(
                         f"Student {student.full_name} is not in the applicable grades ({applicable_grades}) for this drive."
                     )
-            else:
-                if student_grade != int(applicable_grades):
+                else:
                     raise serializers.ValidationError(
                         f"Student {student.full_name} is not in the applicable grade ({applicable_grades}) for this drive."
                     )
             
             # Check if drive has enough doses left
-            used_doses = StudentVaccination.objects.filter(vaccination_drive=vaccination_drive).count()
-            if used_doses >= vaccination_drive.doses_available:
+            if vaccination_drive.doses_remaining <= 0:
                 raise serializers.ValidationError(
                     f"No more doses available for this vaccination drive."
                 )
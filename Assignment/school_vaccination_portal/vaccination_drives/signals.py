@@ -0,0 +1,48 @@
+# vaccination_drives/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from school_vaccination_portal.cache import DRIVES, VACCINATIONS, VACCINES, invalidate_on_commit
+from .models import StudentVaccination, Vaccine, VaccinationDrive
+
+
+@receiver(post_save, sender=StudentVaccination)
+def count_dose_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    
+    if created:
+        VaccinationDrive.adjust_doses_used(instance.vaccination_drive_id, 1)
+    else:
+        # A vaccination moved to another drive frees a dose on the old one
+        loaded_drive_id = getattr(instance, '_loaded_drive_id', None)
+        if loaded_drive_id and loaded_drive_id != instance.vaccination_drive_id:
+            VaccinationDrive.adjust_doses_used(loaded_drive_id, -1)
+            VaccinationDrive.adjust_doses_used(instance.vaccination_drive_id, 1)
+
+
+@receiver(post_delete, sender=StudentVaccination)
+def release_dose_on_delete(sender, instance, **kwargs):
+    VaccinationDrive.adjust_doses_used(instance.vaccination_drive_id, -1)
+
+
+@receiver(post_save, sender=Vaccine)
+@receiver(post_delete, sender=Vaccine)
+def invalidate_vaccine_responses(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_on_commit(VACCINES)
+
+
+@receiver(post_save, sender=VaccinationDrive)
+@receiver(post_delete, sender=VaccinationDrive)
+def invalidate_drive_responses(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_on_commit(DRIVES)
+
+
+@receiver(post_save, sender=StudentVaccination)
+@receiver(post_delete, sender=StudentVaccination)
+def invalidate_vaccination_responses(sender, raw=False, **kwargs):
+    # Also covers doses_used, which the receivers above update on the drive
+    if not raw:
+        invalidate_on_commit(VACCINATIONS)
@@ -1,3 +1,293 @@
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models import Count
 from django.test import TestCase
+from school_vaccination_portal.cache import get_response_cache
+from students.models import Student
+from .models import StudentVaccination, Vaccine, VaccinationDrive
+from .serializers import StudentVaccinationSerializer
+
+
+def create_drive(vaccine, doses_available=100, applicable_grades='5-8', days_ahead=20):
+    return VaccinationDrive.objects.create(
+        vaccine=vaccine, date=date.today() + timedelta(days=days_ahead),
+        doses_available=doses_available, applicable_grades=applicable_grades
+    )
+
+
+def create_students(count, grade=5):
+    return Student.objects.bulk_create([
+        Student(first_name=f'First{i}', last_name=f'Last{i}', student_id=f'DV{grade}{i:04d}',
+                date_of_birth=date(2012, 1, 1), grade=grade, section='A')
+        for i in range(count)
+    ])
+
+
+class DosesUsedTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.polio = Vaccine.objects.create(name='Polio')
+        self.mmr = Vaccine.objects.create(name='MMR')
+        self.drive = create_drive(self.polio)
+        self.students = create_students(6)
+
+    def assert_doses_used_match_vaccinations(self):
+        actual = dict(VaccinationDrive.objects.annotate(
+            actual=Count('studentvaccination')
+        ).values_list('id', 'actual'))
+        self.assertEqual(dict(VaccinationDrive.objects.values_list('id', 'doses_used')), actual)
+
+        out = StringIO()
+        call_command('reconcile_doses', '--dry-run', stdout=out)
+        self.assertIn('All doses_used counters are accurate', out.getvalue())
+
+    def test_counter_follows_saves_moves_and_deletes(self):
+        other_drive = create_drive(self.polio, days_ahead=30)
+        vaccinations = [
+            StudentVaccination.objects.create(student=student, vaccination_drive=self.drive)
+            for student in self.students[:3]
+        ]
+        self.assert_doses_used_match_vaccinations()
+
+        vaccinations[0].vaccination_drive = other_drive
+        vaccinations[0].save()
+        self.assert_doses_used_match_vaccinations()
+
+        vaccinations[1].delete()
+        self.students[2].delete()  # Cascades to the vaccination
+        self.assert_doses_used_match_vaccinations()
+        self.assertEqual(VaccinationDrive.objects.get(pk=self.drive.pk).doses_used, 0)
+
+    def test_counter_follows_the_vaccination_api(self):
+        response = self.client.post('/api/vaccinations/', {
+            'student': self.students[0].pk, 'vaccination_drive': self.drive.pk
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assert_doses_used_match_vaccinations()
+
+        self.assertEqual(self.client.delete(f"/api/vaccinations/{response.json()['id']}/").status_code, 204)
+        self.assert_doses_used_match_vaccinations()
+
+    def test_mark_students_counts_bulk_created_doses_and_stops_when_out(self):
+        drive = create_drive(self.mmr, doses_available=4)
+        StudentVaccination.objects.create(student=self.students[0], vaccination_drive=drive)
+
+        response = self.client.post(f'/api/drives/{drive.pk}/mark_students/', {
+            'student_ids': [student.pk for student in self.students]
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['message'], 'Successfully vaccinated 3 students')
+        self.assertIn('No more doses available for this drive', response.json()['errors'])
+        drive.refresh_from_db()
+        self.assertEqual((drive.doses_used, drive.doses_remaining), (4, 0))
+        self.assert_doses_used_match_vaccinations()
+
+    def test_reconcile_repairs_drift(self):
+        StudentVaccination.objects.create(student=self.students[0], vaccination_drive=self.drive)
+        VaccinationDrive.objects.filter(pk=self.drive.pk).update(doses_used=7)
+
+        out = StringIO()
+        call_command('reconcile_doses', stdout=out)
+
+        self.assertIn('Repaired doses_used on 1 drives', out.getvalue())
+        self.assert_doses_used_match_vaccinations()
+
+
+class EligibleStudentsTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.polio = Vaccine.objects.create(name='Polio')
+        self.drive = create_drive(self.polio, applicable_grades='6-7')
+        for grade in (5, 6, 7, 8):
+            create_students(3, grade=grade)
+
+    def eligible(self, drive=None, query=''):
+        response = self.client.get(f'/api/drives/{(drive or self.drive).pk}/eligible_students/{query}',
+                                   HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_only_students_in_the_grade_range_are_listed(self):
+        rows = self.eligible()['results']
+
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row['grade'] for row in rows}, {6, 7})
+
+    def test_students_who_had_the_vaccine_in_any_drive_are_excluded(self):
+        other_polio_drive = create_drive(self.polio, applicable_grades='5-8', days_ahead=30)
+        other_vaccine_drive = create_drive(Vaccine.objects.create(name='MMR'), applicable_grades='5-8')
+        vaccinated = Student.objects.get(student_id='DV60000')
+        StudentVaccination.objects.create(student=vaccinated, vaccination_drive=other_polio_drive)
+        StudentVaccination.objects.create(student=Student.objects.get(student_id='DV70000'),
+                                          vaccination_drive=other_vaccine_drive)
+
+        ids = {row['student_id'] for row in self.eligible()['results']}
+
+        self.assertEqual(len(ids), 5)
+        self.assertNotIn('DV60000', ids)
+        self.assertIn('DV70000', ids)
+
+    def test_section_filter_and_paging(self):
+        Student.objects.filter(student_id__in=['DV60001', 'DV70001']).update(section='B')
+
+        self.assertEqual({row['student_id'] for row in self.eligible(query='?section=B')['results']},
+                         {'DV60001', 'DV70001'})
+
+        page = self.eligible(query='?page_size=4')
+        self.assertEqual(len(page['results']), 4)
+        rest = self.client.get(page['next'], HTTP_ACCEPT='application/json').json()
+        self.assertEqual(len(rest['results']), 2)
+        self.assertIsNone(rest['next'])
+
+    def test_single_grade_drive(self):
+        drive = create_drive(Vaccine.objects.create(name='MMR'), applicable_grades='8')
+
+        self.assertEqual({row['grade'] for row in self.eligible(drive)['results']}, {8})
+
+
+class CheckEligibilityTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.drive = create_drive(Vaccine.objects.create(name='Polio'), doses_available=3, applicable_grades='6-7')
+        self.students = create_students(4, grade=6) + create_students(2, grade=8)
+        StudentVaccination.objects.create(student=self.students[0], vaccination_drive=self.drive)
+
+    def check(self, **data):
+        return self.client.post('/api/vaccinations/check_eligibility/', {'drive_id': self.drive.pk, **data},
+                                content_type='application/json')
+
+    def test_whole_grade(self):
+        response = self.check(grade='6')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['remaining_doses'], 2)
+        # A grade check is not capped by the remaining doses
+        self.assertEqual(body['eligible_count'], 3)
+        self.assertEqual([row['student_id'] for row in body['students']], [s.pk for s in self.students[:4]])
+        self.assertEqual(body['students'][0]['reason'], 'Already vaccinated with this vaccine')
+
+    def test_grade_and_section(self):
+        Student.objects.filter(pk=self.students[1].pk).update(section='B')
+
+        body = self.check(grade=6, section='B').json()
+
+        self.assertEqual([row['student_id'] for row in body['students']], [self.students[1].pk])
+
+    def test_grade_outside_the_drive(self):
+        body = self.check(grade=8).json()
+
+        self.assertEqual(body['eligible_count'], 0)
+        self.assertEqual({row['reason'] for row in body['students']}, {'Not in applicable grades (6-7)'})
+
+    def test_invalid_grade(self):
+        for grade in ('seven', '6.5', [6]):
+            response = self.check(grade=grade)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': 'Grade must be a whole number'})
+
+        self.assertEqual(self.check(section='A').status_code, 400)
+
+    def test_student_ids_are_still_capped_by_the_remaining_doses(self):
+        self.assertEqual(self.check(student_ids=[s.pk for s in self.students[1:4]]).status_code, 400)
+
+        body = self.check(student_ids=[self.students[4].pk, 'x']).json()
+        self.assertEqual([row['reason'] for row in body['students']],
+                         ['Not in applicable grades (6-7)', 'Student not found'])
+
+
+def copy_vaccine_only(vaccination):
+    # StudentVaccination.clean() without its duplicate check, as if a
+    # concurrent request recorded the other dose just after the check ran
+    vaccination.vaccine_id = vaccination.vaccination_drive.vaccine_id
+
+
+class OneDosePerVaccineTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.polio = Vaccine.objects.create(name='Polio')
+        self.mmr = Vaccine.objects.create(name='MMR')
+        self.drive = create_drive(self.polio)
+        self.other_polio_drive = create_drive(self.polio, days_ahead=30)
+        self.mmr_drive = create_drive(self.mmr, days_ahead=25)
+        self.students = create_students(3)
+        for student in self.students[:2]:
+            StudentVaccination.objects.create(student=student, vaccination_drive=self.drive)
+
+    def vaccinate(self, student, drive):
+        return self.client.post('/api/vaccinations/', {'student': student.pk, 'vaccination_drive': drive.pk},
+                                content_type='application/json')
+
+    def test_constraint_rejects_a_second_dose(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            # bulk_create runs no model validation; only the constraint stops it
+            StudentVaccination.objects.bulk_create([StudentVaccination(
+                student=self.students[0], vaccination_drive=self.other_polio_drive, vaccine=self.polio
+            )])
+
+        with self.assertRaisesMessage(ValidationError, 'has already been vaccinated for Polio'):
+            StudentVaccination.objects.create(student=self.students[0], vaccination_drive=self.other_polio_drive)
+
+        self.assertEqual(StudentVaccination.objects.filter(student=self.students[0]).count(), 1)
+
+    def test_api_rejects_a_second_dose(self):
+        response = self.vaccinate(self.students[0], self.other_polio_drive)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('has already been vaccinated for Polio', str(response.json()))
+        self.assertEqual(self.vaccinate(self.students[0], self.mmr_drive).status_code, 201)
+
+    def test_api_rejects_a_second_dose_recorded_concurrently(self):
+        with mock.patch.object(StudentVaccinationSerializer, 'validate', autospec=True,
+                               side_effect=lambda serializer, data: data), \
+                mock.patch.object(StudentVaccination, 'clean', autospec=True, side_effect=copy_vaccine_only):
+            response = self.vaccinate(self.students[0], self.other_polio_drive)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {
+            'non_field_errors': ['This student has already been vaccinated with this vaccine.']
+        })
+        self.assertEqual(StudentVaccination.objects.filter(student=self.students[0]).count(), 1)
+        self.assertEqual(VaccinationDrive.objects.get(pk=self.other_polio_drive.pk).doses_used, 0)
+
+    def test_changing_the_drives_vaccine_moves_its_doses(self):
+        response = self.client.patch(f'/api/drives/{self.drive.pk}/', {'vaccine': self.mmr.pk},
+                                     content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(StudentVaccination.objects.filter(vaccination_drive=self.drive)
+                             .values_list('vaccine_id', flat=True)), {self.mmr.pk})
+        # The students now hold an MMR dose and no polio dose
+        self.assertEqual(self.vaccinate(self.students[0], self.mmr_drive).status_code, 400)
+        self.assertEqual(self.vaccinate(self.students[0], self.other_polio_drive).status_code, 201)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            StudentVaccination.objects.bulk_create([StudentVaccination(
+                student=self.students[1], vaccination_drive=self.mmr_drive, vaccine=self.mmr
+            )])
+
+    def test_vaccine_change_that_would_give_a_second_dose_is_rejected(self):
+        StudentVaccination.objects.create(student=self.students[1], vaccination_drive=self.mmr_drive)
+
+        response = self.client.patch(f'/api/drives/{self.drive.pk}/', {'vaccine': self.mmr.pk},
+                                     content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('vaccine', response.json())
+        self.assertEqual(VaccinationDrive.objects.get(pk=self.drive.pk).vaccine_id, self.polio.pk)
+
+        # Recorded after the drive's own check: the constraint stops the update
+        # and the drive keeps its vaccine along with its doses
+        with mock.patch.object(VaccinationDrive, 'clean', autospec=True):
+            response = self.client.patch(f'/api/drives/{self.drive.pk}/', {'vaccine': self.mmr.pk},
+                                         content_type='application/json')
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(VaccinationDrive.objects.get(pk=self.drive.pk).vaccine_id, self.polio.pk)
+        self.assertEqual(set(StudentVaccination.objects.filter(vaccination_drive=self.drive)
+                             .values_list('vaccine_id', flat=True)), {self.polio.pk})
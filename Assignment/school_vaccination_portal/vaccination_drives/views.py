@@ -2,26 +2,45 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from datetime import date, timedelta
-from django.db.models import Count
-from django.db import transaction
+from django.db.models import Count, F
+from django.db import IntegrityError, transaction
 from .models import Vaccine, VaccinationDrive, StudentVaccination
 from .serializers import VaccineSerializer, VaccinationDriveSerializer, StudentVaccinationSerializer
 from students.models import Student
+from students.serializers import StudentSerializer
+from reports.stats import record_vaccinations_created
+from school_vaccination_portal.cache import ALL_NAMESPACES, VACCINATIONS, VACCINES, CachedResponseMixin, invalidate_on_commit
+from school_vaccination_portal.conditional import ConditionalGetMixin
+from school_vaccination_portal.pagination import StudentPagination, VaccinationDrivePagination, StudentVaccinationPagination
 from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.exceptions import ValidationError as DRFValidationError
 from rest_framework import status
 
 
-class VaccineViewSet(viewsets.ModelViewSet):
+def _parse_id(value):
+    """
+    Return value as an integer primary key, or None if it is not one.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class VaccineViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Vaccine.objects.all()
     serializer_class = VaccineSerializer
+    cache_namespaces = (VACCINES,)
 
-class VaccinationDriveViewSet(viewsets.ModelViewSet):
+class VaccinationDriveViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = VaccinationDrive.objects.all()
     serializer_class = VaccinationDriveSerializer
+    pagination_class = VaccinationDrivePagination
+    cache_namespaces = ALL_NAMESPACES
+    cache_actions = ('list', 'retrieve', 'eligible_students')
     
     def get_queryset(self):
-        queryset = VaccinationDrive.objects.all()
+        queryset = VaccinationDrive.objects.select_related('vaccine')
         
         # Get upcoming drives only
         upcoming = self.request.query_params.get('upcoming')
@@ -66,6 +85,29 @@ class VaccinationDriveViewSet(viewsets.ModelViewSet):
                 raise DRFValidationError(e.message_dict)
             else:
                 raise DRFValidationError({'date': e.messages})
+        except IntegrityError:
+            # A dose of the new vaccine recorded after the model's own check
+            raise DRFValidationError({
+                'vaccine': ['Some students in this drive have already been vaccinated with this vaccine.']
+            })
+    
+    @action(detail=True, methods=['get'])
+    def eligible_students(self, request, pk=None):
+        """
+        List students who can still be vaccinated in this drive: in its grade
+        range and not yet given its vaccine. Optionally filtered by ?section=.
+        """
+        drive = self.get_object()
+        queryset = drive.eligible_students()
+        
+        section = request.query_params.get('section')
+        if section:
+            queryset = queryset.filter(section=section)
+        
+        paginator = StudentPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = StudentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def mark_students(self, request, pk=None):
@@ -80,38 +122,60 @@ class VaccinationDriveViewSet(viewsets.ModelViewSet):
         
         try:
             with transaction.atomic():
+                # Lock the drive row before reading its dose counter so that
+                # concurrent requests for the same drive run one after another.
+                # A no-op UPDATE takes a row lock on PostgreSQL and the write
+                # lock on SQLite, where SELECT ... FOR UPDATE is not supported.
+                VaccinationDrive.objects.filter(pk=drive.pk).update(doses_used=F('doses_used'))
+                drive.refresh_from_db(fields=['doses_available', 'doses_used'])
+                vaccine = drive.vaccine
+                
                 vaccinations_created = 0
                 errors = []
                 
+                # Load every requested student and their prior doses of this
+                # vaccine up front instead of querying per student
+                valid_ids = [pk for pk in (_parse_id(student_id) for student_id in student_ids) if pk is not None]
+                students = Student.objects.in_bulk(valid_ids)
+                already_vaccinated = set(StudentVaccination.objects.filter(
+                    student_id__in=valid_ids,
+                    vaccine=vaccine
+                ).values_list('student_id', flat=True))
+                remaining_doses = drive.doses_remaining
+                
+                new_vaccinations = []
                 for student_id in student_ids:
-                    try:
-                        student = Student.objects.get(id=student_id)
-                        
-                        # Check if student already vaccinated with this vaccine
-                        if StudentVaccination.objects.filter(
-                            student=student,
-                            vaccination_drive__vaccine=drive.vaccine
-                        ).exists():
-                            errors.append(f"Student {student.full_name} already vaccinated with {drive.vaccine.name}")
-                            continue
-                        
-                        # Check if enough doses are available
-                        current_count = StudentVaccination.objects.filter(vaccination_drive=drive).count()
-                        if current_count >= drive.doses_available:
-                            errors.append("No more doses available for this drive")
-                            break
-                            
-                        StudentVaccination.objects.create(
-                            student=student,
-                            vaccination_drive=drive,
-                            date_administered=date.today()
-                        )
-                        vaccinations_created += 1
-                            
-                    except Student.DoesNotExist:
+                    student = students.get(_parse_id(student_id))
+                    if student is None:
                         errors.append(f"Student with ID {student_id} not found")
-                    except Exception as e:
-                        errors.append(str(e))
+                        continue
+                    
+                    # Check if student already vaccinated with this vaccine
+                    if student.id in already_vaccinated:
+                        errors.append(f"Student {student.full_name} already vaccinated with {vaccine.name}")
+                        continue
+                    
+                    # Check if enough doses are available
+                    if remaining_doses <= 0:
+                        errors.append("No more doses available for this drive")
+                        break
+                    
+                    new_vaccinations.append(StudentVaccination(
+                        student=student,
+                        vaccination_drive=drive,
+                        vaccine=vaccine,
+                        date_administered=date.today()
+                    ))
+                    already_vaccinated.add(student.id)
+                    remaining_doses -= 1
+                
+                # bulk_create skips the post_save signal, so count the doses
+                # and update the dashboard stats here
+                StudentVaccination.objects.bulk_create(new_vaccinations)
+                vaccinations_created = len(new_vaccinations)
+                VaccinationDrive.adjust_doses_used(drive.pk, vaccinations_created)
+                record_vaccinations_created(new_vaccinations)
+                invalidate_on_commit(VACCINATIONS)
                 
                 return Response({
                     'message': f'Successfully vaccinated {vaccinations_created} students',
@@ -121,12 +185,13 @@ class VaccinationDriveViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class StudentVaccinationViewSet(viewsets.ModelViewSet):
+class StudentVaccinationViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = StudentVaccination.objects.all()
     serializer_class = StudentVaccinationSerializer
+    pagination_class = StudentVaccinationPagination
     
     def get_queryset(self):
-        queryset = StudentVaccination.objects.all()
+        queryset = StudentVaccination.objects.select_related('student', 'vaccine')
         
         student_id = self.request.query_params.get('student_id')
         vaccine_id = self.request.query_params.get('vaccine_id')
@@ -136,7 +201,7 @@ class StudentVaccinationViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(student_id=student_id)
             
         if vaccine_id:
-            queryset = queryset.filter(vaccination_drive__vaccine_id=vaccine_id)
+            queryset = queryset.filter(vaccine_id=vaccine_id)
             
         if drive_id:
             queryset = queryset.filter(vaccination_drive_id=drive_id)
@@ -145,7 +210,7 @@ class StudentVaccinationViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         try:
-            serializer.save()
+            self._save(serializer)
         except DjangoValidationError as e:
             # Convert Django ValidationError to DRF ValidationError
             if hasattr(e, 'message_dict'):
@@ -154,6 +219,20 @@ class StudentVaccinationViewSet(viewsets.ModelViewSet):
                 error_message = e.messages[0] if hasattr(e, 'messages') and e.messages else str(e)
                 raise DRFValidationError({'non_field_errors': [error_message]})
     
+    def perform_update(self, serializer):
+        self._save(serializer)
+    
+    def _save(self, serializer):
+        # A dose recorded by a concurrent request passes the checks above and
+        # is stopped by the (student, vaccine) unique constraint instead
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise DRFValidationError({
+                'non_field_errors': ['This student has already been vaccinated with this vaccine.']
+            })
+    
     def update(self, request, *args, **kwargs):
         try:
             return super().update(request, *args, **kwargs)
@@ -169,8 +248,11 @@ class StudentVaccinationViewSet(viewsets.ModelViewSet):
         """
         Check if students are eligible for vaccination.
         Expected request data: { student_ids: [1, 2, 3...], drive_id: 1 }
+        or, to check a whole grade or section: { grade: "7", section: "A", drive_id: 1 }
         """
         student_ids = request.data.get('student_ids', [])
+        grade = request.data.get('grade')
+        section = request.data.get('section')
         drive_id = request.data.get('drive_id')
         
         if not drive_id:
@@ -179,77 +261,97 @@ class StudentVaccinationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if section and not grade:
+            return Response(
+                {"error": "A section can only be checked together with its grade"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if grade in (None, ''):
+            grade = None
+        else:
+            grade = _parse_id(grade)
+            if grade is None:
+                return Response(
+                    {"error": "Grade must be a whole number"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
         try:
-            drive = VaccinationDrive.objects.get(id=drive_id)
-        except VaccinationDrive.DoesNotExist:
+            drive = VaccinationDrive.objects.select_related('vaccine').get(id=drive_id)
+        except (VaccinationDrive.DoesNotExist, ValueError):
             return Response(
                 {"error": "Vaccination drive not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
         
         # Check if drive has enough doses left
-        used_doses = StudentVaccination.objects.filter(vaccination_drive=drive).count()
-        remaining_doses = drive.doses_available - used_doses
+        remaining_doses = drive.doses_remaining
         
         if remaining_doses <= 0:
             return Response(
                 {"error": "No more doses available for this vaccination drive"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
-        if len(student_ids) > remaining_doses:
+        
+        # Explicit lists are checked against the remaining doses up front; a
+        # whole-grade check just reports how many students are eligible
+        if grade is None and len(student_ids) > remaining_doses:
             return Response(
                 {"error": f"Cannot vaccinate {len(student_ids)} students. Only {remaining_doses} doses available."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Check grade eligibility
         grade_range = drive.applicable_grades
-        if '-' in grade_range:
-            min_grade, max_grade = map(int, grade_range.split('-'))
-        else:
-            min_grade = max_grade = int(grade_range)
-        
-        # Get vaccine for this drive
         vaccine = drive.vaccine
         
-        from students.models import Student
+        # Resolve all students and their earlier doses of this vaccine in two queries
+        if grade is not None:
+            selected = Student.objects.filter(grade=grade)
+            if section:
+                selected = selected.filter(section=section)
+            students = {student.id: student for student in selected.order_by('section', 'id')}
+            student_ids = list(students)
+            vaccinated = StudentVaccination.objects.filter(student__in=selected)
+        else:
+            students = Student.objects.in_bulk(
+                [pk for pk in (_parse_id(student_id) for student_id in student_ids) if pk is not None]
+            )
+            vaccinated = StudentVaccination.objects.filter(student_id__in=list(students))
+        
+        already_vaccinated = set(vaccinated.filter(
+            vaccine=vaccine
+        ).values_list('student_id', flat=True))
         
         eligibility_results = []
         for student_id in student_ids:
-            try:
-                student = Student.objects.get(id=student_id)
-                student_grade = int(student.grade)
-                
-                # Check grade eligibility
-                grade_eligible = min_grade <= student_grade <= max_grade
-                
-                # Check if already vaccinated with this vaccine
-                already_vaccinated = StudentVaccination.objects.filter(
-                    student=student,
-                    vaccination_drive__vaccine=vaccine
-                ).exists()
-                
-                eligibility_results.append({
-                    'student_id': student_id,
-                    'student_name': student.full_name,
-                    'eligible': grade_eligible and not already_vaccinated,
-                    'reason': None if (grade_eligible and not already_vaccinated) else 
-                             "Already vaccinated with this vaccine" if already_vaccinated else
-                             f"Not in applicable grades ({grade_range})"
-                })
-                
-            except Student.DoesNotExist:
+            student = students.get(_parse_id(student_id))
+            
+            if student is None:
                 eligibility_results.append({
                     'student_id': student_id,
                     'student_name': None,
                     'eligible': False,
                     'reason': "Student not found"
                 })
+                continue
+            
+            grade_eligible = drive.includes_grade(student.grade)
+            is_vaccinated = student.id in already_vaccinated
+            
+            eligibility_results.append({
+                'student_id': student_id,
+                'student_name': student.full_name,
+                'eligible': grade_eligible and not is_vaccinated,
+                'reason': None if (grade_eligible and not is_vaccinated) else 
+                         "Already vaccinated with this vaccine" if is_vaccinated else
+                         f"Not in applicable grades ({grade_range})"
+            })
         
         return Response({
             'drive_id': drive_id,
             'vaccine_name': vaccine.name,
             'remaining_doses': remaining_doses,
+            'eligible_count': sum(1 for result in eligibility_results if result['eligible']),
             'students': eligibility_results
-        })
\ No newline at end of file
+        })
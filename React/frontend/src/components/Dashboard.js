@@ -24,13 +24,15 @@ const Dashboard = () => {
         const statsResponse = await axios.get('http://localhost:8000/api/reports/dashboard_stats/');
         setStats(statsResponse.data);
         
-        // Get student stats
-        const studentsResponse = await axios.get('http://localhost:8000/api/students/');
-        const students = studentsResponse.data;
-
-        // Fetch upcoming drives
-        const drivesResponse = await axios.get('http://localhost:8000/api/drives/?next_month=true');
-        setUpcomingDrives(drivesResponse.data);
+        // Fetch upcoming drives, following the cursor through every page of the 30-day window
+        const drives = [];
+        let pageUrl = 'http://localhost:8000/api/drives/?next_month=true';
+        while (pageUrl) {
+          const drivesResponse = await axios.get(pageUrl);
+          drives.push(...drivesResponse.data.results);
+          pageUrl = drivesResponse.data.next;
+        }
+        setUpcomingDrives(drives);
         
         setLoading(false);
       } catch (error) {
@@ -9,6 +9,9 @@ import {
 } from '@mui/material';
 import { Save as SaveIcon, ArrowBack as ArrowBackIcon, PersonAdd as PersonAddIcon } from '@mui/icons-material';
 
+// Vaccinations sent per /api/batch/ request (the server allows up to BATCH_MAX_OPERATIONS)
+const BATCH_SIZE = 100;
+
 const DriveForm = () => {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -24,6 +27,7 @@ const DriveForm = () => {
   const [vaccinatedStudents, setVaccinatedStudents] = useState([]);
   const [openStudentDialog, setOpenStudentDialog] = useState(false);
   const [availableStudents, setAvailableStudents] = useState([]);
+  const [availableNextPage, setAvailableNextPage] = useState(null);
   const [selectedStudents, setSelectedStudents] = useState([]);
   const [studentSearch, setStudentSearch] = useState('');
   const [loadingStudents, setLoadingStudents] = useState(false);
@@ -77,15 +81,19 @@ const DriveForm = () => {
     fetchData();
   }, [id, isEditMode]);
   
-  // Refresh the list of vaccinated students
+  // Refresh the list of vaccinated students, following the cursor through every page
   const refreshVaccinatedStudents = async () => {
     try {
-      const vaccinationsResponse = await axios.get('http://localhost:8000/api/vaccinations/', {
-        params: { drive_id: id }
-      });
-      console.log("Vaccinated students:", vaccinationsResponse.data);
-      setVaccinatedStudents(vaccinationsResponse.data);
-      return vaccinationsResponse.data;
+      const vaccinations = [];
+      let pageUrl = `http://localhost:8000/api/vaccinations/?drive_id=${id}&page_size=500`;
+      while (pageUrl) {
+        const vaccinationsResponse = await axios.get(pageUrl);
+        vaccinations.push(...vaccinationsResponse.data.results);
+        pageUrl = vaccinationsResponse.data.next;
+      }
+      console.log("Vaccinated students:", vaccinations);
+      setVaccinatedStudents(vaccinations);
+      return vaccinations;
     } catch (error) {
       console.error('Error fetching vaccinated students:', error);
       return [];
@@ -193,31 +201,6 @@ const DriveForm = () => {
     }
   };
   
-  // Custom function to check if student is already vaccinated with this vaccine
-  const getAlreadyVaccinatedStudents = async () => {
-    try {
-      // Get the current vaccine ID from the drive
-      const vaccineId = formData.vaccine;
-      if (!vaccineId) return [];
-      
-      // Get all vaccinations for all students
-      const allVaccinationsResponse = await axios.get('http://localhost:8000/api/vaccinations/');
-      const allVaccinations = allVaccinationsResponse.data;
-      
-      // Filter vaccinations for the current vaccine
-      const vaccinationsWithSameVaccine = allVaccinations.filter(v => {
-        // Need to check if vaccination_drive contains the same vaccine
-        return v.vaccination_drive && v.vaccination_drive.vaccine === parseInt(vaccineId);
-      });
-      
-      // Extract student IDs
-      return vaccinationsWithSameVaccine.map(v => v.student);
-    } catch (error) {
-      console.error('Error checking vaccinated students:', error);
-      return [];
-    }
-  };
-  
   const handleOpenStudentDialog = async () => {
     try {
       setError('');
@@ -231,45 +214,15 @@ const DriveForm = () => {
         return;
       }
       
-      // Parse the grade range
-      let minGrade, maxGrade;
-      if (formData.applicable_grades.includes('-')) {
-        const grades = formData.applicable_grades.split('-');
-        minGrade = parseInt(grades[0], 10);
-        maxGrade = parseInt(grades[1], 10);
-      } else {
-        minGrade = maxGrade = parseInt(formData.applicable_grades, 10);
-      }
-      
-      console.log(`Fetching students for grades ${minGrade} to ${maxGrade}`);
-      
-      // Fetch all students
-      const studentsResponse = await axios.get('http://localhost:8000/api/students/');
-      console.log("All students:", studentsResponse.data);
-      
-      // Get students already vaccinated with this vaccine
-      const alreadyVaccinatedIds = await getAlreadyVaccinatedStudents();
-      console.log("Already vaccinated with this vaccine:", alreadyVaccinatedIds);
-      
-      // Fetch current vaccinated students in this drive to exclude them
-      const currentVaccinated = await refreshVaccinatedStudents();
-      const currentVaccinatedIds = currentVaccinated.map(v => v.student);
-      
-      // Filter eligible students
-      const eligibleStudents = studentsResponse.data.filter(student => {
-        const studentGrade = parseInt(student.grade, 10);
-        // Check grade in range
-        const gradeInRange = studentGrade >= minGrade && studentGrade <= maxGrade;
-        // Check not already vaccinated in this drive
-        const notInCurrentDrive = !currentVaccinatedIds.includes(student.id);
-        // Check not already vaccinated with this vaccine in any drive
-        const notAlreadyVaccinated = !alreadyVaccinatedIds.includes(student.id);
-        
-        return gradeInRange && notInCurrentDrive && notAlreadyVaccinated;
+      // The server returns in-range students who have not had this vaccine yet
+      const studentsResponse = await axios.get(`http://localhost:8000/api/drives/${id}/eligible_students/`, {
+        params: { page_size: 500 }
       });
+      const eligibleStudents = studentsResponse.data.results;
       
       console.log("Eligible students:", eligibleStudents);
       setAvailableStudents(eligibleStudents);
+      setAvailableNextPage(studentsResponse.data.next);
       setOpenStudentDialog(true);
       
     } catch (error) {
@@ -280,6 +233,21 @@ const DriveForm = () => {
     }
   };
   
+  const handleLoadMoreStudents = async () => {
+    try {
+      setLoadingStudents(true);
+      // The next link already carries the page size
+      const studentsResponse = await axios.get(availableNextPage);
+      setAvailableStudents([...availableStudents, ...studentsResponse.data.results]);
+      setAvailableNextPage(studentsResponse.data.next);
+    } catch (error) {
+      console.error('Error fetching more students:', error);
+      setError('Failed to load more students: ' + (error.response?.data?.detail || error.message));
+    } finally {
+      setLoadingStudents(false);
+    }
+  };
+  
   const handleVaccinateStudents = async () => {
     if (selectedStudents.length === 0) {
       setError('Please select at least one student');
@@ -309,36 +277,61 @@ const DriveForm = () => {
       const successfulVaccinations = [];
       const failedVaccinations = [];
       
-      // Process each student one by one to handle individual errors
-      for (const student of selectedStudents) {
+      // Send the vaccinations in batches; each one is saved or rejected on its own
+      const dateAdministered = new Date().toISOString().split('T')[0];
+      for (let start = 0; start < selectedStudents.length; start += BATCH_SIZE) {
+        const students = selectedStudents.slice(start, start + BATCH_SIZE);
+        let results;
         try {
-          await axios.post('http://localhost:8000/api/vaccinations/', {
-            student: student.id,
-            vaccination_drive: id,
-            date_administered: new Date().toISOString().split('T')[0]
+          const response = await axios.post('http://localhost:8000/api/batch/', {
+            atomic: false,
+            operations: students.map(student => ({
+              method: 'POST',
+              path: '/api/vaccinations/',
+              body: {
+                student: student.id,
+                vaccination_drive: id,
+                date_administered: dateAdministered
+              }
+            }))
           });
-          
-          successfulVaccinations.push(student);
+          results = response.data.results;
         } catch (error) {
-          console.error(`Error vaccinating student ${student.id}:`, error);
-          
+          if (error.response && error.response.data && Array.isArray(error.response.data.results)) {
+            // Nothing in the batch was saved; each result says why
+            results = error.response.data.results;
+          } else {
+            console.error('Error sending vaccination batch:', error);
+            results = students.map(() => ({ status: 0, body: error.response ? error.response.data : error.message }));
+          }
+        }
+
+        students.forEach((student, index) => {
+          const result = results[index];
+          if (result.status >= 200 && result.status < 300) {
+            successfulVaccinations.push(student);
+            return;
+          }
+
+          console.error(`Error vaccinating student ${student.id}:`, result.body);
+
           // Extract error message
           let errorMessage = 'Unknown error';
-          if (error.response && error.response.data) {
-            if (Array.isArray(error.response.data)) {
-              errorMessage = error.response.data[0];
-            } else if (typeof error.response.data === 'string') {
-              errorMessage = error.response.data;
+          if (result.body) {
+            if (Array.isArray(result.body)) {
+              errorMessage = result.body[0];
+            } else if (typeof result.body === 'string') {
+              errorMessage = result.body;
             } else {
-              errorMessage = JSON.stringify(error.response.data);
+              errorMessage = JSON.stringify(result.body);
             }
           }
-          
+
           failedVaccinations.push({
             student: student,
             error: errorMessage
           });
-        }
+        });
       }
       
       // Refresh vaccinated students list
@@ -681,6 +674,13 @@ const DriveForm = () => {
                   </TableBody>
                 </Table>
               </TableContainer>
+              {availableNextPage && (
+                <Box sx={{ display: 'flex', justifyContent: 'center', p: 2 }}>
+                  <Button variant="outlined" onClick={handleLoadMoreStudents} disabled={loadingStudents}>
+                    {loadingStudents ? 'Loading...' : 'Load More Students'}
+                  </Button>
+                </Box>
+              )}
             </Box>
           )}
         </DialogContent>
@@ -16,6 +16,7 @@ import {
 
 const VaccinationDrives = () => {
   const [drives, setDrives] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [tab, setTab] = useState(0); // 0 = upcoming, 1 = past
@@ -25,7 +26,7 @@ const VaccinationDrives = () => {
     fetchDrives();
   }, [tab, searchQuery]);
 
-  const fetchDrives = async () => {
+  const fetchDrives = async (pageUrl = null) => {
     try {
       setLoading(true);
       setError('');
@@ -38,8 +39,10 @@ const VaccinationDrives = () => {
         params.search = searchQuery;
       }
       
-      const response = await driveAPI.getAll(params);
-      setDrives(response.data);
+      // The list is cursor-paginated; pageUrl already carries the filters
+      const response = pageUrl ? await axios.get(pageUrl) : await driveAPI.getAll(params);
+      setDrives(pageUrl ? [...drives, ...response.data.results] : response.data.results);
+      setNextPage(response.data.next);
     } catch (error) {
       console.error('Error fetching vaccination drives:', error);
       setError('Failed to load vaccination drives. Please try again.');
@@ -179,6 +182,13 @@ const VaccinationDrives = () => {
               })}
             </TableBody>
           </Table>
+          {nextPage && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', p: 2 }}>
+              <Button variant="outlined" onClick={() => fetchDrives(nextPage)}>
+                Load More
+              </Button>
+            </Box>
+          )}
         </TableContainer>
       )}
     </Box>
@@ -14,6 +14,7 @@ const Reports = () => {
   const [vaccines, setVaccines] = useState([]);
   const [grades, setGrades] = useState([]);
   const [vaccinations, setVaccinations] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   
   const [filters, setFilters] = useState({
     vaccine_id: '',
@@ -32,10 +33,9 @@ const Reports = () => {
         const vaccinesResponse = await axios.get('http://localhost:8000/api/vaccines/');
         setVaccines(vaccinesResponse.data);
         
-        // Fetch students to extract unique grades
-        const studentsResponse = await axios.get('http://localhost:8000/api/students/');
-        const uniqueGrades = [...new Set(studentsResponse.data.map(student => student.grade))].sort();
-        setGrades(uniqueGrades);
+        // Every grade with students, from the dashboard totals (in grade order)
+        const statsResponse = await axios.get('http://localhost:8000/api/reports/dashboard_stats/');
+        setGrades(statsResponse.data.by_grade.map(row => row.grade));
         
       } catch (error) {
         console.error('Error fetching initial data:', error);
@@ -61,7 +61,8 @@ const Reports = () => {
         params: filters
       });
       
-      setVaccinations(response.data);
+      setVaccinations(response.data.results);
+      setNextPage(response.data.next);
       setPage(0); // Reset to first page
     } catch (error) {
       console.error('Error fetching vaccination report:', error);
@@ -70,6 +71,21 @@ const Reports = () => {
     }
   };
   
+  const handleLoadMore = async () => {
+    setLoading(true);
+    
+    try {
+      // The report is cursor-paginated; the next link already carries the filters
+      const response = await axios.get(nextPage);
+      setVaccinations([...vaccinations, ...response.data.results]);
+      setNextPage(response.data.next);
+    } catch (error) {
+      console.error('Error fetching vaccination report:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+  
   const handleExport = async (format) => {
     try {
       const response = await axios.get('http://localhost:8000/api/reports/vaccination_report/', {
@@ -246,6 +262,14 @@ const Reports = () => {
               onPageChange={handleChangePage}
               onRowsPerPageChange={handleChangeRowsPerPage}
             />
+            
+            {nextPage && (
+              <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+                <Button variant="outlined" onClick={handleLoadMore}>
+                  Load More
+                </Button>
+              </Box>
+            )}
           </>
         )}
       </Paper>
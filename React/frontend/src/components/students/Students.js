@@ -19,6 +19,7 @@ import {
 
 const Students = () => {
   const [students, setStudents] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
   const [searchQuery, setSearchQuery] = useState('');
   const [selectedGrade, setSelectedGrade] = useState('');
@@ -31,7 +32,14 @@ const Students = () => {
     fetchStudents();
   }, [searchQuery, selectedGrade]);
 
-  const fetchStudents = async () => {
+  useEffect(() => {
+    // Every grade with students, from the dashboard totals (in grade order)
+    axios.get('http://localhost:8000/api/reports/dashboard_stats/')
+      .then(response => setGrades(response.data.by_grade.map(row => row.grade)))
+      .catch(error => console.error('Error fetching grades:', error));
+  }, []);
+
+  const fetchStudents = async (pageUrl = null) => {
     try {
       setLoading(true);
       
@@ -40,11 +48,14 @@ const Students = () => {
       if (searchQuery) params.name = searchQuery;
       if (selectedGrade) params.grade = selectedGrade;
       
-      const response = await axios.get('http://localhost:8000/api/students/', { params });
+      // The list is cursor-paginated; pageUrl already carries the filters
+      const response = pageUrl
+        ? await axios.get(pageUrl)
+        : await axios.get('http://localhost:8000/api/students/', { params });
       console.log('API Response:', response.data);
       
       // Ensure each student has a vaccination_status object
-      const studentsWithDefaultStatus = response.data.map(student => ({
+      const studentsWithDefaultStatus = response.data.results.map(student => ({
         ...student,
         vaccination_status: student.vaccination_status || { 
           status: 'Not Vaccinated', 
@@ -53,11 +64,9 @@ const Students = () => {
         }
       }));
       
-      setStudents(studentsWithDefaultStatus);
-      
-      // Extract unique grades for filter dropdown
-      const uniqueGrades = [...new Set(studentsWithDefaultStatus.map(student => student.grade))].sort();
-      setGrades(uniqueGrades);
+      const loadedStudents = pageUrl ? [...students, ...studentsWithDefaultStatus] : studentsWithDefaultStatus;
+      setStudents(loadedStudents);
+      setNextPage(response.data.next);
       
     } catch (error) {
       console.error('Error fetching students:', error);
@@ -289,6 +298,13 @@ const renderVaccinationStatus = (status) => {
               ))}
             </TableBody>
           </Table>
+          {nextPage && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', p: 2 }}>
+              <Button variant="outlined" onClick={() => fetchStudents(nextPage)}>
+                Load More
+              </Button>
+            </Box>
+          )}
         </TableContainer>
       )}
       